@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+往期日报归档：每日 JSON + 分片倒排索引 + 纯静态搜索页（仅标准库，发布到 GitHub Pages 即可用）
+
+输出目录（默认 <本目录>/archive，NEWS_ARCHIVE_DIR 可改）：
+  manifest.json       格式版本、分片数、条目总数与全部日报 [key, 日期, 版本, 标题, 条数, 内容摘要]，
+                      日报编号即在列表中的下标，追加不复用
+  days/<key>.json     单份日报的条目（分区 / 标题 / 来源 / 日期 / 链接 / 正文），key 为「YYYY-MM-DD-版本名」
+  index/<xx>.json     倒排索引分片 {词: [条目号, 权重, 条目号, 权重, ...]}，条目号 = 日报编号 × 1000 + 条目序号，
+                      升序、存与前一个的差值（第一个为原值）
+  index.html / search.js  搜索页，从 archive_web/ 复制；查询时只下载查询词所在的分片与命中的日报
+
+分词：NFKC + 小写；连续汉字切成二元组（单字成词），字母数字串整体成词（单个字母不收）。
+词按 FNV-1a 哈希落到 SHARDS 个分片，search.js 里是同一套分词与哈希，改动时两边同步并 --rebuild。
+增量：按内容摘要跳过已归档的日报，只解析新的或改动过的 Markdown，只读写它们的词所在的分片，
+分片里只解码、重编码新日报用到的词；
+改动过的日报沿用原编号，先按旧的 days/<key>.json 找出旧词所在分片并移除旧条目。
+归档以 days/*.json 为准，源 Markdown 不在了也能 --rebuild 重建索引。
+
+用法：
+  python archive.py            归档本目录下各版本的日报（文件名规则取自 editions.json）
+  python archive.py --rebuild  按 days/*.json 重建全部索引分片（改分片数或分词规则之后）
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import datetime
+import unicodedata
+
+import report
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.environ.get("NEWS_ARCHIVE_DIR") or os.path.join(SCRIPT_DIR, "archive")
+WEB_DIR = os.path.join(SCRIPT_DIR, "archive_web")
+VERSION = 1
+SHARDS = 256
+ITEM_SLOTS = 1000  # 每份日报最多的条目数
+TITLE_WEIGHT = 3
+
+_TOKEN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff]+|[0-9a-z]+")
+_DATE_LABEL = r"(\d{4})年(\d{1,2})月(\d{1,2})日"
+_MD_LINK = re.compile(r"\[(.*?)\]\((.*?)\)")
+
+
+def tokens(text):
+    """分词（与 search.js 的 tokens 一致）。"""
+    out = []
+    for m in _TOKEN.finditer(unicodedata.normalize("NFKC", text or "").lower()):
+        w = m.group(0)
+        if w[0] <= "z":
+            if len(w) > 1 or w.isdigit():
+                out.append(w)
+        elif len(w) == 1:
+            out.append(w)
+        else:
+            out.extend(w[i:i + 2] for i in range(len(w) - 1))
+    return out
+
+
+def shard_of(term):
+    """FNV-1a（32 位，UTF-8 字节）取模，与 search.js 的 shardOf 一致。"""
+    h = 0x811C9DC5
+    for b in term.encode("utf-8"):
+        h = ((h ^ b) * 0x01000193) & 0xFFFFFFFF
+    return h % SHARDS
+
+
+def _plain(text):
+    return _MD_LINK.sub(r"\1", text).replace("**", "").strip()
+
+
+def day_record(md, key, date, edition):
+    """解析一份日报 Markdown，得到 days/<key>.json 的内容。"""
+    rep = report.parse(md)
+    items = []
+    for sec in rep.sections:
+        for it in sec.items:
+            items.append({"section": _plain(sec.header), "title": _plain(it.title), "source": it.source,
+                          "date": it.date, "url": it.url, "text": _plain(it.body)})
+    return {"key": key, "date": date, "edition": edition, "title": rep.title,
+            "items": items[:ITEM_SLOTS - 1]}
+
+
+def postings(doc_id, day):
+    """{词: {条目号: 权重}}：标题里的词计 TITLE_WEIGHT 次，来源与正文各计 1 次。"""
+    out = {}
+    for n, it in enumerate(day["items"]):
+        pid = doc_id * ITEM_SLOTS + n
+        for weight, text in ((TITLE_WEIGHT, it["title"]), (1, it["source"]), (1, it["text"])):
+            for t in tokens(text):
+                slot = out.setdefault(t, {})
+                slot[pid] = slot.get(pid, 0) + weight
+    return out
+
+
+def _decode(flat):
+    """[间隔, 权重, 间隔, 权重, ...] -> {条目号: 权重}；条目号升序存差值，第一个为原值。"""
+    post, pid = {}, 0
+    for gap, w in zip(flat[::2], flat[1::2]):
+        pid += gap
+        post[pid] = w
+    return post
+
+
+def _encode(post):
+    flat, prev = [], 0
+    for pid in sorted(post):
+        flat += (pid - prev, post[pid])
+        prev = pid
+    return flat
+
+
+def _read_json(path, default=None):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True))
+    os.replace(tmp, path)
+
+
+def find_reports(src, editions):
+    """src 下与各版本 out_md 规则匹配的日报：[(路径, key, 日期, 版本名)]，按日期排序。"""
+    patterns = []
+    for ed in editions:
+        head, sep, tail = ed.out_md.partition("{date}")
+        if sep:
+            patterns.append((re.compile(re.escape(head) + _DATE_LABEL + re.escape(tail) + "$"), ed.name))
+    found = []
+    for name in sorted(os.listdir(src)):
+        for rx, edition in patterns:
+            m = rx.match(name)
+            if m:
+                date = datetime.date(*map(int, m.groups())).isoformat()
+                found.append((os.path.join(src, name), f"{date}-{edition}", date, edition))
+                break
+    found.sort(key=lambda f: (f[2], f[1]))
+    return found
+
+
+class Archive:
+    """归档目录的读写；add() 只记下待写的改动，save() 一次性落盘。"""
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self.days_dir = os.path.join(root, "days")
+        self.index_dir = os.path.join(root, "index")
+        os.makedirs(self.days_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.manifest = _read_json(os.path.join(root, "manifest.json")) or \
+            {"version": VERSION, "shards": SHARDS, "items": 0, "docs": []}
+        self.ids = {d[0]: i for i, d in enumerate(self.manifest["docs"])}
+        self._add = {}     # 分片号 -> {词: {条目号: 权重}}
+        self._drop = {}    # 分片号 -> {要移除的日报编号}
+        self._days = {}    # key -> 待写的 days 记录
+
+    def compatible(self):
+        return self.manifest["version"] == VERSION and self.manifest["shards"] == SHARDS
+
+    def digest(self, key):
+        i = self.ids.get(key)
+        return None if i is None else self.manifest["docs"][i][5]
+
+    def _day_path(self, key):
+        return os.path.join(self.days_dir, key + ".json")
+
+    def add(self, day, digest):
+        """加入或替换一份日报；替换时沿用原编号并移除旧条目。"""
+        key = day["key"]
+        row = [key, day["date"], day["edition"], day["title"], len(day["items"]), digest]
+        doc_id = self.ids.get(key)
+        if doc_id is None:
+            doc_id = self.ids[key] = len(self.manifest["docs"])
+            self.manifest["docs"].append(row)
+        else:
+            old = self._days.get(key) or _read_json(self._day_path(key))
+            if old:
+                for t in postings(doc_id, old):
+                    self._drop.setdefault(shard_of(t), set()).add(doc_id)
+            self.manifest["docs"][doc_id] = row
+        self._index(doc_id, day)
+        self._days[key] = day
+
+    def _index(self, doc_id, day):
+        for t, post in postings(doc_id, day).items():
+            self._add.setdefault(shard_of(t), {}).setdefault(t, {}).update(post)
+
+    def rebuild(self):
+        """清空分片，按 days/*.json 重新建索引。"""
+        shutil.rmtree(self.index_dir)
+        os.makedirs(self.index_dir)
+        self.manifest.update(version=VERSION, shards=SHARDS)
+        self._add, self._drop = {}, {}
+        for doc_id, row in enumerate(self.manifest["docs"]):
+            day = _read_json(self._day_path(row[0]))
+            if day:
+                self._index(doc_id, day)
+
+    def save(self):
+        """写 days、改动过的分片与 manifest，返回写过的分片数。"""
+        for key, day in self._days.items():
+            _write_json(self._day_path(key), day)
+        touched = sorted(set(self._add) | set(self._drop))
+        for s in touched:
+            path = os.path.join(self.index_dir, f"{s:02x}.json")
+            shard = _read_json(path) or {}
+            add = self._add.get(s, {})
+            drop = self._drop.get(s)
+            # 只解码要改的词；没被改动的词原样写回
+            for t in set(add) | (set(shard) if drop else set()):
+                post = _decode(shard.get(t, ()))
+                if drop:
+                    post = {pid: w for pid, w in post.items() if pid // ITEM_SLOTS not in drop}
+                post.update(add.get(t, {}))
+                if post:
+                    shard[t] = _encode(post)
+                else:
+                    shard.pop(t, None)
+            _write_json(path, shard)
+        self.manifest["items"] = sum(d[4] for d in self.manifest["docs"])
+        _write_json(os.path.join(self.root, "manifest.json"), self.manifest)
+        for name in ("index.html", "search.js"):
+            src = os.path.join(WEB_DIR, name)
+            if os.path.exists(src):
+                shutil.copyfile(src, os.path.join(self.root, name))
+        self._add, self._drop, self._days = {}, {}, {}
+        return len(touched)
+
+
+def build(src=SCRIPT_DIR, root=ARCHIVE_DIR, editions=None, rebuild=False):
+    """把 src 下新的或改动过的日报并入归档，返回新归档的份数。"""
+    if editions is None:
+        import generate
+        editions = generate.load_editions(generate.Config.from_env())
+    archive = Archive(root)
+    if rebuild:
+        archive.rebuild()
+    elif not archive.compatible():
+        raise SystemExit(f"ERROR: {root} 的格式版本或分片数与当前不一致，请用 --rebuild 重建索引")
+    added = 0
+    for path, key, date, edition in find_reports(src, editions):
+        with open(path, encoding="utf-8") as f:
+            md = f.read()
+        digest = hashlib.sha1(md.encode("utf-8")).hexdigest()[:12]
+        if archive.digest(key) == digest:
+            continue
+        day = day_record(md, key, date, edition)
+        if not day["items"]:
+            print(f"跳过 {os.path.basename(path)}：没有解析出条目")
+            continue
+        archive.add(day, digest)
+        added += 1
+    shards = archive.save()
+    docs = archive.manifest["docs"]
+    print(f"归档：新增或更新 {added} 份，写分片 {shards}/{SHARDS} 个；"
+          f"共 {len(docs)} 份 {archive.manifest['items']} 条")
+    return added
+
+
+def main():
+    build(rebuild="--rebuild" in sys.argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+// 往期归档的静态搜索（由 archive.py 复制到 archive/）。
+// 分词与分片哈希必须与 archive.py 的 tokens / shard_of 一致；查询只下载用到的分片与命中的日报。
+"use strict";
+
+const ITEM_SLOTS = 1000;
+const MAX_RESULTS = 50;
+const TOKEN = /[\u3400-\u4dbf\u4e00-\u9fff]+|[0-9a-z]+/g;
+const cache = new Map(); // 路径 -> Promise(JSON)
+let manifest = null;
+
+function load(path) {
+  if (!cache.has(path)) {
+    cache.set(path, fetch(path).then((r) => (r.ok ? r.json() : null)).catch(() => null));
+  }
+  return cache.get(path);
+}
+
+function tokens(text) {
+  const out = [];
+  for (const [w] of (text || "").normalize("NFKC").toLowerCase().matchAll(TOKEN)) {
+    if (w[0] <= "z") {
+      if (w.length > 1 || /^\d$/.test(w)) out.push(w);
+    } else if (w.length === 1) {
+      out.push(w);
+    } else {
+      for (let i = 0; i < w.length - 1; i++) out.push(w.slice(i, i + 2));
+    }
+  }
+  return out;
+}
+
+function shardOf(term) {
+  let h = 0x811c9dc5;
+  for (const b of new TextEncoder().encode(term)) h = Math.imul(h ^ b, 0x01000193) >>> 0;
+  return (h % manifest.shards).toString(16).padStart(2, "0");
+}
+
+function esc(s) {
+  return String(s || "").replace(/[&<>"']/g, (c) => `&#${c.charCodeAt(0)};`);
+}
+
+function highlight(text, words) {
+  let out = esc(text);
+  for (const w of words) {
+    if (w) out = out.split(esc(w)).join(`<mark>${esc(w)}</mark>`);
+  }
+  return out;
+}
+
+// 只给 http(s) 链接生成「原文」：归档里的链接来自模型输出，javascript: 之类的不能变成可点击的脚本
+function sourceLink(url) {
+  return /^https?:\/\//i.test(url || "") ? ` · <a href="${esc(url)}" target="_blank" rel="noopener">原文</a>` : "";
+}
+
+function itemHtml(doc, it, words) {
+  const link = sourceLink(it.url);
+  const text = it.text.length > 160 ? it.text.slice(0, 160) + "…" : it.text;
+  return `<h3>${highlight(it.title, words)}</h3>
+<blockquote><a href="#d=${esc(doc[0])}">${esc(doc[1])} ${esc(doc[3])}</a> · ${esc(it.source)}${link}</blockquote>
+<p>${highlight(text, words)}</p>`;
+}
+
+async function search(query) {
+  const status = document.getElementById("status");
+  const out = document.getElementById("out");
+  const terms = [...new Set(tokens(query))];
+  if (!terms.length) return browse();
+  status.textContent = "搜索中…";
+  const shards = await Promise.all(terms.map((t) => load(`index/${shardOf(t)}.json`)));
+  // 所有词都命中的条目才算结果，得分 = Σ 权重 × idf
+  let scores = null;
+  terms.forEach((t, i) => {
+    const flat = (shards[i] || {})[t] || [];
+    const idf = Math.log(1 + manifest.items / Math.max(1, flat.length / 2));
+    const next = new Map();
+    let pid = 0;
+    for (let k = 0; k < flat.length; k += 2) {
+      pid += flat[k]; // 条目号按差值存储
+      if (scores === null || scores.has(pid)) next.set(pid, (scores ? scores.get(pid) : 0) + flat[k + 1] * idf);
+    }
+    scores = next;
+  });
+  const hits = [...scores].sort((a, b) => b[1] - a[1] || b[0] - a[0]).slice(0, MAX_RESULTS);
+  const docs = [...new Set(hits.map(([pid]) => Math.floor(pid / ITEM_SLOTS)))];
+  const days = new Map(await Promise.all(docs.map(async (d) => [d, await load(`days/${manifest.docs[d][0]}.json`)])));
+  const words = query.split(/\s+/);
+  const parts = [];
+  for (const [pid] of hits) {
+    const d = Math.floor(pid / ITEM_SLOTS);
+    const day = days.get(d);
+    const it = day && day.items[pid % ITEM_SLOTS];
+    if (it) parts.push(itemHtml(manifest.docs[d], it, words));
+  }
+  status.textContent = `「${query}」共 ${scores.size} 条${scores.size > MAX_RESULTS ? `，显示前 ${MAX_RESULTS} 条` : ""}`;
+  out.innerHTML = parts.join("\n");
+}
+
+async function showDay(key) {
+  const day = await load(`days/${key}.json`);
+  const out = document.getElementById("out");
+  if (!day) {
+    out.innerHTML = "<p>没有这一期。</p>";
+    return;
+  }
+  document.getElementById("status").textContent = `${day.date} · ${day.items.length} 条`;
+  const parts = [`<h2>${esc(day.title)}</h2>`];
+  let section = null;
+  day.items.forEach((it, i) => {
+    if (it.section !== section) {
+      section = it.section;
+      if (section) parts.push(`<h2>${esc(section)}</h2>`);
+    }
+    const link = sourceLink(it.url);
+    parts.push(`<h3>${i + 1}. ${esc(it.title)}</h3>
+<blockquote>来源：${esc(it.source)}${it.date ? " · " + esc(it.date) : ""}${link}</blockquote>
+<p>${esc(it.text).replace(/\n/g, "<br>")}</p>`);
+  });
+  out.innerHTML = parts.join("\n");
+}
+
+function browse() {
+  const docs = manifest.docs.slice().sort((a, b) => (b[1] + b[2]).localeCompare(a[1] + a[2]));
+  const byYear = new Map();
+  for (const d of docs) {
+    const y = d[1].slice(0, 4);
+    if (!byYear.has(y)) byYear.set(y, []);
+    byYear.get(y).push(`<a href="#d=${esc(d[0])}">${esc(d[1].slice(5))} ${esc(d[3])}</a>`);
+  }
+  document.getElementById("status").textContent = `共 ${docs.length} 期、${manifest.items} 条`;
+  document.getElementById("out").innerHTML = [...byYear]
+    .map(([y, links]) => `<h2>${y}</h2><div class="days">${links.join("")}</div>`).join("\n");
+}
+
+function route() {
+  const params = new URLSearchParams(location.hash.slice(1));
+  const q = params.get("q");
+  document.getElementById("q").value = q || "";
+  if (params.get("d")) return showDay(params.get("d"));
+  return q ? search(q) : browse();
+}
+
+document.getElementById("search").addEventListener("submit", (e) => {
+  e.preventDefault();
+  location.hash = "q=" + encodeURIComponent(document.getElementById("q").value.trim());
+});
+
+load("manifest.json").then((m) => {
+  if (!m) {
+    document.getElementById("status").textContent = "归档为空。";
+    return;
+  }
+  manifest = m;
+  window.addEventListener("hashchange", route);
+  route();
+});
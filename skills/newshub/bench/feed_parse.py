@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSS 解析微基准：整篇 DOM 解析（parse_feed_tree） vs 增量解析（parse_feed_stream）
+
+构造一份类似 arXiv / 36kr 体量的大 feed（默认 2000 条、每条带长 HTML 描述），
+两种解析器各取 max_items 条，比较单次耗时；同时校验两者结果一致。
+
+用法：
+  python bench/feed_parse.py [条目数] [max_items] [重复次数]
+"""
+
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+
+from generate import parse_feed_stream, parse_feed_tree  # noqa: E402
+
+
+def make_feed(n):
+    desc = "&lt;p&gt;" + "大模型 benchmark paragraph with <b>markup</b> " * 60 + "&lt;/p&gt;"
+    items = "".join(
+        f"<item><title>Paper {i}</title><link>https://arxiv.org/abs/2608.{i:05d}</link>"
+        f"<pubDate>Mon, 17 Aug 2026 00:00:00 GMT</pubDate>"
+        f"<description>{desc}</description></item>"
+        for i in range(n)
+    ).replace("<b>", "&lt;b&gt;").replace("</b>", "&lt;/b&gt;")
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>bench</title>{items}</channel></rss>'.encode()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_items = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    body = make_feed(n)
+    tree = parse_feed_tree(body, max_items)
+    stream = parse_feed_stream(io.BytesIO(body), max_items)
+    assert tree == stream, "两种解析器结果不一致"
+    t_tree = min(timeit.repeat(lambda: parse_feed_tree(body, max_items), number=1, repeat=repeat))
+    t_stream = min(timeit.repeat(lambda: parse_feed_stream(io.BytesIO(body), max_items),
+                                 number=1, repeat=repeat))
+    print(f"feed: {n} 条, {len(body) / 1024:.0f} KB, max_items={max_items}")
+    print(f"tree   : {t_tree * 1000:8.2f} ms")
+    print(f"stream : {t_stream * 1000:8.2f} ms  ({t_tree / t_stream:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似去重微基准：随机生成 N 条中英文候选（其中一部分是同一事件的改写 / 聚合副本），
+测 dedup.cluster 的耗时（特征缓存清空后的首次与缓存命中后各取最好）与聚类统计。
+
+用法：
+  python bench/near_dup.py [条目数] [重复次数]
+"""
+
+import os
+import sys
+import time
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import cluster, _features, _title_features  # noqa: E402
+
+_rnd = random.Random(1)
+EN = ["".join(_rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_rnd.randint(3, 9)))
+      for _ in range(5000)]
+ZH = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+
+
+def make_items(n, seed=7):
+    rnd = random.Random(seed)
+    items, originals = [], []
+    for i in range(n):
+        if originals and rnd.random() < 0.3:
+            src = rnd.choice(originals)
+            items.append({"title": src["title"] + " - 新浪科技", "url": f"https://news.google.com/{i}",
+                          "content": src["title"] + " - 新浪科技"})
+            continue
+        if rnd.random() < 0.5:
+            title = " ".join(rnd.choice(EN) for _ in range(8))
+            content = " ".join(rnd.choice(EN) for _ in range(60))
+        else:
+            title = "".join(rnd.choice(ZH) for _ in range(18))
+            content = "".join(rnd.choice(ZH) for _ in range(200))
+        originals.append({"title": title, "url": f"https://example.com/{i}", "content": content})
+        items.append(originals[-1])
+    return items
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    items = make_items(n)
+    cold = []
+    for _ in range(repeat):
+        _features.cache_clear()
+        _title_features.cache_clear()
+        t0 = time.perf_counter()
+        _, stats = cluster(items)
+        cold.append(time.perf_counter() - t0)
+    warm = min(timeit.repeat(lambda: cluster(items), number=1, repeat=repeat))
+    print(f"candidates={n} clusters={stats['clusters']} merged={stats['merged']} "
+          f"largest={stats['largest']}")
+    print(f"cluster: {min(cold) * 1000:.1f} ms（首次），{warm * 1000:.1f} ms（特征已缓存，如第二个版本）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全流程离线基准：进程内启动 bench/standin.py 替身服务，把 FEEDS、各检索接口与 ANTHROPIC_BASE_URL
+指向它，分阶段计时并输出 JSON，便于跟踪耗时与内存回归。
+
+阶段：
+  parse_feed     fixtures 中的 feed 在内存里解析（parse_feed_stream，不含网络）
+  fetch_feed     逐个 fetch_feed() 全部 FEEDS（串行，含本地 HTTP）
+  gather         gather()：并发抓取 FEEDS + QUERIES
+  enforce_count  录制的 24 条日报裁剪到 20 条
+  md_to_html     渲染裁剪后的日报
+  main           完整 main()（每次在新的临时目录里跑，已发布索引为空）
+
+每个阶段先跑 repeat 次取耗时（min / median / max 毫秒），再在 tracemalloc 下单独跑一次取 Python 内存峰值。
+HTTP 缓存、LLM 缓存与候选素材库在基准里关闭（也不读 editions.json），每次都是冷启动、现场抓取；
+录制的 Google News 链接指向真实站点，聚合链接解析（NEWS_RESOLVE）也关闭。
+
+用法：
+  python bench/pipeline.py [--repeat N] [--latency MS] [--jitter MS] [--fail-rate P]
+                           [--stages gather,main] [--out result.json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import subprocess
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from standin import StandIn, FEED_FILES, render_fixture  # noqa: E402
+
+STAGES = ("parse_feed", "fetch_feed", "gather", "enforce_count", "md_to_html", "main")
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _max_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _measure(fn, repeat):
+    """返回 (统计 dict, 最后一次的返回值)；fn 的输出（print）一律丢弃。"""
+    times, result = [], None
+    sink = io.StringIO()
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(sink):
+            t0 = time.perf_counter()
+            result = fn()
+            times.append((time.perf_counter() - t0) * 1000)
+        sink.seek(0)
+        sink.truncate()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(sink):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    stats = {"runs": repeat, "min_ms": round(min(times), 2),
+             "median_ms": round(statistics.median(times), 2),
+             "max_ms": round(max(times), 2), "peak_kb": peak // 1024}
+    return stats, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="generate.py 全流程离线基准")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--latency", type=float, default=20.0, help="替身服务每个请求的固定延迟（毫秒）")
+    ap.add_argument("--jitter", type=float, default=30.0, help="附加随机延迟上限（毫秒）")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="替身服务返回 503 的概率")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--stages", default=",".join(STAGES), help="逗号分隔，默认全部")
+    ap.add_argument("--out", help="JSON 输出路径，默认打印到标准输出")
+    args = ap.parse_args()
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"ERROR: 未知阶段 {', '.join(sorted(unknown))}；可选 {', '.join(STAGES)}")
+
+    stand = StandIn(latency=args.latency, jitter=args.jitter,
+                    fail_rate=args.fail_rate, seed=args.seed).start()
+    work = tempfile.mkdtemp(prefix="newshub-bench-")
+    os.environ.update({
+        "ANTHROPIC_API_KEY": "bench",
+        "ANTHROPIC_BASE_URL": stand.llm_base,
+        "NEWS_CACHE_DIR": work,  # 来源统计等不写进用户的缓存目录
+        "NEWS_HTTP_CACHE": "0",
+        "NEWS_RESOLVE": "0",
+        "NEWS_LLM_CACHE": "off",
+        "NEWS_CANDIDATES": "0",
+        "NEWS_SEEN_DB": os.path.join(work, "seen_items.sqlite3"),
+        "NEWS_EDITIONS": os.path.join(work, "editions.json"),
+    })
+    os.environ.pop("TAVILY_API_KEY", None)
+    import datetime
+    import generate as g
+    g.FEEDS = stand.feed_urls
+    g.GNEWS_URL, g.HN_URL, g.DDG_URL = stand.gnews_url, stand.hn_url, stand.ddg_url
+
+    cfg = g.Config.from_env()
+    bodies = [render_fixture(name) for name in FEED_FILES]
+    report = render_fixture("chat_report.md").decode("utf-8")
+    trimmed = g.enforce_count(report, g.TARGET_ITEMS)
+    runs = {"n": 0}
+
+    def run_gather():
+        return len(g.gather(limit=None))
+
+    def run_main():
+        runs["n"] += 1
+        d = os.path.join(work, f"main-{runs['n']}")
+        os.makedirs(d)
+        os.environ["NEWS_SEEN_DB"] = os.path.join(d, "seen_items.sqlite3")
+        cwd = os.getcwd()
+        os.chdir(d)
+        try:
+            g.main()
+        finally:
+            os.chdir(cwd)
+        out_md = g.REPORT_MD.replace("{date}", g.date_label(datetime.date.today()))
+        with open(os.path.join(d, out_md), encoding="utf-8") as f:
+            return g.count_items(f.read())
+
+    bench = {
+        "parse_feed": lambda: sum(len(g.parse_feed_stream(io.BytesIO(b), 3)) for b in bodies),
+        "fetch_feed": lambda: sum(len(g.fetch_feed(u, cfg=cfg)) for u in g.FEEDS),
+        "gather": run_gather,
+        "enforce_count": lambda: g.count_items(g.enforce_count(report, g.TARGET_ITEMS)),
+        "md_to_html": lambda: len(g.md_to_html(trimmed, g.date_label(datetime.date.today()))),
+        "main": run_main,
+    }
+    units = {"parse_feed": "items", "fetch_feed": "items", "gather": "items",
+             "enforce_count": "items", "md_to_html": "bytes", "main": "items"}
+
+    results = {}
+    for name in stages:
+        stand.reset_counts()
+        stats, value = _measure(bench[name], max(1, args.repeat))
+        stats[units[name]] = value
+        if stand.requests:
+            stats["requests"] = sum(stand.requests.values())
+            stats["injected_failures"] = sum(stand.failures.values())
+        results[name] = stats
+        print(f"{name:14s} median {stats['median_ms']:9.2f} ms  peak {stats['peak_kb']:7d} KB  "
+              f"{units[name]}={value}", file=sys.stderr)
+    stand.stop()
+
+    out = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git": _git_rev(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"repeat": args.repeat, "latency_ms": args.latency, "jitter_ms": args.jitter,
+                   "fail_rate": args.fail_rate, "seed": args.seed, "feeds": len(g.FEEDS),
+                   "queries": len(g.QUERIES), "gather_workers": cfg.gather_workers,
+                   "host_concurrency": cfg.host_concurrency, "feed_parser": cfg.feed_parser,
+                   "llm_stream": cfg.llm_stream,
+                   "llm_shards": cfg.llm_shards,
+                   "triage": cfg.triage,
+                   "run_budget": cfg.run_budget,
+                   "gather_cutoff": cfg.gather_cutoff,
+                   "repair_rounds": cfg.repair_rounds},
+        "stages": results,
+        "max_rss_kb": _max_rss_kb(),
+    }
+    text = json.dumps(out, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线替身服务：用 fixtures/ 里录制的响应模拟全部外部依赖，基准测试不再访问真实站点与付费网关。
+
+  RSS / Atom      fixtures/feed_*.xml，按 FEEDS 顺序轮流分配；每个 feed 单独一个端口（= 单独一个 host，
+                  与线上一样受 NEWS_HOST_CONCURRENCY 的按 host 并发约束）
+  Google News     fixtures/gnews.xml
+  HN Algolia      fixtures/hn.json
+  DDG-lite        fixtures/ddg.html（POST）
+  Chat Completions  单次成稿返回 fixtures/chat_report.md；map 分片返回其中属于本分片的条目；
+                  reduce 按候选编号顺序分配；stream=true 时按 SSE 分块返回
+
+录制的发布时间已换成相对占位符（{{rfc822:-3h}}、{{iso:-3h}}、{{date:-3h}}、{{day}}），
+启动时按当前时间展开，任何日期运行都落在「过去 24 小时」窗口内。
+每个请求先等待 latency + [0, jitter) 毫秒；按 fail_rate 概率返回 503（失败注入，随机数由 seed 固定）。
+
+用法：
+  python bench/standin.py [--latency MS] [--jitter MS] [--fail-rate P] [--seed N]
+"""
+
+import os
+import re
+import json
+import time
+import random
+import argparse
+import datetime
+import threading
+import email.utils
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FEED_FILES = ("feed_techcrunch.xml", "feed_theverge.xml", "feed_arxiv.xml", "feed_36kr.xml")
+_PLACEHOLDER = re.compile(r"\{\{(rfc822|iso|date):-(\d+)h\}\}|\{\{day\}\}")
+_ITEM = re.compile(r"^### ", re.M)
+
+
+def render_fixture(name, now=None):
+    """读取 fixture 并展开时间占位符，返回 bytes。"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        text = f.read()
+
+    def sub(m):
+        if m.group(1) is None:
+            d = now.astimezone().date()
+            return f"{d.year}年{d.month}月{d.day}日"
+        t = now - datetime.timedelta(hours=int(m.group(2)))
+        if m.group(1) == "rfc822":
+            return email.utils.format_datetime(t, usegmt=True)
+        if m.group(1) == "iso":
+            return t.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return t.astimezone().strftime("%Y-%m-%d")
+
+    return _PLACEHOLDER.sub(sub, text).encode("utf-8")
+
+
+def _map_draft(report, shard, shards):
+    """map 分片的响应：只保留编号落在本分片的条目，不带一级标题与导语。"""
+    out, keep, n = [], False, 0
+    for line in report.split("\n"):
+        if line.startswith("## "):
+            out.append(line)
+            keep = False
+        elif line.startswith("### "):
+            n += 1
+            keep = n % shards == shard - 1
+            if keep:
+                out.append(line)
+        elif keep:
+            out.append(line)
+    return "\n".join(out)
+
+
+def _reduce_pick(prompt):
+    """reduce 的响应：候选编号按顺序取前 N 个，均分到三个分区。"""
+    ids = [int(m) for m in re.findall(r"^(\d+) \| ", prompt, re.M)]
+    m = re.search(r"恰好 (\d+) 条", prompt)
+    ids = ids[:int(m.group(1)) if m else 20]
+    third = -(-len(ids) // 3)
+    return json.dumps({"AI 技术": ids[:third], "AI 应用": ids[third:2 * third],
+                       "AI 行业动态": ids[2 * third:]}, ensure_ascii=False)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, ctype):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _enter(self):
+        """统计 + 延迟 + 失败注入；返回 False 表示本次已按失败处理。"""
+        stand = self.server.standin
+        delay, fail = stand.draw()
+        with stand.lock:
+            stand.requests[self.server.route] = stand.requests.get(self.server.route, 0) + 1
+            if fail:
+                stand.failures[self.server.route] = stand.failures.get(self.server.route, 0) + 1
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self._send(503, b"injected failure", "text/plain")
+            return False
+        return True
+
+    def do_GET(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if not self._enter():
+            return
+        route = self.server.route
+        stand = self.server.standin
+        if route.startswith("feed:"):
+            self._send(200, stand.bodies[route[5:]], "application/rss+xml; charset=utf-8")
+        elif route == "gnews":
+            self._send(200, stand.bodies["gnews.xml"], "application/xml; charset=utf-8")
+        elif route == "hn":
+            self._send(200, stand.bodies["hn.json"], "application/json; charset=utf-8")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self._enter():
+            return
+        route = self.server.route
+        if route == "ddg":
+            self._send(200, self.server.standin.bodies["ddg.html"], "text/html; charset=utf-8")
+        elif route == "llm" and self.path.endswith("/chat/completions"):
+            self._chat(json.loads(raw))
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def _chat(self, payload):
+        prompt = payload["messages"][-1]["content"]
+        report = self.server.standin.bodies["chat_report.md"].decode("utf-8")
+        if "候选：" in prompt:
+            content = _reduce_pick(prompt)
+        else:
+            m = re.search(r"第 (\d+) 个分片（共 (\d+) 片", prompt)
+            content = _map_draft(report, int(m.group(1)), int(m.group(2))) if m else report
+        usage = {"prompt_tokens": len(prompt) // 2, "completion_tokens": len(content) // 2}
+        if not payload.get("stream"):
+            body = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}],
+                               "usage": usage}, ensure_ascii=False).encode("utf-8")
+            self._send(200, body, "application/json; charset=utf-8")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        self.close_connection = True
+        for i in range(0, len(content), 64):
+            chunk = {"choices": [{"delta": {"content": content[i:i + 64]}}]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class StandIn:
+    """在 127.0.0.1 的随机端口上启动全部替身路由；start() 之后读取各 *_url 属性。"""
+
+    def __init__(self, feeds=24, latency=0.0, jitter=0.0, fail_rate=0.0, seed=0):
+        self.feeds = feeds
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.failures = {}
+        self._rnd = random.Random(seed)
+        self._servers = []
+        self.bodies = {}
+        self.feed_urls = []
+        self.gnews_url = self.hn_url = self.ddg_url = self.llm_base = ""
+
+    def draw(self):
+        with self.lock:
+            delay = self.latency + (self._rnd.random() * self.jitter if self.jitter else 0.0)
+            return delay, self._rnd.random() < self.fail_rate
+
+    def _serve(self, route):
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        srv.daemon_threads = True
+        srv.route = route
+        srv.standin = self
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        self._servers.append(srv)
+        return f"http://127.0.0.1:{srv.server_address[1]}"
+
+    def start(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for name in FEED_FILES + ("gnews.xml", "hn.json", "ddg.html", "chat_report.md"):
+            self.bodies[name] = render_fixture(name, now)
+        self.feed_urls = [self._serve("feed:" + FEED_FILES[i % len(FEED_FILES)]) + "/feed.xml"
+                          for i in range(self.feeds)]
+        self.gnews_url = self._serve("gnews") + "/rss/search"
+        self.hn_url = self._serve("hn") + "/api/v1/search"
+        self.ddg_url = self._serve("ddg") + "/lite/"
+        self.llm_base = self._serve("llm") + "/v1"
+        return self
+
+    def reset_counts(self):
+        with self.lock:
+            self.requests.clear()
+            self.failures.clear()
+
+    def stop(self):
+        for srv in self._servers:
+            srv.shutdown()
+            srv.server_close()
+        self._servers = []
+
+
+def main():
+    ap = argparse.ArgumentParser(description="离线替身服务（RSS / 检索 / Chat Completions）")
+    ap.add_argument("--feeds", type=int, default=24, help="feed 个数（每个一个端口）")
+    ap.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（毫秒）")
+    ap.add_argument("--jitter", type=float, default=0.0, help="附加随机延迟上限（毫秒）")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="返回 503 的概率")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    s = StandIn(args.feeds, args.latency, args.jitter, args.fail_rate, args.seed).start()
+    print(f"ANTHROPIC_BASE_URL={s.llm_base}")
+    print(f"GNEWS_URL={s.gnews_url}\nHN_URL={s.hn_url}\nDDG_URL={s.ddg_url}")
+    for url in s.feed_urls:
+        print(f"FEED {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        s.stop()
+
+
+if __name__ == "__main__":
+    main()
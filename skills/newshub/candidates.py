@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+候选素材库（ingest.py 全天轮询写入，generate.py 生成时只读最近 24 小时；SQLite，仅标准库）
+
+items    每条素材一行，主键为规范化链接；同一规范化标题只保留先到的一条（入库即去重）
+         first_seen 为首次抓到的时间（Unix 秒），窗口按它取
+sources  每个来源的轮询计划：下次轮询时间、当前间隔、连续失败次数、累计新增条数
+多进程安全：ingest 与 generate 可同时打开（WAL 模式，写入走短事务）。
+"""
+
+import time
+import sqlite3
+
+from seen_store import canonical_url, normalize_title
+
+
+class CandidateStore:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS items ("
+                        "url_key TEXT PRIMARY KEY, title_key TEXT NOT NULL, kind TEXT NOT NULL, "
+                        "source TEXT NOT NULL, title TEXT, url TEXT, content TEXT, published TEXT, "
+                        "first_seen REAL NOT NULL) WITHOUT ROWID")
+        self.db.execute("CREATE INDEX IF NOT EXISTS items_seen ON items(first_seen)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS items_title ON items(title_key)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sources ("
+                        "name TEXT PRIMARY KEY, next_at REAL NOT NULL, interval REAL NOT NULL, "
+                        "failures INTEGER NOT NULL DEFAULT 0, last_ok REAL, added INTEGER NOT NULL DEFAULT 0"
+                        ") WITHOUT ROWID")
+
+    def close(self):
+        self.db.close()
+
+    def add(self, items, kind, source, now=None):
+        """写入一批素材，返回新增条数；已有链接或同标题的条目跳过。"""
+        now = now or time.time()
+        added = 0
+        with self.db:
+            for it in items or []:
+                u = canonical_url(it.get("url"))
+                t = normalize_title(it.get("title"))
+                if not u or not t:
+                    continue
+                if self.db.execute("SELECT 1 FROM items WHERE title_key = ? LIMIT 1", (t,)).fetchone():
+                    continue
+                cur = self.db.execute(
+                    "INSERT OR IGNORE INTO items (url_key, title_key, kind, source, title, url, content, "
+                    "published, first_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (u, t, kind, source, it.get("title", ""), it.get("url", ""),
+                     it.get("content", ""), it.get("published", ""), now))
+                added += cur.rowcount
+        return added
+
+    def window(self, since):
+        """first_seen ≥ since 的素材，按 feed → 检索、再按入库先后排列（与 gather() 的合并顺序一致）。
+
+        origin 为抓到它的来源（feed 链接或检索词），与 gather() 的同名字段一致。
+        """
+        rows = self.db.execute("SELECT title, url, content, published, source, first_seen FROM items "
+                               "WHERE first_seen >= ? ORDER BY kind = 'search', first_seen", (since,))
+        return [{"title": r[0], "url": r[1], "content": r[2], "published": r[3], "origin": [r[4]],
+                 "first_seen": r[5]} for r in rows]
+
+    def last_poll(self):
+        """最近一次成功轮询的时间；从未轮询过返回 None。"""
+        row = self.db.execute("SELECT max(last_ok) FROM sources").fetchone()
+        return row[0] if row else None
+
+    def due(self, names, now=None):
+        """names 中已到轮询时间（或从未轮询过）的来源。"""
+        now = now or time.time()
+        sched = dict(self.db.execute("SELECT name, next_at FROM sources"))
+        return [n for n in names if sched.get(n, 0) <= now]
+
+    def next_wakeup(self, names):
+        rows = self.db.execute(f"SELECT min(next_at) FROM sources WHERE name IN "
+                               f"({','.join('?' * len(names))})", list(names)).fetchone()
+        return rows[0] if rows and rows[0] is not None else 0
+
+    def schedule(self, name, ok, added, base, lo, hi, now=None):
+        """更新来源的轮询计划。
+
+        成功且有新条目：间隔减半（不低于 lo）；成功但无新条目：间隔 ×1.5（不超过 hi）；
+        失败：按连续失败次数指数退避（不超过 hi）。首次轮询从 base 开始。
+        """
+        now = now or time.time()
+        row = self.db.execute("SELECT interval, failures FROM sources WHERE name = ?", (name,)).fetchone()
+        interval, failures = row if row else (base, 0)
+        if not ok:
+            failures += 1
+            wait = min(hi, base * 2 ** (failures - 1))
+        else:
+            failures = 0
+            interval = max(lo, interval / 2) if added else min(hi, interval * 1.5)
+            wait = interval
+        with self.db:
+            self.db.execute(
+                "INSERT INTO sources (name, next_at, interval, failures, last_ok, added) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+                "next_at = excluded.next_at, interval = excluded.interval, failures = excluded.failures, "
+                "last_ok = coalesce(excluded.last_ok, last_ok), added = added + excluded.added",
+                (name, now + wait, interval, failures, now if ok else None, added))
+        return wait
+
+    def prune(self, before):
+        """删除 first_seen 早于 before 的素材，返回删除行数。"""
+        with self.db:
+            cur = self.db.execute("DELETE FROM items WHERE first_seen < ?", (before,))
+        return cur.rowcount
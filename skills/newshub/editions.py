@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多版本配置：一次抓取、多份日报（editions.json，仅标准库）
+
+每个版本声明自己的来源、检索词、关键词过滤、提示词与条数。同一次运行里，所有版本的来源取并集，
+只抓取一轮、共用一个素材池；各版本从池中筛出自己的素材后并行调用大模型。
+没有配置文件时只有一个默认版本，与单版本时的行为一致。
+
+editions.json 是一个列表，每项一个版本；除 name 外的字段均可省略（省略取 generate.py 的默认值）：
+  name          版本名，用于日志、指标与默认文件名
+  title         一级标题，默认「AI 资讯 24 小时」
+  out_md        Markdown 文件名，{date} 替换为「YYYY年M月D日」；默认 <name>_{date}.md
+  out_html      HTML 文件名；默认 <name>.html
+  feeds         RSS 列表；省略为 FEEDS 全部，[] 表示不用 RSS
+  queries       检索词列表；省略为 QUERIES 全部，[] 表示不检索
+  include       关键词列表，标题或摘要命中任意一个才保留（不区分大小写）
+  exclude       关键词列表，命中任意一个即剔除
+  prompt        提示词模板文件（相对配置文件所在目录），占位符同 PROMPT：
+                __DATE__ __TITLE__ __N__ __SECTIONS__ __FORMAT__ __DEDUP__ __CONTEXT__
+  sections      [[分区名, 二级标题], ...]，默认 AI 技术 / AI 应用 / AI 行业动态
+  target        条数，默认 20
+  window_hours  素材时间窗（小时），默认 24；只对候选素材库生效（见 ingest.py），
+                周报一类的长窗口需同时调大 NEWS_INGEST_KEEP_HOURS
+  seen_db       已发布索引（相对配置文件所在目录），跨日去重；默认为主版本索引同目录下的
+                seen_<name>.sqlite3，"" 表示不去重
+  shards        map-reduce 分片数，默认 NEWS_LLM_SHARDS
+列表中的第一个版本为主版本：文件名、索引默认沿用单版本时的 AI资讯24小时_{date}.md、index.html 与 NEWS_SEEN_DB。
+"""
+
+import os
+import json
+
+DEFAULT_NAME = "daily"  # 没有配置文件时唯一版本的名字
+FIELDS = ("title", "out_md", "out_html", "feeds", "queries", "include", "exclude", "prompt",
+          "sections", "target", "window_hours", "seen_db", "shards")
+
+
+class Edition:
+    """一个版本的完整配置（默认值已填好）。"""
+
+    def __init__(self, name, **fields):
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"版本 {name!r} 含未知字段：{', '.join(sorted(unknown))}")
+        self.name = name
+        for k in FIELDS:
+            setattr(self, k, fields.get(k))
+        self.include = [w.lower() for w in self.include or []]
+        self.exclude = [w.lower() for w in self.exclude or []]
+        self._sources = set(self.feeds or []) | set(self.queries or [])
+
+    def __repr__(self):
+        return f"Edition({self.name!r})"
+
+    def wants(self, it):
+        """素材是否来自本版本的来源，且通过关键词过滤。"""
+        if not self._sources.intersection(it.get("origin") or ()):
+            return False
+        if not (self.include or self.exclude):
+            return True
+        text = f"{it.get('title', '')} {it.get('content', '')}".lower()
+        if self.include and not any(w in text for w in self.include):
+            return False
+        return not any(w in text for w in self.exclude)
+
+    def md_path(self, date_str):
+        return self.out_md.replace("{date}", date_str)
+
+
+def load(path, defaults, primary=None, seen_dir=None):
+    """读取 path（为空或不存在则只有默认版本），按 defaults 补齐字段，返回 [Edition, ...]。
+
+    primary 为主版本（第一个）额外的默认值，如沿用 AI资讯24小时_{date}.md / index.html / NEWS_SEEN_DB；
+    seen_dir 为其他版本默认索引所在目录，None 表示其他版本默认不做跨日去重。
+    """
+    base_dir = os.path.dirname(os.path.abspath(path)) if path else "."
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            specs = json.load(f)
+        if not isinstance(specs, list) or not specs:
+            raise ValueError(f"{path} 应为非空列表")
+    else:
+        specs = [{"name": DEFAULT_NAME}]
+    names = set()
+    out = []
+    for i, spec in enumerate(specs):
+        spec = dict(spec)
+        name = spec.pop("name", None)
+        if not name or name in names:
+            raise ValueError(f"{path} 第 {i + 1} 个版本缺少 name 或与前面重名")
+        names.add(name)
+        fields = dict(defaults)
+        fields.update({"out_md": f"{name}_{{date}}.md", "out_html": f"{name}.html",
+                       "seen_db": os.path.join(seen_dir, f"seen_{name}.sqlite3") if seen_dir else None})
+        if i == 0 and primary:
+            fields.update(primary)
+        fields.update(spec)
+        if fields.get("prompt"):
+            with open(os.path.join(base_dir, fields["prompt"]), encoding="utf-8") as f:
+                fields["prompt"] = f.read()
+        if fields.get("seen_db"):
+            fields["seen_db"] = os.path.join(base_dir, fields["seen_db"])
+        fields["sections"] = [tuple(s) for s in fields["sections"]]
+        out.append(Edition(name, **fields))
+    return out
+
+
+def sources(editions):
+    """各版本来源的并集（保持首次出现的顺序）：(feeds, queries)。"""
+    feeds, queries = {}, {}
+    for ed in editions:
+        feeds.update(dict.fromkeys(ed.feeds or []))
+        queries.update(dict.fromkeys(ed.queries or []))
+    return list(feeds), list(queries)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原文正文抽取 + 磁盘缓存（仅标准库）
+
+extract(html)  轻量 readability：跳过 script / style / nav / header / footer / aside / form 等区域，
+               按块级元素切段；每段按长度与逗号数打分、乘以 (1 - 链接文字占比)，
+               分数全额记给所在容器、一半记给上一层容器，取得分最高的容器，
+               按文档顺序输出其中的非导航段落。
+TextCache      每篇文章一个 JSON（文件名为规范化链接的 sha1）：url / text / size / fetched
+               抽取失败也记一条空文本，fail_ttl 内不再重试同一个打不开的页面。
+               get_or_fetch() 对同一链接加锁：多个版本同时要同一篇文章时只下载、解析一次。
+               prune() 先删抓取超过 max_age 的，再从最早抓取的开始淘汰到 max_bytes 以内（新闻正文不会变，不做再验证）。
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from html.parser import HTMLParser
+
+from seen_store import canonical_url
+
+SKIP = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form",
+        "button", "select", "iframe", "figcaption"}
+BLOCK = {"p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "td", "tr", "table",
+         "article", "section", "main", "blockquote", "pre", "br", "dd", "dt", "figure"}
+CONTAINER = {"div", "article", "section", "main", "td", "body", "blockquote", "ul", "ol"}
+VOID = {"br", "img", "hr", "meta", "link", "input", "source", "wbr", "area", "col", "embed"}
+MIN_PARAGRAPH = 25  # 字符；更短的段落（按钮、署名、面包屑）不参与打分
+_COMMA = re.compile(r"[,，、;；]")
+_SPACE = re.compile(r"\s+")
+_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+
+
+class _Parser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = [(0, "root")]  # (容器编号, 标签)
+        self.next_id = 1
+        self.skip = 0
+        self.in_link = 0
+        self.buf, self.link_chars = [], 0
+        self.paragraphs = []  # (文本, 链接字数, 祖先容器编号元组)
+
+    def flush(self):
+        text = _SPACE.sub(" ", "".join(self.buf)).strip()
+        if len(text) >= MIN_PARAGRAPH:
+            self.paragraphs.append((text, self.link_chars, tuple(c for c, _ in self.stack)))
+        self.buf, self.link_chars = [], 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP:
+            self.skip += 1
+            return
+        if self.skip:
+            return
+        if tag in BLOCK:
+            self.flush()
+        if tag == "a":
+            self.in_link += 1
+        if tag in CONTAINER:
+            self.stack.append((self.next_id, tag))
+            self.next_id += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP:
+            self.skip = max(0, self.skip - 1)
+            return
+        if self.skip or tag in VOID:
+            return
+        if tag in BLOCK:
+            self.flush()
+        if tag == "a":
+            self.in_link = max(0, self.in_link - 1)
+        if tag in CONTAINER and any(t == tag for _, t in self.stack[1:]):
+            while self.stack[-1][1] != tag:  # 容忍未闭合的内层标签
+                self.stack.pop()
+            self.stack.pop()
+
+    def handle_data(self, data):
+        if self.skip:
+            return
+        self.buf.append(data)
+        if self.in_link:
+            self.link_chars += len(data.strip())
+
+
+def extract(html):
+    """从网页 HTML 抽出正文段落，段落之间以换行分隔；找不到像样的正文时返回空串。"""
+    p = _Parser()
+    try:
+        p.feed(html)
+        p.close()
+    except Exception:  # html.parser 对极端畸形的页面会抛错，按已解析部分处理
+        pass
+    p.flush()
+    scores = {}
+    for text, links, chain in p.paragraphs:
+        density = links / len(text)
+        s = (1 + len(_COMMA.findall(text)) + min(len(text) / 100, 3)) * (1 - density)
+        scores[chain[-1]] = scores.get(chain[-1], 0) + s
+        if len(chain) > 1:
+            scores[chain[-2]] = scores.get(chain[-2], 0) + s / 2
+    if not scores:
+        return ""
+    best = max(scores, key=scores.get)
+    return "\n".join(text for text, links, chain in p.paragraphs
+                     if best in chain and links / len(text) < 0.5)
+
+
+def decode(body, content_type=""):
+    """按响应头或 <meta charset> 解码，都没有时按 UTF-8（坏字节替换）。"""
+    m = re.search(r"charset=([\w-]+)", content_type or "", re.I) or _CHARSET.search(body[:4096])
+    charset = m.group(1) if m else "utf-8"
+    if isinstance(charset, bytes):
+        charset = charset.decode("ascii", "ignore")
+    try:
+        return body.decode(charset, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+class TextCache:
+    def __init__(self, root, max_bytes=32 * 1024 * 1024, max_age=7 * 86400, fail_ttl=6 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.fail_ttl = fail_ttl
+        self._lock = threading.Lock()
+        self._keys = {}
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        """命中返回正文（抽取失败记为 ""），未命中或已过期返回 None。"""
+        key = canonical_url(url)
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != key:
+            return None
+        if not meta.get("text") and time.time() - meta.get("fetched", 0) > self.fail_ttl:
+            return None
+        return meta.get("text") or ""
+
+    def put(self, url, text):
+        key = canonical_url(url)
+        path = self._path(key)
+        data = json.dumps({"url": key, "text": text, "size": len(text.encode("utf-8")),
+                           "fetched": time.time()}, ensure_ascii=False)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get_or_fetch(self, url, fetch):
+        """返回 (正文, 是否命中缓存)；未命中时调用 fetch(url) 并写缓存。同一链接同时只有一个线程在抓。"""
+        key = canonical_url(url)
+        with self._lock:
+            lock = self._keys.setdefault(key, threading.Lock())
+        with lock:
+            text = self.get(url)
+            if text is not None:
+                return text, True
+            try:
+                text = fetch(url) or ""
+            except Exception as e:
+                print(f"fulltext error {url}: {e}")
+                text = ""
+            self.put(url, text)
+            return text, False
+
+    def prune(self):
+        """按年龄与总大小淘汰条目，返回删除的条目数。"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    meta = {}
+                entries.append((meta.get("fetched", 0), meta.get("size", 0), path))
+            entries.sort(reverse=True)
+            now = time.time()
+            total, removed = 0, 0
+            for fetched, size, path in entries:
+                if now - fetched <= self.max_age and total + size <= self.max_bytes:
+                    total += size
+                    continue
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            return removed
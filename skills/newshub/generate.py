@@ -15,30 +15,416 @@
   ANTHROPIC_BASE_URL  必填，网关基址，如 https://api.agnes-ai.cn/v1
   ANTHROPIC_MODEL     模型名，默认 agnes-2.0-flash
   TAVILY_API_KEY      可选，搜索源；不填则退化为免 key 检索
+  NEWS_GATHER_WORKERS   可选，检索并发线程数，默认 8；设为 1 即退回串行
+  NEWS_HOST_CONCURRENCY 可选，同一 host 的最大并发连接数，默认 2
+  NEWS_HTTP_CACHE       可选，设为 0 关闭 RSS 条件 GET 缓存
+  NEWS_CACHE_DIR        可选，缓存与索引的根目录，默认 ~/.cache/newshub（不放在本目录：本目录整个发布到 gh-pages）
+  NEWS_HTTP_CACHE_DIR   可选，缓存目录，默认 <NEWS_CACHE_DIR>/http
+  NEWS_HTTP_CACHE_MB    可选，缓存总大小上限（MB），默认 64
+  NEWS_HTTP_CACHE_DAYS  可选，条目多少天未使用即淘汰，默认 7
+  NEWS_FEED_PARSER      可选，stream（默认，增量解析、够数即停）或 tree（整篇 DOM 解析）
+  NEWS_SEEN_DB          可选，已发布资讯索引（SQLite），默认 <NEWS_CACHE_DIR>/seen_items.sqlite3
+  NEWS_SEEN_DAYS        可选，跨日去重窗口天数，默认 3
+  NEWS_DEDUP            可选，设为 0 关闭候选素材近似去重（同事件多来源聚类）
+  NEWS_WINDOW_GRACE_HOURS 可选，按发布时间过滤时在版本时间窗（默认 24 小时）之外再放宽的小时数，默认 6
+  NEWS_UNDATED          可选，没有发布时间的素材：keep（默认，保留、新鲜度按中等计）或 drop（剔除）
+  NEWS_RECENCY_HALF_LIFE 可选，排序时新鲜度减半的小时数，默认 24
+  NEWS_CONTEXT_TOKENS   可选，素材区 token 预算，默认 16000（按相关度/新鲜度/来源多样性排序后装箱）
+  NEWS_MIN_SUMMARY_TOKENS 可选，每条素材摘要至少保留的 token 数，默认 40
+  NEWS_LLM_STREAM       可选，设为 1 以 SSE 流式接收（边收边写 <报告>.partial，失败也保留已生成部分）
+  NEWS_LLM_SHARDS       可选，>1 时走 map-reduce：素材分片并行初选成稿，再由一次轻量调用合并、定稿分区
+  NEWS_LLM_IDLE_TIMEOUT 可选，流式接收时两次数据之间的最长等待秒数，默认 90
+  NEWS_LLM_TIMEOUT      可选，主模型非流式调用的超时秒数，默认 300
+  NEWS_TRIAGE           可选，两级模型的初筛：off（默认）/ llm（便宜模型分批打分、标分区）/ local（本地启发式）
+  NEWS_TRIAGE_MODEL     可选，初筛模型名，默认同 ANTHROPIC_MODEL
+  NEWS_TRIAGE_TIMEOUT   可选，每批初筛调用的超时秒数，默认 60（超时或失败的批次改用本地打分）
+  NEWS_TRIAGE_BATCH     可选，每批初筛的素材条数，默认 25；各批并行
+  NEWS_TRIAGE_KEEP      可选，初筛入围、交给主模型成稿的素材条数，默认 30
+  NEWS_LLM_CACHE        可选，LLM 响应缓存：on（默认）/ replay（只回放，未命中报错）/ refresh / off
+  NEWS_LLM_CACHE_HOURS  可选，缓存有效期（小时），默认 48
+  NEWS_QUERY_DEADLINE   可选，单个关键词检索的截止秒数，默认 20（各搜索源超时取剩余时间）
+  NEWS_HEDGE_DELAY      可选，上一层搜索源多少秒内未出结果就对冲发出下一层，默认 3
+  NEWS_CANDIDATES       可选，设为 0 时不读 ingest.py 的候选素材库，总是现场抓取
+  NEWS_CANDIDATE_DB     可选，候选素材库路径，默认 <NEWS_CACHE_DIR>/candidates.sqlite3
+  NEWS_CANDIDATE_FRESH_HOURS 可选，候选库最近一次轮询距今超过该小时数即视为过期、回退现场抓取，默认 2
+  NEWS_FULLTEXT_TOP     可选，对排序最靠前的多少条素材抓取原文正文替换摘要，默认 0（关闭），建议 30
+  NEWS_FULLTEXT_TOKENS  可选，每条原文正文截取的 token 数，默认 350
+  NEWS_FULLTEXT_CACHE_DAYS 可选，正文缓存（<NEWS_CACHE_DIR>/fulltext，按规范化链接）保留天数，默认 7
+  NEWS_REPAIR_ROUNDS    可选，成稿校验后逐条修补的轮数（缺条、缺分区、正文过短、缺原文链接），默认 2，0 为关闭
+  NEWS_MIN_BODY_CHARS   可选，校验时每条正文至少的字数，默认 200
+  NEWS_RESOLVE          可选，设为 0 时不解析聚合 / 短链（news.google.com 等）的原始链接
+  NEWS_RESOLVE_DAYS     可选，链接映射（<NEWS_CACHE_DIR>/urlmap.sqlite3）有效天数，默认 30；解析失败的 1 天后再试
+  NEWS_RUN_BUDGET       可选，整次运行的时间预算（秒），默认 1200，0 为不限；各请求超时取剩余时间，
+                        剩余不足时跳过可选阶段（初筛模型、原文正文、逐条修补），保证按时交付
+  NEWS_GATHER_CUTOFF    可选，抓取阶段的截止（从运行开始计，秒），默认 240；到点未返回的来源放弃，
+                        用已到的素材生成。来源按历史表现（<NEWS_CACHE_DIR>/sources.sqlite3）排定抓取顺序
+  NEWS_STATE            可选，状态快照路径（见 state.py）：各缓存与索引本地不存在时，首次用到才从快照恢复
+  NEWS_STATE_MB         可选，python state.py save 写出的快照大小上限（MB，压缩后），默认 48
+  NEWS_EDITIONS         可选，多版本配置文件（见 editions.py），默认 <本目录>/editions.json；不存在则只生成默认版本
+
+作为库使用（导入本模块不读密钥、不建目录、不开连接；日期与输出目录按次传入）：
+  cfg = generate.Config(api_key=..., base_url=...)        # 只返回 Report，不写文件、不读写跨日索引
+  rep = generate.generate_report(datetime.date(2026, 8, 13), cfg)
+  generate.generate_report(config=generate.Config.from_env())   # 与命令行相同
+同一进程里多次调用时，抓取连接池、HTTP 缓存与 LLM 连接都会复用。
 """
 
+import io
 import os
+import copy
+import json
+import time
 import re
 import glob
 import datetime
+import contextlib
+import functools
+import threading
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
 import requests
+from requests.adapters import HTTPAdapter
 
-API_KEY = os.environ.get("ANTHROPIC_API_KEY")
-BASE_URL = (os.environ.get("ANTHROPIC_BASE_URL") or "https://api.agnes-ai.cn/v1").rstrip("/")
-MODEL = os.environ.get("ANTHROPIC_MODEL") or "agnes-2.0-flash"
-CHAT_ENDPOINT = BASE_URL + "/chat/completions"
+from httpcache import HttpCache
+from seen_store import SeenStore, canonical_url, strip_tracking
+from dedup import cluster, tokens as title_tokens
+from ranking import pack, rank, estimate_tokens, clip_tokens
+import triage as triage_tier
+import pubdate
+from fulltext import TextCache, extract, decode as decode_html
+from resolver import UrlMap, needs_resolution, find_canonical
+from llm_cache import LLMCache, request_key
+from providers import FanOut
+from report import Report, Section, parse, render_html, validate, body_chars, set_count_line
+from metrics import Metrics, profile
+from candidates import CandidateStore
+import editions
+import state
+from schedule import Deadline, SourceStats, order as schedule_order, source_state, max_items as source_max_items
 
-if not API_KEY:
-    raise SystemExit("ERROR: 环境变量 ANTHROPIC_API_KEY 未设置")
-if not BASE_URL:
-    raise SystemExit("ERROR: 环境变量 ANTHROPIC_BASE_URL 未设置")
+DEFAULT_BASE_URL = "https://api.agnes-ai.cn/v1"
+DEFAULT_MODEL = "agnes-2.0-flash"
 
-DATE = datetime.date.today()
-DATE_STR = f"{DATE.year}年{DATE.month}月{DATE.day}日"
-OUT_MD = f"AI资讯24小时_{DATE_STR}.md"
+REPORT_TITLE = "AI 资讯 24 小时"
+REPORT_MD = "AI资讯24小时_{date}.md"  # {date} 为 date_label()
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# 以下可调参数只是 Config 的默认值；环境变量只在 Config.from_env() 里读
+GATHER_WORKERS = 8
+HOST_CONCURRENCY = 2
+FEED_PARSER = "stream"
+SEEN_DAYS = 3
+MAX_CONTEXT_ITEMS = 100
+TRIAGE_MAX_ITEMS = 200  # 初筛最多读的候选条数（按排序取前若干）
+TRIAGE_WORKERS = 8
+CONTEXT_TOKENS = 16000
+LLM_IDLE_TIMEOUT = 90
+TARGET_ITEMS = 20
+SECTION_HEADERS = [("AI 技术", "一、AI 技术"), ("AI 应用", "二、AI 应用"), ("AI 行业动态", "三、AI 行业动态")]
+MIN_SUMMARY_TOKENS = 40
+CANDIDATE_FRESH_HOURS = 2
+FULLTEXT_TOKENS = 350
+FULLTEXT_MAX_BYTES = 3 * 1024 * 1024
+FULLTEXT_SKIP_HOSTS = {"news.google.com"}  # 跳转页靠脚本跳到原文，抓不到正文
+WINDOW_HOURS = 24
+REPAIR_ROUNDS = 2
+MIN_BODY_CHARS = 200
+WINDOW_GRACE_HOURS = 6
+RECENCY_HALF_LIFE = 24
+QUERY_DEADLINE = 20
+HEDGE_DELAY = 3
+REPORT_TZ = datetime.timezone(datetime.timedelta(hours=8))  # 提示词里的发布时间按北京时间给出
+STATE_MAX_MB = 48
+# 缓存与索引不放在本目录：本目录整个发布到 gh-pages
+DEFAULT_CACHE_DIR = os.path.join("~", ".cache", "newshub")
+LLM_RESERVE = 180  # 剩余预算低于此秒数时跳过生成前的可选阶段，留给主模型成稿
+REPAIR_RESERVE = 60  # 剩余预算低于此秒数时不再发修补请求
+LLM_MIN_TIMEOUT = 60  # 预算用尽时主模型调用仍至少给这么多秒
+
+
+def date_label(date):
+    return f"{date.year}年{date.month}月{date.day}日"
+
+
+class Config:
+    """一次生成的外部设置：generate_report() 只读这里，不读环境变量。
+
+    api_key / base_url / model  LLM 网关
+    out_dir       Markdown / HTML 写到哪个目录；None 表示不写文件，只返回 Report
+    seen_db       主版本的已发布索引（跨日去重）；None 表示不去重、不记录。
+                  其他版本默认用同目录下的 seen_<name>.sqlite3
+    candidate_db  ingest.py 的候选素材库；use_candidates 为假时不读，总是现场抓取
+    editions      [Edition, ...] 或 editions.json 路径；None 为单个默认版本
+    llm_stream / llm_shards  同 NEWS_LLM_STREAM / NEWS_LLM_SHARDS
+    llm_timeout   主模型非流式调用的超时秒数
+    triage        初筛："off" / "llm" / "local"；triage_model（None 为同 model）、triage_timeout、
+                  triage_batch、triage_keep 同 NEWS_TRIAGE_* 环境变量
+    fulltext_top  对排序前多少条素材抓原文正文，0 为关闭（同 NEWS_FULLTEXT_TOP）
+    run_budget / gather_cutoff  整次运行的时间预算与抓取阶段截止（秒，0 为不限；同 NEWS_RUN_BUDGET /
+                  NEWS_GATHER_CUTOFF）。deadline 由 generate_editions() 在本次运行的副本上设置，构造时为 None
+    metrics       指标（metrics.Metrics）；generate_editions() 在本次运行的副本上换成该次运行自己的一份，
+                  同一进程里并发的多次运行互不串数
+    cache_dir     HTTP / LLM / 正文缓存、链接映射与来源统计的根目录；None 表示不落盘（不缓存、不记来源历史）
+    state_path / state_max_mb  状态快照（见 state.py）：缓存本地不存在时首次用到从它恢复；save_state 的大小上限
+    http_cache / http_cache_dir / http_cache_mb / http_cache_days  RSS 条件 GET 缓存（目录默认 <cache_dir>/http）
+    llm_cache / llm_cache_hours   LLM 响应缓存模式（on / replay / refresh / off）与有效期
+    fulltext_cache_days / resolve_links / resolve_days  正文缓存保留天数、是否解析聚合链接与映射有效天数
+    其余字段与同名的 NEWS_* 环境变量一一对应（见模块文档），默认值为模块里的同名常量。
+    直接构造得到的是「无状态」配置；Config.from_env() 按环境变量构建，与命令行行为一致。
+    """
+
+    def __init__(self, api_key=None, base_url=DEFAULT_BASE_URL, model=DEFAULT_MODEL, out_dir=None,
+                 seen_db=None, candidate_db=None, use_candidates=False, editions=None,
+                 llm_stream=False, llm_shards=0, fulltext_top=0, llm_timeout=300, triage="off",
+                 triage_model=None, triage_timeout=60, triage_batch=25, triage_keep=30, run_budget=0,
+                 gather_cutoff=0, cache_dir=None, state_path=None, state_max_mb=STATE_MAX_MB, http_cache=True,
+                 http_cache_dir=None, http_cache_mb=64, http_cache_days=7, llm_cache="on", llm_cache_hours=48,
+                 fulltext_cache_days=7, resolve_links=True, resolve_days=30, gather_workers=GATHER_WORKERS,
+                 host_concurrency=HOST_CONCURRENCY, feed_parser=FEED_PARSER, query_deadline=QUERY_DEADLINE,
+                 hedge_delay=HEDGE_DELAY, seen_days=SEEN_DAYS, near_dedup=True,
+                 window_grace_hours=WINDOW_GRACE_HOURS, undated="keep", recency_half_life=RECENCY_HALF_LIFE,
+                 context_tokens=CONTEXT_TOKENS, min_summary_tokens=MIN_SUMMARY_TOKENS,
+                 llm_idle_timeout=LLM_IDLE_TIMEOUT, candidate_fresh_hours=CANDIDATE_FRESH_HOURS,
+                 fulltext_tokens=FULLTEXT_TOKENS, repair_rounds=REPAIR_ROUNDS, min_body_chars=MIN_BODY_CHARS):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.out_dir = out_dir
+        self.seen_db = seen_db
+        self.candidate_db = candidate_db
+        self.use_candidates = use_candidates and bool(candidate_db)
+        self.editions = editions
+        self.llm_stream = llm_stream
+        self.llm_shards = llm_shards
+        self.fulltext_top = fulltext_top
+        self.llm_timeout = llm_timeout
+        if triage not in ("off", "llm", "local"):
+            raise ValueError(f"triage 只能是 off / llm / local，收到 {triage!r}")
+        self.triage = triage
+        self.triage_model = triage_model or model
+        self.triage_timeout = triage_timeout
+        self.triage_batch = triage_batch
+        self.triage_keep = triage_keep
+        self.run_budget = run_budget
+        self.gather_cutoff = gather_cutoff
+        self.deadline = None
+        self.metrics = Metrics()
+        self.cache_dir = cache_dir
+        self.state_path = state_path
+        self.state_max_mb = state_max_mb
+        self.http_cache = http_cache
+        self.http_cache_dir = http_cache_dir or self.cache_path("http")
+        self.http_cache_mb = http_cache_mb
+        self.http_cache_days = http_cache_days
+        self.llm_cache = llm_cache
+        self.llm_cache_hours = llm_cache_hours
+        self.fulltext_cache_days = fulltext_cache_days
+        self.resolve_links = resolve_links
+        self.resolve_days = resolve_days
+        self.gather_workers = gather_workers
+        self.host_concurrency = host_concurrency
+        if feed_parser not in ("stream", "tree"):
+            raise ValueError(f"feed_parser 只能是 stream / tree，收到 {feed_parser!r}")
+        self.feed_parser = feed_parser
+        self.query_deadline = query_deadline
+        self.hedge_delay = hedge_delay
+        self.seen_days = seen_days
+        self.near_dedup = near_dedup
+        self.window_grace_hours = window_grace_hours
+        self.undated = undated
+        self.recency_half_life = recency_half_life
+        self.context_tokens = context_tokens
+        self.min_summary_tokens = min_summary_tokens
+        self.llm_idle_timeout = llm_idle_timeout
+        self.candidate_fresh_hours = candidate_fresh_hours
+        self.fulltext_tokens = fulltext_tokens
+        self.repair_rounds = repair_rounds
+        self.min_body_chars = min_body_chars
+
+    def cache_path(self, name):
+        """cache_dir 下的路径；无状态配置（cache_dir 为 None）时为 None。"""
+        return os.path.join(self.cache_dir, name) if self.cache_dir else None
+
+    @property
+    def chat_endpoint(self):
+        return self.base_url + "/chat/completions"
+
+    @classmethod
+    def from_env(cls, **overrides):
+        env = os.environ
+        cache_dir = env.get("NEWS_CACHE_DIR") or os.path.expanduser(DEFAULT_CACHE_DIR)
+        kw = {
+            "api_key": env.get("ANTHROPIC_API_KEY"),
+            "base_url": env.get("ANTHROPIC_BASE_URL") or DEFAULT_BASE_URL,
+            "model": env.get("ANTHROPIC_MODEL") or DEFAULT_MODEL,
+            "out_dir": ".",
+            "seen_db": env.get("NEWS_SEEN_DB") or os.path.join(cache_dir, "seen_items.sqlite3"),
+            "candidate_db": env.get("NEWS_CANDIDATE_DB") or os.path.join(cache_dir, "candidates.sqlite3"),
+            "use_candidates": env.get("NEWS_CANDIDATES") != "0",
+            "editions": env.get("NEWS_EDITIONS") or os.path.join(SCRIPT_DIR, "editions.json"),
+            "llm_stream": env.get("NEWS_LLM_STREAM") == "1",
+            "llm_shards": int(env.get("NEWS_LLM_SHARDS") or 0),
+            "fulltext_top": int(env.get("NEWS_FULLTEXT_TOP") or 0),
+            "llm_timeout": int(env.get("NEWS_LLM_TIMEOUT") or 300),
+            "triage": env.get("NEWS_TRIAGE") or "off",
+            "triage_model": env.get("NEWS_TRIAGE_MODEL") or None,
+            "triage_timeout": int(env.get("NEWS_TRIAGE_TIMEOUT") or 60),
+            "triage_batch": int(env.get("NEWS_TRIAGE_BATCH") or 25),
+            "triage_keep": int(env.get("NEWS_TRIAGE_KEEP") or 30),
+            "run_budget": float(env.get("NEWS_RUN_BUDGET") or 1200),
+            "gather_cutoff": float(env.get("NEWS_GATHER_CUTOFF") or 240),
+            "cache_dir": cache_dir,
+            "state_path": env.get("NEWS_STATE") or None,
+            "state_max_mb": int(env.get("NEWS_STATE_MB") or STATE_MAX_MB),
+            "http_cache": env.get("NEWS_HTTP_CACHE") != "0",
+            "http_cache_dir": env.get("NEWS_HTTP_CACHE_DIR") or None,
+            "http_cache_mb": int(env.get("NEWS_HTTP_CACHE_MB") or 64),
+            "http_cache_days": int(env.get("NEWS_HTTP_CACHE_DAYS") or 7),
+            "llm_cache": env.get("NEWS_LLM_CACHE") or "on",
+            "llm_cache_hours": int(env.get("NEWS_LLM_CACHE_HOURS") or 48),
+            "fulltext_cache_days": int(env.get("NEWS_FULLTEXT_CACHE_DAYS") or 7),
+            "resolve_links": env.get("NEWS_RESOLVE") != "0",
+            "resolve_days": int(env.get("NEWS_RESOLVE_DAYS") or 30),
+            "gather_workers": int(env.get("NEWS_GATHER_WORKERS") or GATHER_WORKERS),
+            "host_concurrency": int(env.get("NEWS_HOST_CONCURRENCY") or HOST_CONCURRENCY),
+            "feed_parser": env.get("NEWS_FEED_PARSER") or FEED_PARSER,
+            "query_deadline": float(env.get("NEWS_QUERY_DEADLINE") or QUERY_DEADLINE),
+            "hedge_delay": float(env.get("NEWS_HEDGE_DELAY") or HEDGE_DELAY),
+            "seen_days": int(env.get("NEWS_SEEN_DAYS") or SEEN_DAYS),
+            "near_dedup": env.get("NEWS_DEDUP") != "0",
+            "window_grace_hours": float(env.get("NEWS_WINDOW_GRACE_HOURS") or WINDOW_GRACE_HOURS),
+            "undated": env.get("NEWS_UNDATED") or "keep",
+            "recency_half_life": float(env.get("NEWS_RECENCY_HALF_LIFE") or RECENCY_HALF_LIFE),
+            "context_tokens": int(env.get("NEWS_CONTEXT_TOKENS") or CONTEXT_TOKENS),
+            "min_summary_tokens": int(env.get("NEWS_MIN_SUMMARY_TOKENS") or MIN_SUMMARY_TOKENS),
+            "llm_idle_timeout": int(env.get("NEWS_LLM_IDLE_TIMEOUT") or LLM_IDLE_TIMEOUT),
+            "candidate_fresh_hours": float(env.get("NEWS_CANDIDATE_FRESH_HOURS") or CANDIDATE_FRESH_HOURS),
+            "fulltext_tokens": int(env.get("NEWS_FULLTEXT_TOKENS") or FULLTEXT_TOKENS),
+            "repair_rounds": int(env.get("NEWS_REPAIR_ROUNDS") or REPAIR_ROUNDS),
+            "min_body_chars": int(env.get("NEWS_MIN_BODY_CHARS") or MIN_BODY_CHARS),
+        }
+        kw.update(overrides)
+        return cls(**kw)
+
+
+# 进程内共享、首次使用时才创建（导入本模块不建目录、不开连接）；按路径区分，长驻进程里同一份配置多次生成复用同一份
+_lazy = {}
+_lazy_lock = threading.Lock()
+
+
+def _shared(key, factory):
+    with _lazy_lock:
+        if key not in _lazy:
+            _lazy[key] = factory()
+        return _lazy[key]
+
+
+def _metrics(cfg):
+    """cfg 上的指标；不传 cfg 的直接调用（如单独 fetch_feed）记到一份用完即弃的 Metrics。"""
+    return cfg.metrics if cfg is not None else Metrics()
+
+
+def warm(name, path, cfg):
+    """path 本地还没有时从 cfg.state_path 快照恢复 name 段（缓存与索引第一次被用到时调用）。"""
+    if cfg.state_path and state.restore(cfg.state_path, name, path):
+        print(f"状态快照：恢复 {name} -> {path}")
+
+
+def http_cache(cfg):
+    """RSS 条件 GET 缓存；关闭或无状态配置时为 None。"""
+    root = cfg.http_cache_dir
+    if not (cfg.http_cache and root):
+        return None
+
+    def make():
+        warm("http", root, cfg)
+        return HttpCache(root, max_bytes=cfg.http_cache_mb * 1024 * 1024, max_age=cfg.http_cache_days * 86400)
+    return _shared(("http_cache", root), make)
+
+
+def text_cache(cfg):
+    """原文正文缓存（按规范化链接，跨运行、跨版本共用）；无状态配置时为 None。"""
+    root = cfg.cache_path("fulltext")
+    if not root:
+        return None
+
+    def make():
+        warm("fulltext", root, cfg)
+        return TextCache(root, max_age=cfg.fulltext_cache_days * 86400)
+    return _shared(("text_cache", root), make)
+
+
+def url_map(cfg):
+    """聚合 / 短链 → 原始链接的持久映射（跨运行共用，ingest.py 也写它）；无状态配置时为 None。"""
+    path = cfg.cache_path("urlmap.sqlite3")
+    if not path:
+        return None
+
+    def make():
+        warm("urlmap", path, cfg)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return UrlMap(path, max_age=cfg.resolve_days * 86400)
+    return _shared(("url_map", path), make)
+
+
+def source_stats(cfg):
+    """各来源跨运行的耗时 / 条数 / 成功率，决定抓取顺序；无状态配置时为 None（不排序、不记历史）。"""
+    path = cfg.cache_path("sources.sqlite3")
+    if not path:
+        return None
+
+    def make():
+        warm("sources", path, cfg)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SourceStats(path)
+    return _shared(("source_stats", path), make)
+
+
+def llm_cache(cfg):
+    """LLM 响应缓存；无状态配置时按 off 处理。"""
+    root = cfg.cache_path("llm")
+    mode = cfg.llm_cache if root else "off"
+
+    def make():
+        if mode != "off":
+            warm("llm", root, cfg)
+        return LLMCache(root, mode=mode, ttl=cfg.llm_cache_hours * 3600)
+    return _shared(("llm_cache", root, mode, cfg.llm_cache_hours), make)
+
+
+def state_sections(cfg):
+    """快照覆盖的缓存与索引：{段名: (类型, 本地路径)}；已发布索引每个版本一段。"""
+    sections = {}
+    if cfg.http_cache_dir:
+        sections["http"] = ("dir", cfg.http_cache_dir)
+    if cfg.cache_dir:
+        sections.update({"llm": ("dir", cfg.cache_path("llm")), "fulltext": ("dir", cfg.cache_path("fulltext")),
+                         "urlmap": ("sqlite", cfg.cache_path("urlmap.sqlite3")),
+                         "sources": ("sqlite", cfg.cache_path("sources.sqlite3")),
+                         "email": ("dir", cfg.cache_path("email"))})  # push_email.py 的断点续发进度
+    if cfg.candidate_db:
+        sections["candidates"] = ("sqlite", cfg.candidate_db)
+    for ed in load_editions(cfg):
+        if ed.seen_db:
+            sections["seen:" + os.path.basename(ed.seen_db)] = ("sqlite", ed.seen_db)
+    return sections
+
+
+def save_state(path, cfg=None, max_mb=None):
+    """写状态快照：先从旧快照补齐本次没用到的段，各缓存按自身规则清理后再打包，返回 manifest。"""
+    cfg = cfg or Config.from_env()
+    sections = state_sections(cfg)
+    for name, (_, local) in sections.items():
+        if state.restore(path, name, local):
+            print(f"状态快照：沿用 {name}")
+    for cache in (http_cache(cfg), llm_cache(cfg), text_cache(cfg), url_map(cfg)):
+        if cache is not None:
+            cache.prune()
+    with cfg.metrics.timer("state"):
+        manifest = state.save(path, sections, (max_mb or cfg.state_max_mb) * 1024 * 1024)
+    return manifest
+
 # ── 多样化直连 RSS（厂商官网 + 中英文主流科技媒体）──────────────────────
 FEEDS = [
     # 国际厂商 / 媒体
@@ -69,6 +455,12 @@ FEEDS = [
     "https://www.aibase.com/zh/ai-news/rss",
 ]
 
+# 检索接口地址（bench/pipeline.py 会改指到本地替身服务）
+TAVILY_URL = "https://api.tavily.com/search"
+GNEWS_URL = "https://news.google.com/rss/search"
+HN_URL = "https://hn.algolia.com/api/v1/search"
+DDG_URL = "https://lite.duckduckgo.com/lite/"
+
 # 关键词检索补充（中文 + 英文，覆盖厂商与细分方向）
 QUERIES = [
     "AI artificial intelligence news today",
@@ -82,9 +474,113 @@ QUERIES = [
 ]
 
 
-def _req_json(url, headers=None, timeout=25):
+# ── 按 host 复用的连接池 + 并发上限（多线程共享）─────────────────────────
+_sessions = {}
+_host_slots = {}
+_pool_lock = threading.Lock()
+
+
+def _host(url):
+    return urlsplit(url).netloc.lower()
+
+
+def _session(url, cfg=None):
+    """取该 host 的共享 Session 与并发信号量（上限取 cfg.host_concurrency）；首次访问时创建。"""
+    host = _host(url)
+    limit = cfg.host_concurrency if cfg else HOST_CONCURRENCY
+    with _pool_lock:
+        s = _sessions.get(host)
+        if s is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=limit)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _sessions[host] = s
+        slot = _host_slots.get((host, limit))
+        if slot is None:
+            slot = _host_slots[(host, limit)] = threading.BoundedSemaphore(limit)
+        return s, slot
+
+
+def _http(method, url, cfg=None, **kw):
+    """经共享 Session 发请求；同一 host 同时在途的请求不超过 cfg.host_concurrency。"""
+    s, slot = _session(url, cfg)
+    host = _host(url)
+    metrics = _metrics(cfg)
     try:
-        r = requests.get(url, headers=headers or {}, timeout=timeout)
+        with metrics.timer("http", source=host), slot:
+            r = s.request(method, url, **kw)
+    except requests.RequestException:
+        metrics.add("http", source=host, errors=1)
+        raise
+    metrics.add("http", source=host, bytes=len(r.content), errors=int(r.status_code >= 400))
+    return r
+
+
+class _CountingReader:
+    """包一层网络流，记录实际读取的字节数（增量解析提前停止时只计已读部分）。"""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.n = 0
+
+    def read(self, size=-1):
+        b = self.fp.read(size)
+        self.n += len(b)
+        return b
+
+
+@contextlib.contextmanager
+def _open_body(url, headers=None, timeout=25, info=None, cfg=None):
+    """条件 GET，以文件对象给出响应体；非 200 / 304 未命中时给出 None。
+
+    304 命中时给出缓存字节；带 ETag/Last-Modified 的 200 响应会完整读入并写缓存；
+    其余情况直接把网络流交给调用方，读够即可提前断开，不下载剩余部分。
+    传入 info（dict）时记下 status（HTTP 状态码）与 bytes（实际从网络读到的字节）。
+    """
+    info = {} if info is None else info
+    headers = dict(headers or {})
+    cache = http_cache(cfg) if cfg else None
+    if cache is not None:
+        headers.update(cache.validators(url))
+    s, slot = _session(url, cfg)
+    host = _host(url)
+    metrics = _metrics(cfg)
+    with slot:
+        try:
+            with metrics.timer("http", source=host):  # 到响应头为止
+                r = s.get(url, headers=headers, timeout=timeout, stream=True)
+            info["status"] = r.status_code
+        except requests.RequestException:
+            metrics.add("http", source=host, errors=1)
+            raise
+        nbytes, stream = 0, None
+        try:
+            if r.status_code == 304 and cache is not None:
+                metrics.add("http", source=host, not_modified=1)
+                body = cache.load(url)
+                yield io.BytesIO(body) if body is not None else None
+            elif r.status_code != 200:
+                metrics.add("http", source=host, errors=1)
+                yield None
+            elif cache is not None and (r.headers.get("ETag") or r.headers.get("Last-Modified")):
+                body = r.content
+                nbytes = len(body)
+                cache.store(url, r.headers, body)
+                yield io.BytesIO(body)
+            else:
+                r.raw.decode_content = True
+                stream = _CountingReader(r.raw)
+                yield stream
+        finally:
+            r.close()
+            info["bytes"] = stream.n if stream is not None else nbytes
+            metrics.add("http", source=host, bytes=info["bytes"])
+
+
+def _req_json(url, headers=None, timeout=25, cfg=None):
+    try:
+        r = _http("GET", url, cfg, headers=headers or {}, timeout=timeout)
         if r.status_code == 200:
             return r.json()
     except Exception as e:
@@ -104,58 +600,152 @@ def _child(node, name):
     return None
 
 
-def fetch_feed(url, max_items=3):
-    """通用 RSS/Atom 解析（直连来源，免 key，命名空间安全）。失败静默返回空。"""
-    try:
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=25)
-        if r.status_code != 200:
-            return []
-        root = ET.fromstring(r.content)
-        nodes = [e for e in root.iter() if _local(e.tag) in ("item", "entry")]
-        out = []
-        for node in nodes:
-            t = _child(node, "title")
-            title = (t.text or "").strip() if t is not None else ""
-            le = _child(node, "link")
-            link = ((le.get("href") if le is not None else None) or
-                    (le.text if le is not None else "") or "").strip()
-            pub = ""
-            for pn in ("pubDate", "published", "updated", "date"):
-                pe = _child(node, pn)
-                if pe is not None and (pe.text or "").strip():
-                    pub = pe.text.strip()
-                    break
-            desc = ""
-            for dn in ("description", "summary", "content", "encoded"):
-                de = _child(node, dn)
-                if de is not None and (de.text or "").strip():
-                    desc = de.text
-                    break
-            desc = re.sub(r"<.*?>", " ", desc or "")
-            desc = re.sub(r"\s+", " ", desc).strip()[:400]
-            if title and link:
-                out.append({"title": title, "url": link,
-                            "content": desc or title, "published": pub})
+_TAG_RE = re.compile(r"<[^>]*>")
+_WS_RE = re.compile(r"\s+")
+_PUB_FIELDS = ("pubDate", "published", "updated", "date")
+_DESC_FIELDS = ("description", "summary", "content", "encoded")
+
+
+def _strip_html(html, limit=400):
+    """去标签 + 压缩空白，只处理到凑满 limit 个字符为止（不对整段正文做正则替换）。"""
+    parts, n, pos = [], 0, 0
+    for m in _TAG_RE.finditer(html):
+        chunk = _WS_RE.sub(" ", html[pos:m.start()]).strip()
+        pos = m.end()
+        if chunk:
+            parts.append(chunk)
+            n += len(chunk) + 1
+            if n > limit:
+                break
+    else:
+        chunk = _WS_RE.sub(" ", html[pos:]).strip()
+        if chunk:
+            parts.append(chunk)
+    return " ".join(parts)[:limit]
+
+
+def _entry_fields(node):
+    """单次遍历 item/entry 的子节点，取出 title/url/content/published；缺标题或链接返回 None。"""
+    first = {}
+    for c in node:
+        first.setdefault(_local(c.tag), c)
+    t = first.get("title")
+    title = (t.text or "").strip() if t is not None else ""
+    le = first.get("link")
+    link = ((le.get("href") if le is not None else None) or
+            (le.text if le is not None else "") or "").strip()
+    if not (title and link):
+        return None
+    pub = ""
+    for pn in _PUB_FIELDS:
+        pe = first.get(pn)
+        if pe is not None and (pe.text or "").strip():
+            pub = pe.text.strip()
+            break
+    desc = ""
+    for dn in _DESC_FIELDS:
+        de = first.get(dn)
+        if de is not None and (de.text or "").strip():
+            desc = de.text
+            break
+    desc = _strip_html(desc, 400)
+    return {"title": title, "url": link, "content": desc or title, "published": pub}
+
+
+def parse_feed_stream(fp, max_items=3):
+    """增量解析：边读边解析，攒够 max_items 条立即停止读取。"""
+    out = []
+    for _, elem in ET.iterparse(fp, events=("end",)):
+        if _local(elem.tag) not in ("item", "entry"):
+            continue
+        it = _entry_fields(elem)
+        elem.clear()
+        if it:
+            out.append(it)
             if len(out) >= max_items:
                 break
-        return out
+    return out
+
+
+def parse_feed_tree(body, max_items=3):
+    """整篇 DOM 解析（旧实现，保留作对照与兜底）。"""
+    root = ET.fromstring(body)
+    nodes = [e for e in root.iter() if _local(e.tag) in ("item", "entry")]
+    out = []
+    for node in nodes:
+        t = _child(node, "title")
+        title = (t.text or "").strip() if t is not None else ""
+        le = _child(node, "link")
+        link = ((le.get("href") if le is not None else None) or
+                (le.text if le is not None else "") or "").strip()
+        pub = ""
+        for pn in _PUB_FIELDS:
+            pe = _child(node, pn)
+            if pe is not None and (pe.text or "").strip():
+                pub = pe.text.strip()
+                break
+        desc = ""
+        for dn in _DESC_FIELDS:
+            de = _child(node, dn)
+            if de is not None and (de.text or "").strip():
+                desc = de.text
+                break
+        desc = re.sub(r"<.*?>", " ", desc or "")
+        desc = re.sub(r"\s+", " ", desc).strip()[:400]
+        if title and link:
+            out.append({"title": title, "url": link,
+                        "content": desc or title, "published": pub})
+        if len(out) >= max_items:
+            break
+    return out
+
+
+def fetch_feed(url, max_items=3, timeout=25, info=None, cfg=None):
+    """通用 RSS/Atom 解析（直连来源，免 key，命名空间安全）。失败静默返回空。
+
+    指标：feed（整次抓取）与 parse（解析；增量解析时含边读边解析的网络读取）按 host 分别计时。
+    传入 info（dict）时记下 status（ok / empty / http <状态码> / error:<异常名>）与 bytes，供来源健康统计。
+    cfg 给出解析方式（feed_parser）、同 host 并发上限与条件 GET 缓存；不传时增量解析、不缓存。
+    """
+    host = _host(url)
+    parser = cfg.feed_parser if cfg else FEED_PARSER
+    info = {} if info is None else info
+    metrics = _metrics(cfg)
+    try:
+        with metrics.timer("feed", source=host), \
+                _open_body(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout, info=info, cfg=cfg) as fp:
+            if fp is None:
+                info["status"] = f"http {info.get('status')}"
+                return []
+            body = fp.read() if parser == "tree" else fp
+            with metrics.timer("parse", source=host):
+                if parser == "tree":
+                    out = parse_feed_tree(body, max_items)
+                else:
+                    out = parse_feed_stream(body, max_items)
+            metrics.add("feed", source=host, items=len(out))
+            info["status"] = "ok" if out else "empty"
+            return out
     except Exception as e:
+        info["status"] = f"error:{type(e).__name__}"
+        metrics.add("feed", source=host, errors=1)
         print(f"feed error {url[:50]}: {e}")
         return []
 
 
-def search_tavily(query, max_results=5):
+def search_tavily(query, max_results=5, timeout=30, cfg=None):
     """优先：Tavily（需 TAVILY_API_KEY，由 workflow 传入；未传入则跳过）。"""
     key = os.environ.get("TAVILY_API_KEY")
     if not key:
         return None
     data = _req_json(
-        "https://api.tavily.com/search",
+        TAVILY_URL,
         headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-        timeout=30,
+        timeout=timeout,
+        cfg=cfg,
     )
     if not data:
-        return None
+        return []
     out = []
     for it in data.get("results", []):
         out.append({
@@ -167,16 +757,15 @@ def search_tavily(query, max_results=5):
     return out
 
 
-def search_gnews(query, max_results=5):
+def search_gnews(query, max_results=5, timeout=25, cfg=None):
     """免 key 兜底：Google News RSS（覆盖中英文全球新闻）。"""
     try:
         from urllib.parse import quote
-        url = ("https://news.google.com/rss/search?q=%s&hl=zh-CN&gl=CN&ceid=CN:zh-Hans"
-               % quote(query))
-        r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=25)
-        if r.status_code != 200:
-            return []
-        root = ET.fromstring(r.content)
+        url = GNEWS_URL + "?q=%s&hl=zh-CN&gl=CN&ceid=CN:zh-Hans" % quote(query)
+        with _open_body(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout, cfg=cfg) as fp:
+            if fp is None:
+                return []
+            root = ET.fromstring(fp.read())
         out = []
         for item in root.iter("item"):
             title = (item.findtext("title") or "").strip()
@@ -192,13 +781,14 @@ def search_gnews(query, max_results=5):
         return []
 
 
-def search_hn(query, max_results=5):
+def search_hn(query, max_results=5, timeout=25, cfg=None):
     """免 key 兜底：Hacker News Algolia（技术深度好）。"""
     from urllib.parse import quote
     data = _req_json(
-        "https://hn.algolia.com/api/v1/search?query=%s&tags=story&hitsPerPage=%d"
-        % (quote(query), max_results),
+        HN_URL + "?query=%s&tags=story&hitsPerPage=%d" % (quote(query), max_results),
         headers={"User-Agent": "Mozilla/5.0"},
+        timeout=timeout,
+        cfg=cfg,
     )
     if not data:
         return []
@@ -215,13 +805,13 @@ def search_hn(query, max_results=5):
     return out
 
 
-def search_ddg(query, max_results=5):
+def search_ddg(query, max_results=5, timeout=25, cfg=None):
     try:
-        r = requests.post(
-            "https://lite.duckduckgo.com/lite/",
+        r = _http(
+            "POST", DDG_URL, cfg,
             data={"q": query},
             headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"},
-            timeout=25,
+            timeout=timeout,
         )
         if r.status_code != 200:
             return []
@@ -242,14 +832,83 @@ def search_ddg(query, max_results=5):
         return []
 
 
-def load_covered(limit=3):
-    """读取本目录最近的日报，汇总已收录事件的「标题 + 原文链接」，供跨日去重。
+def resolve_link(url, timeout=10, cfg=None):
+    """跟随跳转拿到原始报道链接（已去掉跟踪参数）：先 HEAD，失败或仍停在聚合页时 GET，
+    落到 HTML 页时再看 <link rel=canonical> / meta refresh。解析不出返回 ""。
+
+    HEAD 已跳出聚合 / 短链服务时直接采用跳转终点，不再为 rel=canonical 多发一次 GET：
+    终点是发布方自己的文章页，canonical 至多换掉路径写法，规范化链接（canonical_url）去重已能对上；
+    只有 HEAD 不可用或仍停在聚合页（如 Google News 的脚本跳转页）时才读页面里的 canonical。
+    """
+    headers = {"User-Agent": "Mozilla/5.0"}
+    try:
+        r = _http("HEAD", url, cfg, headers=headers, timeout=timeout, allow_redirects=True)
+        if r.status_code < 400 and not needs_resolution(r.url):
+            return strip_tracking(r.url)
+        r = _http("GET", url, cfg, headers=headers, timeout=timeout, allow_redirects=True)
+    except requests.RequestException as e:
+        print(f"resolve error {url[:60]}: {e}")
+        return ""
+    if r.status_code >= 400:
+        return ""
+    final = r.url
+    if "html" in r.headers.get("Content-Type", ""):
+        final = find_canonical(r.content[:65536], r.url) or final
+    return "" if needs_resolution(final) else strip_tracking(final)
+
+
+def resolve_urls(urls, cfg, deadline=None):
+    """{链接: 原始链接}，只含聚合 / 短链里解析成功的。先查 url_map(cfg)，没有的才并发联网解析
+    （同一 host 受 cfg.host_concurrency 约束），结果写回映射：每个链接只解析一次。
+    无状态配置时不查也不写映射，每次现场解析。
+    deadline 默认 cfg.deadline：单次请求的超时取剩余时间，截止之后不再发起解析（只用映射里已有的），
+    没来得及解析的链接不写回映射，下次再试。"""
+    urls = list(dict.fromkeys(u for u in urls if u and needs_resolution(u)))
+    if not urls or not cfg.resolve_links:
+        return {}
+    deadline = deadline or cfg.deadline or Deadline()
+    cache = url_map(cfg)
+    found = cache.get_many(urls) if cache is not None else {}
+    misses = [u for u in urls if u not in found]
+    skipped = 0
+    if misses and deadline.expired():
+        skipped = len(misses)
+    elif misses:
+        def resolve(url):
+            return None if deadline.expired() else resolve_link(url, deadline.timeout(10), cfg)
+
+        with cfg.metrics.timer("resolve"):
+            fresh = [(u, d) for u, d in zip(misses, _run_all([(resolve, u) for u in misses], cfg.gather_workers))
+                     if d is not None]
+            skipped = len(misses) - len(fresh)
+            found.update(cache.put_many(fresh) if cache is not None else fresh)
+    ok = {u: d for u, d in found.items() if d}
+    cfg.metrics.add("resolve", links=len(urls), cache_hits=len(urls) - len(misses), resolved=len(ok),
+                    skipped=skipped)
+    print(f"聚合链接解析：{len(urls)} 个（缓存命中 {len(urls) - len(misses)}），得到原始链接 {len(ok)} 个"
+          + (f"；已到截止时间，{skipped} 个未解析" if skipped else ""))
+    return ok
+
+
+def resolve_links(items, cfg, deadline=None):
+    """就地把素材里的聚合 / 短链换成原始报道链接（原链接记在 via），返回 items。deadline 同 resolve_urls()。"""
+    mapped = resolve_urls([it.get("url") for it in items], cfg, deadline)
+    for it in items:
+        dst = mapped.get(it.get("url"))
+        if dst:
+            it["via"], it["url"] = it["url"], dst
+    return items
+
+
+def load_covered(limit=3, pattern=REPORT_MD, directory=SCRIPT_DIR, date=None, cfg=None):
+    """读取 directory 下最近的日报，汇总已收录事件的「标题 + 原文链接」，供跨日去重。
 
-    仅读取最近 limit 份（按修改时间倒序），排除今天待生成的文件。
-    返回去重后的字符串列表，便于直接注入给大模型的去重指令。
+    仅读取最近 limit 份（按修改时间倒序），排除 date 当天待生成的文件；pattern 为版本的 out_md。
+    返回去重后的字符串列表。日常去重已改走 SeenStore，这里只在索引为空时用于首次导入。
     """
-    files = glob.glob(os.path.join(SCRIPT_DIR, "AI资讯24小时_*.md"))
-    files = [f for f in files if os.path.basename(f) != OUT_MD]
+    date = date or datetime.date.today()
+    files = glob.glob(os.path.join(directory, pattern.replace("{date}", "*")))
+    files = [f for f in files if os.path.basename(f) != pattern.replace("{date}", date_label(date))]
     files.sort(key=lambda f: os.path.getmtime(f), reverse=True)
     items = []
     for f in files[:limit]:
@@ -257,14 +916,10 @@ def load_covered(limit=3):
             txt = open(f, encoding="utf-8").read()
         except Exception:
             continue
-        for line in txt.split("\n"):
-            m = re.match(r"###\s*\d+\.\s*(.+)", line.strip())
-            if m:
-                title = m.group(1).replace("**", "").strip()
-                if title:
-                    items.append(title)
-        for url in re.findall(r"https?://[^\s)\]]+", txt):
-            items.append(url)
+        for title, url in parse(txt).entries():
+            items.extend((title, url))
+    mapped = resolve_urls(items, cfg or Config())  # 往期日报里残留的聚合链接换成原始链接，与今天的素材可比
+    items = [mapped.get(it, it) for it in items]
     seen, uniq = set(), []
     for it in items:
         if it and it not in seen:
@@ -273,57 +928,356 @@ def load_covered(limit=3):
     return uniq
 
 
-def gather():
+def open_seen_store(path, pattern=REPORT_MD, days=SEEN_DAYS, directory=None, date=None, cfg=None):
+    """打开已发布索引；首次使用（索引为空）时从 directory 下最近的日报导入一次。"""
+    date = date or datetime.date.today()
+    cfg = cfg or Config()
+    warm("seen:" + os.path.basename(path), path, cfg)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    store = SeenStore(path)
+    if store.empty() and directory is not None:
+        covered = load_covered(limit=days, pattern=pattern, directory=directory, date=date, cfg=cfg)
+        seed = [("", it) if it.startswith("http") else (it, "") for it in covered]
+        if seed:
+            store.add(date - datetime.timedelta(days=1), seed)
+            print(f"seen store: 从往期日报导入 {len(seed)} 条")
+    return store
+
+
+def make_search(cfg):
+    """检索链 Tavily -> (Google News + HN) -> DDG，分层对冲并发。
+
+    每次运行新建一个（搜索源的成功率 / 停用状态只在本次运行内有效），用完调用 close()。
+    """
+    def bind(fn):
+        return functools.partial(fn, cfg=cfg)
+    return FanOut(
+        [[("tavily", bind(search_tavily))], [("gnews", bind(search_gnews)), ("hn", bind(search_hn))],
+         [("ddg", bind(search_ddg))]],
+        deadline=cfg.query_deadline,
+        hedge_delay=cfg.hedge_delay,
+        metrics=cfg.metrics,
+    )
+
+
+def search_query(q, search, budget=None):
+    """单个关键词检索：按层对冲，截止时间（不超过 budget 秒）内取第一份可用结果。"""
+    return search.search(q, budget)
+
+
+def _run_all(tasks, workers):
+    """并发执行 [(fn, arg), ...]，结果按提交顺序返回（保证合并顺序确定）。"""
+    if workers <= 1:
+        return [fn(arg) for fn, arg in tasks]
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futs = [ex.submit(fn, arg) for fn, arg in tasks]
+        return [f.result() for f in futs]
+
+
+def _run_scheduled(names, calls, workers, deadline, known, metrics):
+    """按来源的历史表现（known，SourceStats.get_many 的结果）排定提交顺序，并发执行 calls，
+    到 deadline 仍未完成的放弃。calls[i] 接收一个 dict，可在里面记下 status 与 bytes；放弃的来源数记入 metrics。
+
+    返回 (结果, 运行记录)，都与 names 同序：放弃或出错的结果为 None；
+    运行记录为 (耗时, 条数, 是否成功, 状态, 字节)，在途被放弃的状态为 late、耗时按已用时间记
+    （SourceStats 只在排序上按失败计，不算零条），还没开始就被取消的为 None（不记入统计）。
+    """
+    started, finished = {}, {}
+    infos = [{} for _ in names]
+
+    def run(i):
+        started[i] = time.monotonic()
+        try:
+            return calls[i](infos[i])
+        finally:
+            finished[i] = time.monotonic()
+
+    ex = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gather")
+    futs = [None] * len(names)
+    for i in schedule_order(names, known):
+        futs[i] = ex.submit(run, i)
+    wait(futs, timeout=deadline.wait_timeout())
+    ex.shutdown(wait=False, cancel_futures=True)  # 在途请求的超时取自剩余时间，会在截止附近自行结束
+    now = time.monotonic()
+    out, runs, late = [], [], 0
+    for i, f in enumerate(futs):
+        res, run_info = None, None
+        if f.done() and not f.cancelled():
+            try:
+                res = f.result()
+            except Exception as e:
+                print(f"{names[i][:60]} error: {e}")
+                infos[i]["status"] = f"error:{type(e).__name__}"
+            status = infos[i].get("status") or ("ok" if res else "empty")
+            run_info = (finished[i] - started[i], len(res or []), bool(res), status, infos[i].get("bytes", 0))
+        else:
+            late += 1
+            if i in started:
+                run_info = (now - started[i], 0, False, "late", infos[i].get("bytes", 0))
+        out.append(res)
+        runs.append(run_info)
+    if late:
+        metrics.add("gather", late_sources=late)
+        print(f"抓取截止：{late}/{len(names)} 个来源未按时返回，已放弃，用已到的素材继续")
+    return out, runs
+
+
+def gather(seen=None, limit=MAX_CONTEXT_ITEMS, feeds=None, queries=None, date=None, deadline=None, cfg=None):
+    """并发抓取全部 RSS 与关键词检索，按 FEEDS → QUERIES 的原顺序合并去重。
+
+    总耗时约等于最慢的单个来源，而不是所有来源耗时之和。
+    来源按历史表现（通过去重、进入日报的条数 × 成功率 / 耗时）从高到低提交，没有历史的先抓；
+    连续多天零条的来源退避或隔离（见 schedule.source_state），常有条目进入日报的 feed 每次多解析几条。
+    传入 deadline（schedule.Deadline）时各请求的超时取剩余时间，到截止仍未返回的来源放弃，只合并已到的素材。
+    各来源本次的状态、耗时、字节、解析条数与通过去重的条数记入 source_stats(cfg)（无状态配置时不记、不排序）。
+    合并前先把聚合 / 短链解析成原始报道链接（resolve_links，受整次运行的 cfg.deadline 约束，
+    未设时受 deadline 约束），再按规范化链接去重，
+    同一篇报道经 Google News 与直连 feed 各抓到一次时只留一条。
+    传入 seen（SeenStore）时，窗口内已发布过的链接/标题在本地直接剔除，不再交给大模型。
+    limit=None 时不截断（由调用方在近似去重之后再截断）。
+    feeds / queries 默认为 FEEDS / QUERIES；每条素材的 origin 记录抓到它的 feed 链接或检索词
+    （同一链接被多个来源抓到时全部记录），多版本据此从同一素材池各取所需。
+    cfg 默认 Config.from_env()；并发数、缓存与检索参数都取自它，检索链（make_search）每次调用新建。
+    """
+    cfg = cfg or Config.from_env()
+    feeds = FEEDS if feeds is None else feeds
+    queries = QUERIES if queries is None else queries
+    date = date or datetime.date.today()
+    since = date - datetime.timedelta(days=cfg.seen_days)
+    dropped = 0
+    deadline = deadline or Deadline()
+    stats = source_stats(cfg)
+    known = stats.get_many(["feed:" + url for url in feeds] + ["search:" + q for q in queries]) if stats else {}
+    skipped = [n for n in known if not source_state(known[n])[1]]
+    if skipped:
+        cfg.metrics.add("gather", skipped_sources=len(skipped))
+        print(f"来源健康：{len(skipped)} 个连续多天零条的来源退避 / 隔离中，本次跳过（python schedule.py 查看）")
+    feeds = [url for url in feeds if "feed:" + url not in skipped]
+    queries = [q for q in queries if "search:" + q not in skipped]
+    names = ["feed:" + url for url in feeds] + ["search:" + q for q in queries]
+    search = make_search(cfg)
+    calls = ([lambda info, u=url: fetch_feed(u, source_max_items(known.get("feed:" + u), 3),
+                                              deadline.timeout(25), info, cfg) for url in feeds]
+             + [lambda info, q=q: search_query(q, search, deadline.remaining()) for q in queries])
+    try:
+        batches, runs = _run_scheduled(names, calls, cfg.gather_workers, deadline, known, cfg.metrics)
+    finally:
+        search.close()  # 截止后放弃的检索醒来时不再发下一层，返回已到的部分结果
+    resolve_links([it for batch in batches for it in (batch or [])], cfg, cfg.deadline or deadline)
+    feed_batches, query_batches = batches[:len(feeds)], batches[len(feeds):]
     all_res = []
-    seen = set()
+    by_url = {}
+    survived = {}
+
+    def add(items, origin):
+        nonlocal dropped
+        n = 0
+        for it in (items or []):
+            if not it.get("url"):
+                continue
+            url = canonical_url(it["url"])
+            if url in by_url:
+                kept = by_url[url]  # None：已按往期发布剔除
+                if kept is not None and origin not in kept["origin"]:
+                    kept["origin"].append(origin)
+                continue
+            by_url[url] = None
+            if seen is not None and seen.is_seen(it, since, date):
+                dropped += 1
+                continue
+            it["origin"] = [origin]
+            by_url[url] = it
+            all_res.append(it)
+            n += 1
+        return n
+
     # 1) 直连 RSS（多样化来源）
-    for url in FEEDS:
-        for it in fetch_feed(url):
-            if it.get("url") and it["url"] not in seen:
-                seen.add(it["url"])
-                all_res.append(it)
+    for url, items in zip(feeds, feed_batches):
+        survived["feed:" + url] = add(items, url)
     print(f"feeds -> {len(all_res)} 条素材")
     # 2) 关键词检索补充
-    for q in QUERIES:
-        res = search_tavily(q) or (search_gnews(q) + search_hn(q)) or search_ddg(q)
-        n = 0
-        for it in (res or []):
-            if it.get("url") and it["url"] not in seen:
-                seen.add(it["url"])
-                all_res.append(it)
-                n += 1
+    for q, res in zip(queries, query_batches):
+        n = survived["search:" + q] = add(res, q)
         print(f"query={q!r} -> {n} new results")
+    if stats is not None:
+        stats.record([(name,) + run + (survived.get(name, 0),)
+                      for name, run in zip(names, runs) if run is not None])
+        stats.prune()
+    if dropped:
+        print(f"跨日去重：剔除 {dropped} 条往期已发布素材")
+    cfg.metrics.add("gather", items=len(all_res), dropped_seen=dropped)
+    print("搜索源：" + "；".join(f"{n} {st}" for n, st in search.report().items()))
+    for cache in (http_cache(cfg), url_map(cfg) if cfg.resolve_links else None):
+        if cache is not None:
+            cache.prune()
     # 控制上下文体量
-    return all_res[:100]
+    return all_res[:limit] if limit else all_res
+
+
+def load_candidates(path, seen=None, hours=WINDOW_HOURS, date=None, cfg=None):
+    """读 ingest.py 预取到 path 的最近 hours 小时素材（入库时已按链接/标题去重）。
+
+    库不存在、从未轮询或最近一次轮询距今超过 cfg.candidate_fresh_hours 时返回 None，由调用方回退到 gather()。
+    传入 seen 时同样剔除往期已发布条目。
+    """
+    cfg = cfg or Config()
+    warm("candidates", path, cfg)
+    if not os.path.exists(path):
+        return None
+    store = CandidateStore(path)
+    try:
+        last = store.last_poll()
+        now = time.time()
+        if not last or now - last > cfg.candidate_fresh_hours * 3600:
+            print("候选库过期或为空，改为现场抓取")
+            return None
+        items = store.window(now - hours * 3600)
+    finally:
+        store.close()
+    date = date or datetime.date.today()
+    since = date - datetime.timedelta(days=cfg.seen_days)
+    out = [it for it in items if seen is None or not seen.is_seen(it, since, date)]
+    cfg.metrics.add("candidates", items=len(out), dropped_seen=len(items) - len(out))
+    dropped = f"，剔除往期已发布 {len(items) - len(out)} 条" if seen is not None else ""
+    print(f"候选库：最近 {hours:g} 小时 {len(items)} 条{dropped}"
+          f"（最近一次轮询 {(now - last) / 60:.0f} 分钟前）")
+    return out
+
+
+def collapse_duplicates(results, source="", enabled=True, metrics=None):
+    """同一事件的多路报道聚成一条代表，其余链接挂到 alternates 上；source 为指标里的版本名。"""
+    if not enabled:
+        return results
+    metrics = metrics if metrics is not None else Metrics()
+    reps, stats = cluster(results)
+    metrics.add("dedup", source=source, input=stats["input"], output=stats["clusters"])
+    print(f"{f'[{source}] ' if source else ''}近似去重：{stats['input']} 条 -> {stats['clusters']} 簇"
+          f"（合并 {stats['merged']} 条，最大簇 {stats['largest']} 条，{stats['ms']} ms）")
+    return reps
+
+
+def fetch_article(url, timeout=15, cfg=None):
+    """下载文章页并抽取正文；非 HTML、非 200 或超过 FULLTEXT_MAX_BYTES 的响应返回空串。
+
+    流式读取：响应头里的 Content-Length 已超限时不读正文，否则边读边计，超限即断开，不下载剩余部分。
+    """
+    s, slot = _session(url, cfg)
+    host = _host(url)
+    headers = {"User-Agent": "Mozilla/5.0", "Accept": "text/html,application/xhtml+xml"}
+    metrics = _metrics(cfg)
+    nbytes, chunks = 0, []
+    with slot:
+        try:
+            with metrics.timer("http", source=host):  # 到响应头为止
+                r = s.get(url, headers=headers, timeout=timeout, stream=True)
+        except requests.RequestException:
+            metrics.add("http", source=host, errors=1)
+            raise
+        try:
+            ctype = r.headers.get("Content-Type", "")
+            size = r.headers.get("Content-Length", "")
+            if r.status_code != 200 or "html" not in ctype or (size.isdigit() and int(size) > FULLTEXT_MAX_BYTES):
+                metrics.add("http", source=host, errors=int(r.status_code >= 400))
+                return ""
+            for chunk in r.iter_content(64 * 1024):
+                nbytes += len(chunk)
+                if nbytes > FULLTEXT_MAX_BYTES:
+                    metrics.add("fulltext", oversized=1)
+                    return ""
+                chunks.append(chunk)
+        finally:
+            r.close()
+            metrics.add("http", source=host, bytes=nbytes)
+    return extract(decode_html(b"".join(chunks), ctype))
+
+
+def enrich(results, top, source="", deadline=None, cfg=None):
+    """对排序前 top 条素材抓原文正文，摘要换成截到 cfg.fulltext_tokens 的正文。
+
+    并发抓取，同一 host 受 cfg.host_concurrency 约束；正文按规范化链接缓存在磁盘上（无状态配置时不缓存），
+    跨运行、跨版本只下载、解析一次。只替换比原摘要更长的正文；返回新列表，条目为副本，不改共享素材池。
+    传入 deadline 时单次下载的超时取剩余时间（留出 LLM_RESERVE 给成稿）。
+    """
+    cfg = cfg or Config()
+    deadline = deadline or Deadline()
+    picked = [it for it in rank(results, half_life=cfg.recency_half_life)[:top]
+              if _host(it.get("url") or "") not in FULLTEXT_SKIP_HOSTS]
+    cache = text_cache(cfg)
+
+    def fetch(url):
+        return fetch_article(url, timeout=max(1.0, min(15, deadline.remaining() - LLM_RESERVE)), cfg=cfg)
+
+    def load(it):
+        if cache is not None:
+            return cache.get_or_fetch(it["url"], fetch)
+        try:
+            return fetch(it["url"]) or "", False
+        except Exception as e:  # 与 TextCache.get_or_fetch 一致：单条失败不影响其余
+            print(f"fulltext error {it['url']}: {e}")
+            return "", False
+
+    fetched = _run_all([(load, it) for it in picked], cfg.gather_workers)
+    full, hits, empty = {}, 0, 0
+    for it, (text, hit) in zip(picked, fetched):
+        hits += hit
+        if not text:
+            empty += 1
+            continue
+        text = clip_tokens(text, cfg.fulltext_tokens)
+        if len(text) > len(it.get("content") or ""):
+            full[id(it)] = text
+    cfg.metrics.add("fulltext", source=source, requested=len(picked), cache_hits=hits,
+                    empty=empty, replaced=len(full))
+    print(f"{f'[{source}] ' if source else ''}原文正文：{len(picked)} 条（缓存命中 {hits}，"
+          f"无正文 {empty}），替换摘要 {len(full)} 条")
+    return [dict(it, content=full[id(it)]) if id(it) in full else it for it in results]
+
+
+def select_context(results, source="", cfg=None):
+    """排序 + 按 cfg.context_tokens 装箱，返回进入提示词的素材。"""
+    cfg = cfg or Config()
+    picked, stats = pack(results, cfg.context_tokens, cfg.min_summary_tokens, max_items=MAX_CONTEXT_ITEMS,
+                         half_life=cfg.recency_half_life)
+    cfg.metrics.add("pack", source=source, input=stats["candidates"], output=stats["packed"],
+                    trimmed=stats["trimmed"], context_tokens=stats["tokens"])
+    print(f"{f'[{source}] ' if source else ''}素材装箱：{stats['candidates']} 条候选 -> {stats['packed']} 条"
+          f"（截短摘要 {stats['trimmed']} 条，约 {stats['tokens']}/{stats['budget']} tokens）")
+    return picked
 
 
 def build_context(results):
     lines = []
     for i, it in enumerate(results, 1):
-        lines.append(
-            f"[{i}] 标题：{it.get('title', '')}\n"
-            f"链接：{it.get('url', '')}\n"
-            f"摘要：{it.get('content', '')}\n"
-        )
+        block = f"[{i}] 标题：{it.get('title', '')}\n链接：{it.get('url', '')}\n"
+        if it.get("published_ts") is not None:
+            pub = datetime.datetime.fromtimestamp(it["published_ts"], REPORT_TZ)
+            block += f"发布：{pub.isoformat(timespec='minutes')}\n"
+        if it.get("alternates"):
+            block += f"其他来源：{' '.join(it['alternates'][:3])}\n"
+        if it.get("triage_section"):
+            block += f"初筛分区：{it['triage_section']}\n"
+        lines.append(block + f"摘要：{it.get('content', '')}\n")
     return "\n".join(lines)
 
 
-PROMPT = """你是资深 AI 资讯编辑。下面是我从「厂商官网 + 中英文主流科技媒体」直接抓取的「过去 24 小时」全球 AI 动态素材（含真实原文链接）。
-请严格筛选并输出【恰好 20 条】最有价值的国内外信息，覆盖：一、AI 技术；二、AI 应用；三、AI 行业动态（侧重技术与应用）。避免重复与低质软文。
-
-【每条格式，务必紧凑】
+ITEM_FORMAT = """【每条格式，务必紧凑】
 ### 序号. 标题
-> 来源：真实媒体/厂商名（如 OpenAI、机器之心、TechCrunch、NVIDIA Blog，严禁写“Google News”） · 发布日期（YYYY-MM-DD，无则写“近日”） · [原文](真实链接)
+> 来源：真实媒体/厂商名（如 OpenAI、机器之心、TechCrunch、NVIDIA Blog，严禁写“Google News”） · 发布日期（YYYY-MM-DD，取素材「发布」一行的日期，无则写“近日”） · [原文](真实链接)
 （引用块之后另起一段）正文：用中文客观陈述该动态的要点、关键数据（型号/参数/金额/人名）与行业影响。正文长度必须 200–300 字（按汉字计数，不含空行），宁可写满也不要少于 200 字；不要空话套话，不要分点罗列。
+"""
+
+PROMPT = """你是资深 AI 资讯编辑。下面是我从「厂商官网 + 中英文主流科技媒体」直接抓取的「过去 24 小时」全球 AI 动态素材（含真实原文链接）。
+请严格筛选并输出【恰好 __N__ 条】最有价值的国内外信息，覆盖：__SECTIONS__。避免重复与低质软文。
 
+__FORMAT__
 【硬性要求】
-- 总数必须恰好 20 条，编号从 1 到 20 连续，三个分区合计 20，不得多、不得少。
-- 按三个二级标题分区（每区条数自定，但合计须为 20）。
+- 总数必须恰好 __N__ 条，编号从 1 到 __N__ 连续，各分区合计 __N__，不得多、不得少。
+- 按上述分区各用一个二级标题（每区条数自定，但合计须为 __N__）。
 - 直接输出 Markdown（从一级标题开始），不要前言、不要额外解释。
 - 素材链接若是聚合/跳转页，尽量保留指向原始报道的链接；只有聚合链接也接受。
 
 【强制去重（跨日 + 本日）】
-以下是此前日报已收录的新闻（事件标题与原文链接），本次严禁重复收录其中任何一条；即便有新报道角度也不再重复。仅当某事件出现实质性新进展（新版本/新金额/新状态）时，才可收录为"进展更新"，且同一事件只保留最新一条。同时只收录过去 24 小时内的新闻，超窗且已在往期出现的旧闻不收录。成稿后自查：与上述"已覆盖集合"零重复、本期内部零重复、总数恰为 20 条。
+以下是此前日报已收录的新闻标题（链接或标题相同的素材已预先剔除，这里用于识别换了说法的同一事件），本次严禁重复收录其中任何一条；即便有新报道角度也不再重复。仅当某事件出现实质性新进展（新版本/新金额/新状态）时，才可收录为"进展更新"，且同一事件只保留最新一条。同时只收录过去 24 小时内的新闻，超窗且已在往期出现的旧闻不收录。成稿后自查：与上述"已覆盖集合"零重复、本期内部零重复、总数恰为 __N__ 条。
 
 已覆盖集合（近期日报）：
 __DEDUP__
@@ -332,87 +1286,337 @@ __DEDUP__
 __CONTEXT__
 
 输出示例：
-# AI 资讯 24 小时 | __DATE__
-> 今日 20 条 · 来源覆盖厂商官网与中英文科技媒体
+# __TITLE__ | __DATE__
+> 今日 __N__ 条 · 来源覆盖厂商官网与中英文科技媒体
 
-## 一、AI 技术
+## __FIRST__
 ### 1. 标题
 > 来源：OpenAI · 2026-08-13 · [原文](https://...)
 正文内容 200–300 字……
 """
 
 
-def call_llm(messages):
-    resp = requests.post(
-        CHAT_ENDPOINT,
-        headers={"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"},
-        json={"model": MODEL, "max_tokens": 8000, "messages": messages, "temperature": 0.3},
-        timeout=300,
-    )
-    if resp.status_code != 200:
-        raise SystemExit(f"ERROR: LLM 调用失败 {resp.status_code}: {resp.text[:500]}")
-    return resp.json()
+MAP_PROMPT = """你是资深 AI 资讯编辑。下面是「过去 24 小时」全球 AI 动态素材的第 __SHARD__ 个分片（共 __SHARDS__ 片，含真实原文链接）。
+请从本分片中筛选最有价值的【至多 __K__ 条】，按__HEADERS__这几个二级标题分区输出（没有条目的分区省略）。
 
+__FORMAT__
+【要求】
+- 直接输出 Markdown（从二级标题开始），不要一级标题、前言或解释。
+- 素材链接若是聚合/跳转页，尽量保留指向原始报道的链接。
+- 以下是此前日报已收录的新闻标题，严禁重复收录；本分片内同一事件只保留一条；只收录过去 24 小时内的新闻。
+__DEDUP__
 
-def md_to_html(md, date_str):
-    out, in_list = [], False
-
-    def inline(t):
-        t = re.sub(r"\[(.*?)\]\((.*?)\)", r'<a href="\2" target="_blank">\1</a>', t)
-        t = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", t)
-        return t
-
-    for line in md.split("\n"):
-        s = line.strip()
-        if s.startswith("### "):
-            if in_list:
-                out.append("</ul>"); in_list = False
-            out.append(f"<h3>{inline(s[4:])}</h3>")
-        elif s.startswith("## "):
-            if in_list:
-                out.append("</ul>"); in_list = False
-            out.append(f"<h2>{inline(s[3:])}</h2>")
-        elif s.startswith("# "):
-            if in_list:
-                out.append("</ul>"); in_list = False
-            out.append(f"<h1>{inline(s[2:])}</h1>")
-        elif s.startswith("> "):
-            out.append(f"<blockquote>{inline(s[2:].strip())}</blockquote>")
-        elif s.startswith("- "):
-            if not in_list:
-                out.append("<ul>"); in_list = True
-            out.append(f"<li>{inline(s[2:])}</li>")
-        elif s == "":
-            if in_list:
-                out.append("</ul>"); in_list = False
-            # 紧凑：不额外加 <br>
+素材：
+__CONTEXT__
+"""
+
+REDUCE_PROMPT = """你是资深 AI 资讯编辑。下面是各分片初选出的候选条目（编号 | 标题 | 来源行）。
+请选出【恰好 __N__ 条】最有价值、互不重复（同一事件只留一条）的条目，并分配到以下分区：__KEYS__。
+只输出 JSON，不要解释，格式：__SCHEMA__
+
+候选：
+__CANDIDATES__
+"""
+
+ITEM_PROMPT = """你是资深 AI 资讯编辑，正在为「__TITLE__ | __DATE__」的「__SECTION__」分区补写一条资讯。
+只根据下面这条素材写这一条，不要编造素材以外的事实。
+
+__FORMAT__
+直接从「### 1. 标题」开始输出这一条，不要分区标题、前言或解释。
+
+素材：
+__CONTEXT__
+"""
+
+EXPAND_PROMPT = """下面这条资讯的正文不足 __MIN__ 字。请保留标题与来源行（含原文链接）不变，依据素材把正文扩写到 200–300 字（按汉字计数），
+只写素材中有依据的事实。直接输出完整的这一条（从「### 」标题行开始），不要前言或解释。
+
+__FORMAT__
+原条目：
+__ITEM__
+
+素材：
+__CONTEXT__
+"""
+
+TRIAGE_PROMPT = """你是 AI 资讯编辑的初筛助手。下面是 __N__ 条候选素材（编号 | 标题 | 来源站点 | 摘要）。
+逐条给出收录价值分（0–9 的整数，9 最高：重大发布、关键数据、行业影响大的高分；软文、旧闻、与 AI 无关的 0–2 分）
+与所属分区编号（__KEYS__）。
+只输出一个 JSON 数组，不要解释，每条素材一项 [编号, 分数, 分区编号]，如 [[1,7,0],[2,2,1]]。
+
+候选：
+__ITEMS__
+"""
+
+def _llm_session():
+    """LLM 网关的共享连接池（首次调用时创建）；map 分片与多版本并发时复用同一批连接。"""
+    def make():
+        s = requests.Session()
+        s.mount("https://", HTTPAdapter(pool_maxsize=16))
+        s.mount("http://", HTTPAdapter(pool_maxsize=16))
+        return s
+    return _shared("llm_session", make)
+
+
+def _stream_chat(payload, cfg, on_delta=None):
+    """SSE 流式接收：逐块拼接 delta.content，每收到一块回调 on_delta。
+
+    cfg.deadline 不为 None 时两次数据之间的等待与整次接收都截到运行剩余时间以内（至少 LLM_MIN_TIMEOUT 秒），
+    超时抛 requests.Timeout。
+    """
+    t0 = time.time()
+    first = None
+    parts, usage = [], None
+    idle, stop = cfg.llm_idle_timeout, None
+    if cfg.deadline is not None:
+        idle = cfg.deadline.timeout(idle, floor=LLM_MIN_TIMEOUT)
+        stop = t0 + max(LLM_MIN_TIMEOUT, cfg.deadline.remaining())
+    with _llm_session().post(
+        cfg.chat_endpoint,
+        headers={"Authorization": f"Bearer {cfg.api_key}", "Content-Type": "application/json"},
+        json=dict(payload, stream=True),
+        stream=True,
+        timeout=(min(15, idle), idle),
+    ) as resp:
+        if resp.status_code != 200:
+            raise SystemExit(f"ERROR: LLM 调用失败 {resp.status_code}: {resp.text[:500]}")
+        resp.encoding = "utf-8"
+        for line in resp.iter_lines(decode_unicode=True):
+            if stop is not None and time.time() > stop:
+                raise requests.Timeout(f"流式接收超过运行截止时间（已收 {len(parts)} 块）")
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            usage = chunk.get("usage") or usage
+            for choice in chunk.get("choices") or []:
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    if first is None:
+                        first = time.time() - t0
+                        print(f"LLM 首个数据块 {first:.1f}s")
+                        cfg.metrics.add("llm_stream", first_chunk_seconds=first)
+                    cfg.metrics.add("llm_stream", chunks=1)
+                    parts.append(delta)
+                    if on_delta:
+                        on_delta(delta)
+    return {"choices": [{"message": {"content": "".join(parts)}}], "usage": usage}
+
+
+def call_llm(messages, max_tokens=8000, stream=None, on_delta=None, label="report", cfg=None, model=None,
+             timeout=None):
+    """调用 Chat Completions；stream=True（或 cfg.llm_stream）时走 SSE。
+
+    两种方式返回同样结构：{"choices": [{"message": {"content": ...}}], "usage": ...}
+    先查 llm_cache(cfg)：同模型、同参数、同 messages 的请求直接复用上次响应，不耗 token。
+    label 为指标里的来源名（report / map / reduce / triage），网关返回的 usage 与耗时按它累计。
+    cfg 省略时按环境变量构建；model / timeout 省略时用 cfg.model / cfg.llm_timeout（初筛传自己的）。
+    cfg.deadline 不为 None 时超时再截到运行剩余时间以内（至少 LLM_MIN_TIMEOUT 秒），流式接收同样如此。
+    """
+    cfg = cfg or Config.from_env()
+    cache = llm_cache(cfg)
+    limit = timeout or cfg.llm_timeout
+    if cfg.deadline is not None:
+        limit = cfg.deadline.timeout(limit, floor=LLM_MIN_TIMEOUT)
+    payload = {"model": model or cfg.model, "max_tokens": max_tokens, "messages": messages, "temperature": 0.3}
+    key = request_key(payload)
+    cached = cache.get(key)
+    if cached is not None:
+        print(f"LLM 缓存命中 {key[:12]}")
+        cfg.metrics.add("llm", source=label, cache_hits=1)
+        if on_delta:
+            on_delta(cached["choices"][0]["message"]["content"])
+        return cached
+    if cache.mode == "replay":
+        raise SystemExit(f"ERROR: NEWS_LLM_CACHE=replay 但缓存未命中 {key[:12]}")
+    with cfg.metrics.timer("llm", source=label):
+        if cfg.llm_stream if stream is None else stream:
+            data = _stream_chat(payload, cfg, on_delta)
         else:
-            if in_list:
-                out.append("</ul>"); in_list = False
-            out.append(f"<p>{inline(s)}</p>")
-    if in_list:
-        out.append("</ul>")
-    body = "\n".join(out)
-    return f"""<!doctype html>
-<html lang="zh-CN"><head><meta charset="utf-8">
-<meta name="viewport" content="width=device-width,initial-scale=1">
-<title>AI 资讯 24 小时 | {date_str}</title>
-<style>
-body{{font-family:-apple-system,'Microsoft YaHei',sans-serif;max-width:820px;margin:0 auto;padding:16px;line-height:1.6;color:#1f2328;font-size:15px}}
-h1{{font-size:23px;margin:0 0 10px;border-bottom:3px solid #2d6cdf;padding-bottom:6px}}
-h2{{font-size:18px;margin:20px 0 4px;color:#2d6cdf}}
-h3{{font-size:15.5px;margin:14px 0 2px;line-height:1.35}}
-blockquote{{margin:2px 0 6px;padding:4px 10px;background:#f4f7fb;border-left:3px solid #9db8e8;color:#5a6472;font-size:13px}}
-p{{margin:4px 0 10px}}
-a{{color:#2d6cdf;text-decoration:none}}
-ul{{background:#f7f9fc;border-left:4px solid #2d6cdf;padding:8px 18px;margin:6px 0}}
-li{{margin:3px 0}}
-</style></head><body>{body}</body></html>"""
+            resp = _llm_session().post(
+                cfg.chat_endpoint,
+                headers={"Authorization": f"Bearer {cfg.api_key}", "Content-Type": "application/json"},
+                json=payload,
+                timeout=limit,
+            )
+            if resp.status_code != 200:
+                raise SystemExit(f"ERROR: LLM 调用失败 {resp.status_code}: {resp.text[:500]}")
+            data = resp.json()
+    usage = data.get("usage") or {}
+    cfg.metrics.add("llm", source=label, prompt_tokens=usage.get("prompt_tokens") or 0,
+                    completion_tokens=usage.get("completion_tokens") or 0)
+    if ((data.get("choices") or [{}])[0].get("message") or {}).get("content"):
+        cache.put(key, data)
+    return data
+
+
+def load_editions(cfg):
+    """cfg.editions 为列表时原样返回；否则读取配置文件（见 editions.py），主版本沿用 REPORT_MD、
+    index.html 与 cfg.seen_db。"""
+    if isinstance(cfg.editions, list):
+        return cfg.editions
+    defaults = {"title": REPORT_TITLE, "feeds": FEEDS, "queries": QUERIES, "sections": SECTION_HEADERS,
+                "target": TARGET_ITEMS, "window_hours": WINDOW_HOURS, "shards": cfg.llm_shards}
+    primary = {"out_md": REPORT_MD, "out_html": "index.html",
+               "seen_db": os.path.abspath(cfg.seen_db) if cfg.seen_db else None}
+    seen_dir = os.path.dirname(os.path.abspath(cfg.seen_db)) if cfg.seen_db else None
+    return editions.load(cfg.editions, defaults, primary, seen_dir)
+
+
+def default_edition():
+    """无配置文件时的唯一版本；调用时按当前的模块默认值（FEEDS、QUERIES 等）现建，导入本模块时不构建。"""
+    return load_editions(Config())[0]
+
+
+def _section_key(header, sections=SECTION_HEADERS):
+    for key, _ in sections:
+        if key.split()[-1] in header:
+            return key
+    return sections[0][0]
+
+
+def _assemble(groups, target, ed=None, date=None):
+    """按版本的分区拼出完整日报；groups: {分区名: [Item, ...]}，ed 默认 default_edition()。
+
+    条目多于 target 时由调用方 trim 裁剪，导语里的条数按裁剪后计。
+    """
+    ed = ed or default_edition()
+    total = min(target, sum(len(v) for v in groups.values()))
+    rep = Report([f"# {ed.title} | {date_label(date or datetime.date.today())}",
+                  f"> 今日 {total} 条 · 来源覆盖厂商官网与中英文科技媒体", ""])
+    for key, header in ed.sections:
+        if groups.get(key):
+            sec = Section(header)
+            sec.items = groups[key]
+            rep.sections.append(sec)
+    return rep
+
+
+def _label(ed, stage):
+    """LLM 指标的来源名：单版本时为 report / map / reduce，多版本时加版本名前缀。"""
+    return stage if ed.name == editions.DEFAULT_NAME else f"{ed.name}/{stage}"
+
+
+def triage(results, ed=None, cfg=None):
+    """两级模型的第一级：候选按排序取前 TRIAGE_MAX_ITEMS 条，分批打分、标分区，只留 cfg.triage_keep 条。
+
+    cfg.triage 为 "llm" 时各批并行调用 cfg.triage_model（单批超时 cfg.triage_timeout 秒），
+    失败或输出解析不了的批次改用本地打分；"local" 时全部本地打分，不调用模型。
+    返回素材副本，标了分区的带 triage_section（分区名），提示词里作为建议分区给出。ed 默认 default_edition()。
+    """
+    cfg = cfg or Config.from_env()
+    ed = ed or default_edition()
+    ranked = rank(results, half_life=cfg.recency_half_life)[:TRIAGE_MAX_ITEMS]
+    if len(ranked) <= cfg.triage_keep:
+        return results
+    k = len(ed.sections)
+    keys = "、".join(f"{j}={key}" for j, (key, _) in enumerate(ed.sections))
+    batches = [ranked[i:i + cfg.triage_batch] for i in range(0, len(ranked), cfg.triage_batch)]
+
+    mode = cfg.triage
+    if mode == "llm" and not _has_time(cfg, LLM_RESERVE, ed, "初筛模型，改用本地打分"):
+        mode = "local"
+
+    def run(batch):
+        fallback = triage_tier.local(batch, ed.sections, half_life=cfg.recency_half_life)
+        if mode == "local":
+            return fallback, False
+        msg = (TRIAGE_PROMPT.replace("__N__", str(len(batch))).replace("__KEYS__", keys)
+               .replace("__ITEMS__", triage_tier.listing(batch)))
+        try:
+            resp = call_llm([{"role": "user", "content": msg}], max_tokens=len(batch) * 12 + 50, stream=False,
+                            label=_label(ed, "triage"), cfg=cfg, model=cfg.triage_model,
+                            timeout=cfg.triage_timeout)
+            got = triage_tier.parse(resp["choices"][0]["message"]["content"], len(batch), k)
+        except (SystemExit, requests.RequestException, ValueError, KeyError, TypeError, IndexError) as e:
+            print(f"[{ed.name}] 初筛批次失败，改用本地打分：{e}")
+            return fallback, True
+        # 模型漏掉的条目按最低分计，分区沿用本地判断
+        return [got.get(i, (0.0, fallback[i - 1][1])) for i in range(1, len(batch) + 1)], False
+
+    done = _run_all([(run, b) for b in batches], min(TRIAGE_WORKERS, len(batches)))
+    scores = [sc for batch_scores, _ in done for sc in batch_scores]
+    failed = sum(f for _, f in done)
+    picked = triage_tier.shortlist(ranked, scores, cfg.triage_keep, k)
+    cfg.metrics.add("triage", source=ed.name, input=len(ranked), batches=len(batches), failed_batches=failed,
+                    output=len(picked))
+    print(f"[{ed.name}] 初筛（{mode}）：{len(ranked)} 条分 {len(batches)} 批 -> 入围 {len(picked)} 条"
+          f"{f'（{failed} 批改用本地打分）' if failed else ''}")
+    return [dict(it, triage_section=ed.sections[sec][0]) if sec is not None else it for it, sec in picked]
+
+
+def generate_mapreduce(results, covered_block, shards, ed=None, date=None, cfg=None):
+    """map：素材轮转分片，并行各自初选成稿；reduce：只看标题与来源行，定出最终 ed.target 条与分区。
+
+    返回已裁剪的 Report。ed 默认 default_edition()。
+
+    单个分片失败只损失该分片；reduce 失败则按各分片自带分区合并后确定性裁剪。
+    """
+    ed = ed or default_edition()
+    k = -(-ed.target * 3 // (2 * shards))  # 每片多选一些，留给 reduce 挑
+    parts = [results[i::shards] for i in range(shards)]
+    headers = "".join(f"「## {h}」" for _, h in ed.sections)
+
+    def run(idx):
+        msg = (MAP_PROMPT.replace("__SHARD__", str(idx + 1)).replace("__SHARDS__", str(shards))
+               .replace("__K__", str(k)).replace("__HEADERS__", headers)
+               .replace("__FORMAT__", ITEM_FORMAT)
+               .replace("__DEDUP__", covered_block)
+               .replace("__CONTEXT__", build_context(parts[idx])))
+        t0 = time.time()
+        try:
+            resp = call_llm([{"role": "user", "content": msg}], max_tokens=k * 600,
+                            label=_label(ed, "map"), cfg=cfg)
+        except (SystemExit, requests.RequestException, ValueError) as e:
+            print(f"[{ed.name}] map 分片 {idx + 1}/{shards} 失败：{e}")
+            return []
+        sections = parse(resp["choices"][0]["message"]["content"]).sections
+        drafts = [(_section_key(sec.header, ed.sections), it) for sec in sections for it in sec.items]
+        print(f"[{ed.name}] map 分片 {idx + 1}/{shards}：{len(drafts)} 条，{time.time() - t0:.1f}s")
+        return drafts
+
+    with ThreadPoolExecutor(max_workers=shards) as ex:
+        drafts = [d for batch in ex.map(run, range(shards)) for d in batch]
+    if not drafts:
+        raise SystemExit("ERROR: map 阶段全部分片失败")
+
+    listing = "\n".join(f"{i} | {it.title} | {it.quote}" for i, (_, it) in enumerate(drafts, 1))
+    schema = "{" + ", ".join(f'"{key}": [编号, ...]' for key, _ in ed.sections) + "}"
+    msg = (REDUCE_PROMPT.replace("__N__", str(ed.target))
+           .replace("__KEYS__", "、".join(key for key, _ in ed.sections))
+           .replace("__SCHEMA__", schema)
+           .replace("__CANDIDATES__", listing))
+    groups = {}
+    try:
+        resp = call_llm([{"role": "user", "content": msg}], max_tokens=600, stream=False,
+                        label=_label(ed, "reduce"), cfg=cfg)
+        text = resp["choices"][0]["message"]["content"]
+        picked = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        used = set()
+        for key, _ in ed.sections:
+            for n in picked.get(key) or []:
+                if isinstance(n, int) and 1 <= n <= len(drafts) and n not in used:
+                    used.add(n)
+                    groups.setdefault(key, []).append(drafts[n - 1][1])
+    except (SystemExit, requests.RequestException, ValueError, KeyError, TypeError,
+            AttributeError) as e:
+        print(f"[{ed.name}] reduce 失败，按分片分区合并：{e}")
+        groups = {}
+    if not groups:
+        for key, it in drafts:
+            groups.setdefault(key, []).append(it)
+    return _assemble(groups, ed.target, ed, date).trim(ed.target)
+
+
+def md_to_html(md, date_str):
+    return render_html(parse(md), date_str)
 
 
 def count_items(md):
-    """统计资讯条目数（以 '### ' 开头的行）。"""
-    return sum(1 for l in md.split("\n") if l.strip().startswith("### "))
+    """统计资讯条目数。"""
+    return parse(md).count()
 
 
 def enforce_count(md, target=20):
@@ -421,94 +1625,375 @@ def enforce_count(md, target=20):
     模型常会多产出（30+ 条），这里不依赖模型听话，而是解析分区后按比例
     保留各分区前若干条，保证三个分区都在且总数恰为 target。
     """
-    lines = md.split("\n")
-    preamble = []
-    i = 0
-    while i < len(lines):
-        if lines[i].lstrip().startswith("## "):
-            break
-        preamble.append(lines[i])
-        i += 1
-    sections = []  # [(header_line, [ [item_lines...] ])]
-    cur_header = None
-    cur_items = []
-    cur_item = []
-    while i < len(lines):
-        s = lines[i]
-        if s.lstrip().startswith("## "):
-            if cur_header is not None:
-                if cur_item:
-                    cur_items.append(cur_item)
-                sections.append((cur_header, cur_items))
-            cur_header = s
-            cur_items = []
-            cur_item = []
-        elif s.lstrip().startswith("### "):
-            if cur_item:
-                cur_items.append(cur_item)
-            cur_item = [s]
-        else:
-            if cur_item:
-                cur_item.append(s)
-        i += 1
-    if cur_header is not None:
-        if cur_item:
-            cur_items.append(cur_item)
-        sections.append((cur_header, cur_items))
-
-    total = sum(len(items) for _, items in sections)
-    if total <= target:
+    rep = parse(md)
+    if rep.count() <= target:
         return md
-
-    counts = [len(items) for _, items in sections]
-    quotas = [max(1, round(target * c / total)) for c in counts]
-    diff = target - sum(quotas)
-    k = len(quotas) - 1
-    while diff != 0 and k >= 0:
-        if diff > 0 and quotas[k] < counts[k]:
-            quotas[k] += 1
-            diff -= 1
-        elif diff < 0 and quotas[k] > 1:
-            quotas[k] -= 1
-            diff += 1
-        k -= 1
-
-    out = list(preamble)
-    num = 0
-    for (header, items), q in zip(sections, quotas):
-        if q <= 0:
-            continue
-        out.append(header)
-        for it in items[:q]:
-            num += 1
-            first = re.sub(r"^(###\s*)\d+", lambda m: m.group(1) + str(num), it[0])
-            out.append(first)
-            out.extend(it[1:])
-    return "\n".join(out)
+    return rep.trim(target).to_markdown()
 
 
-def main():
-    results = gather()
-    context = build_context(results)
-    covered = load_covered(limit=3)
-    covered_block = "\n".join(f"- {it}" for it in covered) or "（无，本期为首期日报）"
-    user_msg = (PROMPT.replace("__DATE__", DATE_STR)
-                .replace("__CONTEXT__", context)
-                .replace("__DEDUP__", covered_block))
+def generate_single(results, covered_block, ed=None, date=None, cfg=None):
+    """一次调用生成整份日报；流式模式下边收边写 <报告>.partial，中途失败也保留已生成部分。"""
+    cfg = cfg or Config.from_env()
+    ed = ed or default_edition()
+    label = date_label(date or datetime.date.today())
+    with cfg.metrics.timer("prompt", source=ed.name):
+        user_msg = ((ed.prompt or PROMPT).replace("__DATE__", label)
+                    .replace("__TITLE__", ed.title)
+                    .replace("__N__", str(ed.target))
+                    .replace("__SECTIONS__", "；".join(h for _, h in ed.sections))
+                    .replace("__FIRST__", ed.sections[0][1])
+                    .replace("__FORMAT__", ITEM_FORMAT)
+                    .replace("__CONTEXT__", build_context(results))
+                    .replace("__DEDUP__", covered_block))
+        est = estimate_tokens(user_msg)
+    cfg.metrics.add("prompt", source=ed.name, estimated_tokens=est)
     messages = [{"role": "user", "content": user_msg}]
-    resp = call_llm(messages)
+    print(f"[{ed.name}] 提示词约 {est} tokens")
+    if not cfg.llm_stream or cfg.out_dir is None:
+        resp = call_llm(messages, label=_label(ed, "report"), cfg=cfg)
+    else:
+        partial = os.path.join(cfg.out_dir, ed.md_path(label)) + ".partial"
+        with open(partial, "w", encoding="utf-8") as f:
+            def on_delta(delta):
+                f.write(delta)
+                f.flush()
+            try:
+                resp = call_llm(messages, stream=True, on_delta=on_delta, label=_label(ed, "report"),
+                                cfg=cfg)
+            except (requests.RequestException, ValueError) as e:
+                raise SystemExit(f"ERROR: LLM 流式接收中断（已生成部分见 {partial}）：{e}")
+        os.remove(partial)
     text = resp["choices"][0]["message"]["content"]
     if not text.strip():
         raise SystemExit("ERROR: 模型未返回正文，可能网关不支持该模型或请求格式不符")
-    text = text.strip()
-    if not text.lstrip().startswith("#"):
-        text = f"# AI 资讯 24 小时 | {DATE_STR}\n\n" + text
-    text = enforce_count(text, 20)
-    with open(OUT_MD, "w", encoding="utf-8") as f:
-        f.write(text)
-    with open("index.html", "w", encoding="utf-8") as f:
-        f.write(md_to_html(text, DATE_STR))
-    print(f"OK: 已生成 {OUT_MD} ({len(text)} 字符, {count_items(text)} 条, 检索到 {len(results)} 条素材)")
+    return text
+
+
+class _Candidates:
+    """成稿条目与素材的对应：先按规范化链接（含 alternates），再按标题切词重合度。"""
+
+    def __init__(self, results):
+        self.results = results
+        self.by_url = {}
+        for it in results:
+            for u in [it.get("url") or ""] + (it.get("alternates") or []):
+                if u:
+                    self.by_url.setdefault(canonical_url(u), it)
+        self.titles = [set(title_tokens(it.get("title") or "")) for it in results]
+
+    def match(self, item):
+        if item.url:
+            hit = self.by_url.get(canonical_url(item.url))
+            if hit is not None:
+                return hit
+        words = set(title_tokens(item.title))
+        best, score = None, 0.5
+        for it, t in zip(self.results, self.titles):
+            if words and t and len(words & t) / len(words | t) > score:
+                best, score = it, len(words & t) / len(words | t)
+        return best
+
+
+def _section_for(rep, key, ed):
+    """日报里分区 key 对应的 Section；没有时按版本的分区顺序插入一个。"""
+    word = key.split()[-1]
+    for sec in rep.sections:
+        if word in sec.header:
+            return sec
+    order = [k for k, _ in ed.sections]
+    sec = Section(dict(ed.sections)[key])
+    pos = sum(1 for s in rep.sections if order.index(_section_key(s.header, ed.sections)) < order.index(key))
+    rep.sections.insert(pos, sec)
+    return sec
+
+
+def _slots(rep, ed, missing):
+    """需要补写的分区列表：先给每个缺失分区一条，其余缺额依次给当前条数最少的分区。"""
+    counts = {key: 0 for key, _ in ed.sections}
+    for sec in rep.sections:
+        counts[_section_key(sec.header, ed.sections)] += len(sec.items)
+    slots = list(missing)
+    for key in missing:
+        counts[key] += 1
+    for _ in range(ed.target - rep.count() - len(missing)):
+        key = min(counts, key=lambda k: counts[k])
+        counts[key] += 1
+        slots.append(key)
+    return slots
+
+
+def repair(rep, results, ed=None, date=None, cfg=None, rounds=None):
+    """校验成稿，对每处缺陷单独发小请求修补并拼回原稿，不整份重写。
+
+    缺原文链接：能对上素材的直接补链接，对不上的删掉（缺额由下面补条填上）；
+    正文过短：带上对应素材请模型只扩写这一条；
+    缺条 / 缺分区：按排序依次取未被采用的素材，请模型为指定分区各写一条。
+    同一轮的请求并行发出，修完再校验一次，最多 rounds（默认 cfg.repair_rounds）轮；返回修补后的 Report（已裁剪到 ed.target）。
+    ed 默认 default_edition()。
+    """
+    cfg = cfg or Config.from_env()
+    ed = ed or default_edition()
+    rounds = cfg.repair_rounds if rounds is None else rounds
+    min_body = cfg.min_body_chars
+    label = date_label(date or datetime.date.today())
+    cands = _Candidates(results)
+    found = fixed = calls = 0
+    for rnd in range(rounds):
+        defects = validate(rep, ed.target, ed.sections, min_body)
+        if rnd == 0:
+            found = len(defects)
+        if not defects:
+            break
+        for kind, item in defects:
+            if kind != "link":
+                continue
+            cand = cands.match(item)
+            if cand is not None and cand.get("url"):
+                item.set_link(cand["url"])
+                fixed += 1
+            else:
+                for sec in rep.sections:
+                    sec.items = [it for it in sec.items if it is not item]
+        rep.sections = [sec for sec in rep.sections if sec.items]
+        tasks = []
+        for kind, item in defects:
+            cand = cands.match(item) if kind == "short" else None
+            if cand is not None:
+                msg = (EXPAND_PROMPT.replace("__MIN__", str(min_body)).replace("__FORMAT__", ITEM_FORMAT)
+                       .replace("__ITEM__", "\n".join([f"### {item.title}"] + item.lines).strip())
+                       .replace("__CONTEXT__", build_context([cand])))
+                tasks.append(("short", item, msg))
+        missing = [key for kind, key in validate(rep, ed.target, ed.sections, min_body)
+                   if kind == "section"]
+        used = {id(c) for c in map(cands.match, rep.items()) if c is not None}
+        fresh = (it for it in results if id(it) not in used)
+        for key, cand in zip(_slots(rep, ed, missing), fresh):
+            msg = (ITEM_PROMPT.replace("__TITLE__", ed.title).replace("__DATE__", label)
+                   .replace("__SECTION__", dict(ed.sections)[key]).replace("__FORMAT__", ITEM_FORMAT)
+                   .replace("__CONTEXT__", build_context([cand])))
+            tasks.append(("add", (key, cand), msg))
+        if not tasks or not _has_time(cfg, REPAIR_RESERVE, ed, "修补请求"):
+            break
+
+        def run(task):
+            try:
+                resp = call_llm([{"role": "user", "content": task[2]}], max_tokens=900, stream=False,
+                                label=_label(ed, "repair"), cfg=cfg)
+            except (SystemExit, requests.RequestException, ValueError) as e:
+                print(f"[{ed.name}] 修补请求失败：{e}")
+                return None
+            items = parse(resp["choices"][0]["message"]["content"]).items()
+            return items[0] if items else None
+
+        with ThreadPoolExecutor(max_workers=min(len(tasks), cfg.gather_workers)) as ex:
+            outs = list(ex.map(run, tasks))
+        calls += len(tasks)
+        for (kind, target, _), new in zip(tasks, outs):
+            if new is None:
+                continue
+            if kind == "short":
+                if body_chars(new) <= body_chars(target):
+                    continue
+                target.lines = new.lines
+                if not new.url:
+                    target.set_link(target.url)
+                fixed += 1
+            else:
+                key, cand = target
+                if not new.url.startswith(("http://", "https://")):
+                    new.set_link(cand["url"])
+                _section_for(rep, key, ed).items.append(new)
+                fixed += 1
+        rep.trim(ed.target)
+    set_count_line(rep)
+    left = len(validate(rep, ed.target, ed.sections, min_body))
+    cfg.metrics.add("repair", source=ed.name, defects=found, fixed=fixed, calls=calls, remaining=left)
+    if found:
+        print(f"[{ed.name}] 校验修补：缺陷 {found} 处 -> 剩余 {left} 处（修补 {fixed} 处，请求 {calls} 个）")
+    return rep
+
+
+def _has_time(cfg, reserve, ed, stage):
+    """运行剩余时间是否多于 reserve 秒；不够时记一笔并提示跳过 stage。"""
+    if cfg.deadline is None or cfg.deadline.remaining() > reserve:
+        return True
+    cfg.metrics.add("deadline", source=ed.name, skipped=1)
+    print(f"[{ed.name}] 运行预算剩余 {max(0, cfg.deadline.remaining()):.0f}s，跳过{stage}")
+    return False
+
+
+def produce(ed, pool, date, cfg):
+    """从共享素材池生成一个版本：按来源/关键词筛选 → 发布时间窗 → 跨日去重 → 近似去重 → 初筛（可选）
+    → 原文正文（可选）→ 装箱 → 生成 → 校验修补。
+
+    返回 Report；cfg.out_dir 不为 None 时写出 Markdown 与 HTML。
+    """
+    label = date_label(date)
+    now = time.time()
+    results = [it for it in pool if ed.wants(it)
+               and it.get("first_seen", now) >= now - ed.window_hours * 3600]
+    results, stale, undated = pubdate.within(results, ed.window_hours + cfg.window_grace_hours, now, cfg.undated)
+    cfg.metrics.add("edition", source=ed.name, dropped_stale=stale, undated=undated)
+    days = max(cfg.seen_days, -(-int(ed.window_hours) // 24))
+    since = date - datetime.timedelta(days=days)
+    store = open_seen_store(ed.seen_db, ed.out_md, days, cfg.out_dir, date, cfg) if ed.seen_db else None
+    if store is not None:
+        n = len(results)
+        results = [it for it in results if not store.is_seen(it, since, date)]
+        cfg.metrics.add("edition", source=ed.name, dropped_seen=n - len(results))
+    cfg.metrics.add("edition", source=ed.name, items=len(results))
+    print(f"[{ed.name}] 素材池 {len(pool)} 条 -> 本版本 {len(results)} 条"
+          f"（发布超过 {ed.window_hours + cfg.window_grace_hours:g} 小时剔除 {stale} 条，无发布时间 {undated} 条）")
+    with cfg.metrics.timer("dedup", source=ed.name):
+        results = collapse_duplicates(results, ed.name, cfg.near_dedup, cfg.metrics)
+    if cfg.triage != "off":
+        with cfg.metrics.timer("triage", source=ed.name):
+            results = triage(results, ed, cfg)
+    if cfg.fulltext_top and _has_time(cfg, LLM_RESERVE, ed, "原文正文"):
+        with cfg.metrics.timer("fulltext", source=ed.name):
+            results = enrich(results, cfg.fulltext_top, ed.name, cfg.deadline, cfg)
+    with cfg.metrics.timer("pack", source=ed.name):
+        results = select_context(results, ed.name, cfg)
+    covered = store.titles(since, date) if store is not None else []
+    covered_block = "\n".join(f"- {it}" for it in covered) or "（无，本期为首期日报）"
+    shards = ed.shards or 0
+    with cfg.metrics.timer("generate", source=ed.name):
+        if shards > 1:
+            rep = generate_mapreduce(results, covered_block, shards, ed, date, cfg)
+        else:
+            text = generate_single(results, covered_block, ed, date, cfg).strip()
+            if not text.lstrip().startswith("#"):
+                text = f"# {ed.title} | {label}\n\n" + text
+            rep = parse(text).trim(ed.target)  # 之后计数、渲染、写索引都用这一次解析的结果
+    if cfg.repair_rounds:
+        with cfg.metrics.timer("repair", source=ed.name):
+            rep = repair(rep, results, ed, date, cfg)
+    if cfg.out_dir is not None:
+        with cfg.metrics.timer("render", source=ed.name):
+            text = rep.to_markdown()
+            html = render_html(rep, label, title=ed.title)
+        cfg.metrics.add("render", source=ed.name, items=rep.count(), markdown_bytes=len(text.encode("utf-8")),
+                        html_bytes=len(html.encode("utf-8")))
+        out_md = os.path.normpath(os.path.join(cfg.out_dir, ed.md_path(label)))
+        with open(out_md, "w", encoding="utf-8") as f:
+            f.write(text)
+        with open(os.path.join(cfg.out_dir, ed.out_html), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"OK: [{ed.name}] 已生成 {out_md} ({len(text)} 字符, {rep.count()} 条, 检索到 {len(results)} 条素材)")
+    if store is not None:
+        with cfg.metrics.timer("seen_store", source=ed.name):
+            store.add(date, rep.entries())
+            store.prune(since)
+            store.close()
+    return rep
+
+
+def credit_sources(pool, reports, feeds, cfg):
+    """把各版本日报里的链接对回素材池里抓到它的来源，记入 source_stats(cfg) 的 used。
+
+    按规范化链接匹配，同一条被多个来源抓到时各记一次；feeds 之外的 origin 是检索词。返回 {来源名: 条数}。
+    """
+    by_url = {}
+    for it in pool:
+        if it.get("url"):
+            by_url.setdefault(canonical_url(it["url"]), set()).update(it.get("origin") or ())
+    feeds = set(feeds)
+    used = {}
+    for rep in reports.values():
+        for _, url in rep.entries():
+            for origin in by_url.get(canonical_url(url or ""), ()):
+                name = ("feed:" if origin in feeds else "search:") + origin
+                used[name] = used.get(name, 0) + 1
+    stats = source_stats(cfg)
+    if stats is not None:
+        stats.credit(used)
+    return used
+
+
+def generate_editions(date=None, config=None, metrics=None):
+    """生成 config 里的全部版本，返回 {版本名: Report}。
+
+    所有版本共用一轮抓取（来源取并集）与一个素材池，各版本的生成并行进行；
+    有版本失败时其余版本照常完成，最后以 SystemExit 报告失败的版本。
+    整次运行受 config.run_budget 约束：抓取到 gather_cutoff 为止，之后各阶段的请求超时取剩余时间，
+    剩余不足时跳过可选阶段（初筛模型改本地打分、不抓原文正文、不再发修补请求），按时交付一份降级的日报。
+    date 默认今天；config 默认 Config.from_env()；metrics 为记录本次运行指标的 Metrics，默认新建一份
+    （调用方传入自己的实例，运行结束或失败后从它读取）。可在同一进程里反复、并发调用：
+    抓取连接池、HTTP 缓存与 LLM 连接在多次调用之间复用，指标与检索链的搜索源统计每次运行各自一份。
+    """
+    date = date or datetime.date.today()
+    cfg = copy.copy(config or Config.from_env())  # 本次运行的截止时间与指标只记在副本上
+    if not cfg.api_key:
+        raise SystemExit("ERROR: 未配置 LLM 网关 key（ANTHROPIC_API_KEY）")
+    cfg.deadline = Deadline(cfg.run_budget)
+    cfg.metrics = metrics if metrics is not None else Metrics()
+    eds = load_editions(cfg)
+    feeds, queries = editions.sources(eds)
+    cfg.metrics.info.update({"date": date.isoformat(), "model": cfg.model, "llm_shards": cfg.llm_shards,
+                             "triage": cfg.triage, "triage_model": cfg.triage_model,
+                             "run_budget": cfg.run_budget, "gather_cutoff": cfg.gather_cutoff,
+                             "llm_stream": cfg.llm_stream, "feeds": len(feeds), "queries": len(queries),
+                             "editions": [ed.name for ed in eds]})
+    with cfg.metrics.timer("gather"):
+        pool = None
+        if cfg.use_candidates:
+            pool = load_candidates(cfg.candidate_db, hours=max(ed.window_hours for ed in eds), date=date, cfg=cfg)
+        if pool is None:
+            pool = gather(limit=None, feeds=feeds, queries=queries, date=date,
+                          deadline=cfg.deadline.sub(cfg.gather_cutoff), cfg=cfg)
+    with cfg.metrics.timer("dates"):
+        undated = pubdate.normalize(pool)
+    cfg.metrics.add("dates", items=len(pool), undated=undated)
+    reports, failed = {}, []
+    if len(eds) == 1:
+        reports[eds[0].name] = produce(eds[0], pool, date, cfg)
+    else:
+        print(f"{len(eds)} 个版本：{', '.join(ed.name for ed in eds)}（素材池 {len(pool)} 条）")
+        with ThreadPoolExecutor(max_workers=len(eds), thread_name_prefix="edition") as ex:
+            futs = [(ed, ex.submit(produce, ed, pool, date, cfg)) for ed in eds]
+            for ed, fut in futs:
+                try:
+                    reports[ed.name] = fut.result()
+                except (SystemExit, Exception) as e:
+                    print(f"[{ed.name}] 生成失败：{e}")
+                    failed.append(ed.name)
+    used = credit_sources(pool, reports, feeds, cfg)
+    cfg.metrics.add("sources", credited=sum(used.values()), sources=len(used))
+    llm_cache(cfg).prune()
+    if cfg.fulltext_top and text_cache(cfg) is not None:
+        text_cache(cfg).prune()
+    if failed:
+        raise SystemExit(f"ERROR: {len(failed)}/{len(eds)} 个版本生成失败：{', '.join(failed)}")
+    return reports
+
+
+def generate_report(date=None, config=None, metrics=None):
+    """生成 config 的全部版本，返回主版本（第一个）的 Report。参数同 generate_editions()。"""
+    return next(iter(generate_editions(date, config, metrics).values()))
+
+
+def main():
+    """命令行入口：按环境变量生成当天日报，外包一层指标与可选剖析；失败退出时也写出已采集的指标。"""
+    cfg = Config.from_env()
+    if not cfg.api_key:
+        raise SystemExit("ERROR: 环境变量 ANTHROPIC_API_KEY 未设置")
+    date = datetime.date.today()
+    stem = os.path.splitext(REPORT_MD.replace("{date}", date_label(date)))[0]
+    metrics_json = os.environ.get("NEWS_METRICS_JSON") or stem + ".metrics.json"
+    metrics_prom = os.environ.get("NEWS_METRICS_PROM")  # 如 node_exporter 的 textfile 目录下的 newshub.prom
+    cfg.editions = load_editions(cfg)
+    metrics = Metrics()
+    try:
+        with profile(os.environ.get("NEWS_PROFILE") or "", stem, metrics):
+            generate_editions(date, cfg, metrics)
+    except BaseException as e:
+        metrics.info["error"] = str(e) or type(e).__name__
+        raise
+    finally:
+        metrics.write_json(metrics_json)
+        if metrics_prom:
+            metrics.write_prometheus(metrics_prom)
+        print(f"指标已写入 {metrics_json}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSS/Atom 条件 GET 磁盘缓存（ETag / Last-Modified）
+
+每个 URL 对应缓存目录下的两个文件（文件名为 URL 的 sha1）：
+  <key>.json  验证器与元数据（url / etag / last_modified / size / used）
+  <key>.body  上次 200 响应的原始字节
+请求时带上 If-None-Match / If-Modified-Since；服务端返回 304 时直接读盘。
+写入走临时文件 + os.replace，多线程并发抓取时不会读到半截文件。
+prune() 先删掉超过 max_age 未使用的条目，再按最近使用时间淘汰到 max_bytes 以内。
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+
+class HttpCache:
+    def __init__(self, root, max_bytes=64 * 1024 * 1024, max_age=7 * 86400):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, url, ext):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def _write(self, path, data):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _meta(self, url):
+        try:
+            with open(self._path(url, "json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url else None
+
+    def validators(self, url):
+        """返回该 URL 的条件请求头；无缓存或缓存体缺失时返回空 dict。"""
+        meta = self._meta(url)
+        if not meta or not os.path.exists(self._path(url, "body")):
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def load(self, url):
+        """304 命中时读取缓存体，并刷新最近使用时间。"""
+        meta = self._meta(url)
+        if not meta:
+            return None
+        try:
+            with open(self._path(url, "body"), "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        meta["used"] = time.time()
+        self._write(self._path(url, "json"), json.dumps(meta).encode("utf-8"))
+        return body
+
+    def store(self, url, headers, body):
+        """保存 200 响应；没有任何验证器的响应不缓存（无法做条件请求）。"""
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        meta = {"url": url, "etag": etag, "last_modified": last_modified,
+                "size": len(body), "used": time.time()}
+        self._write(self._path(url, "body"), body)
+        self._write(self._path(url, "json"), json.dumps(meta).encode("utf-8"))
+
+    def prune(self):
+        """按年龄与总大小淘汰条目，返回删除的条目数。"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    meta = {}
+                entries.append((meta.get("used", 0), meta.get("size", 0), path[:-5]))
+            entries.sort(reverse=True)
+            now = time.time()
+            total, removed = 0, 0
+            for used, size, base in entries:
+                expired = now - used > self.max_age
+                if not expired and total + size <= self.max_bytes:
+                    total += size
+                else:
+                    for ext in (".json", ".body"):
+                        try:
+                            os.remove(base + ext)
+                        except OSError:
+                            pass
+                    removed += 1
+            return removed
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台增量抓取：全天按来源轮询 RSS 与关键词检索，写入候选素材库（<NEWS_CACHE_DIR>/candidates.sqlite3）
+
+generate.py 生成时若候选库新鲜（最近一次轮询在 NEWS_CANDIDATE_FRESH_HOURS 内），直接读最近 24 小时的素材，
+不再在定时任务里集中抓取；每个 feed 也不再只取前 3 条，一天内发布的条目都能进入候选。
+
+轮询计划（每个来源独立，存在库里，重启后接着用）：
+  feed    初始间隔 NEWS_INGEST_FEED_MINUTES（默认 30 分钟），范围 10 分钟 – 3 小时
+  检索    初始间隔 NEWS_INGEST_QUERY_MINUTES（默认 120 分钟），范围 1 – 6 小时
+  有新条目则间隔减半，没有则 ×1.5；失败（含返回空）按连续失败次数指数退避
+抓取复用 generate.py 的 fetch_feed()（条件 GET 缓存在高频轮询下大多命中 304）与分层检索，
+聚合 / 短链在入库前经 resolve_links() 换成原始报道链接（映射持久化，同一链接只解析一次）。
+库内只保留最近 NEWS_INGEST_KEEP_HOURS（默认 48）小时的素材；有周报一类长窗口版本时需相应调大。
+轮询的来源为所有版本（editions.json）的 feed 与检索词的并集；版本配置与 NEWS_INGEST_* 只在启动时（main）读取。
+
+用法：
+  python ingest.py          常驻运行（Ctrl-C 退出）
+  python ingest.py --once   到期的来源各轮询一次后退出（适合在 cron / CI 里生成前预热）
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import generate as g
+from candidates import CandidateStore
+
+FEED_MINUTES = 30  # 以下为默认值；命令行由 NEWS_INGEST_* 环境变量覆盖（只在 main() 里读）
+QUERY_MINUTES = 120
+MAX_ITEMS = 50
+KEEP_HOURS = 48
+
+
+def build_sources(eds, feed_minutes=FEED_MINUTES, query_minutes=QUERY_MINUTES, max_items=MAX_ITEMS):
+    """来源名 -> (类别, 抓取函数, 初始间隔, 最短, 最长)，间隔单位为秒；覆盖 eds（全部版本）的来源。
+
+    抓取函数接收 (cfg, search)：search 为本轮的检索链（g.make_search）。
+    """
+    feeds, queries = g.editions.sources(eds)
+    out = {}
+    for url in feeds:
+        out["feed:" + url] = ("feed", lambda cfg, search, u=url: g.resolve_links(
+            g.fetch_feed(u, max_items=max_items, cfg=cfg), cfg), feed_minutes * 60, 600, 3 * 3600)
+    for q in queries:
+        out["search:" + q] = ("search", lambda cfg, search, q=q: g.resolve_links(g.search_query(q, search), cfg),
+                              query_minutes * 60, 3600, 6 * 3600)
+    return out
+
+
+def poll_once(store, pool, cfg, sources, keep_hours=KEEP_HOURS):
+    """轮询 sources（build_sources 的结果）里所有到期的来源；抓取在线程池里并发，写库在当前线程。
+    返回 (轮询数, 新增条数)；库里早于 keep_hours 小时的素材随后删除。
+
+    每轮新建检索链，搜索源的停用状态不会跨轮次累积。
+    """
+    due = store.due(sources)
+    if not due:
+        return 0, 0
+    search = g.make_search(cfg)
+    futs = {pool.submit(sources[name][1], cfg, search): name for name in due}
+    total = 0
+    for fut in as_completed(futs):
+        name = futs[fut]
+        kind, _, base, lo, hi = sources[name]
+        try:
+            items = fut.result()
+        except Exception as e:
+            print(f"{name} error: {e}")
+            items = []
+        added = store.add(items, kind, name.split(":", 1)[1])
+        store.schedule(name, bool(items), added, base, lo, hi)
+        total += added
+    search.close()
+    store.prune(time.time() - keep_hours * 3600)
+    return len(due), total
+
+
+def main():
+    once = "--once" in sys.argv[1:]
+    env = os.environ
+    cfg = g.Config.from_env()
+    sources = build_sources(g.load_editions(cfg),
+                            float(env.get("NEWS_INGEST_FEED_MINUTES") or FEED_MINUTES),
+                            float(env.get("NEWS_INGEST_QUERY_MINUTES") or QUERY_MINUTES),
+                            int(env.get("NEWS_INGEST_MAX_ITEMS") or MAX_ITEMS))
+    keep_hours = float(env.get("NEWS_INGEST_KEEP_HOURS") or KEEP_HOURS)
+    path = cfg.candidate_db
+    g.warm("candidates", path, cfg)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    store = CandidateStore(path)
+    pool = ThreadPoolExecutor(max_workers=cfg.gather_workers, thread_name_prefix="ingest")
+    try:
+        while True:
+            t0 = time.time()
+            polled, added = poll_once(store, pool, cfg, sources, keep_hours)
+            if polled:
+                window = len(store.window(time.time() - g.WINDOW_HOURS * 3600))
+                print(f"{time.strftime('%H:%M:%S')} 轮询 {polled} 个来源，新增 {added} 条，"
+                      f"最近 {g.WINDOW_HOURS} 小时共 {window} 条（{time.time() - t0:.1f}s）")
+                if g.http_cache(cfg) is not None:
+                    g.http_cache(cfg).prune()
+            if once:
+                break
+            wake = store.next_wakeup(sources)
+            time.sleep(min(60.0, max(1.0, wake - time.time())))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
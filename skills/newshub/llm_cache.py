@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 响应缓存（按请求内容寻址，支持录制 / 回放）
+
+键 = sha256(模型 + 参数 + messages 的规范化 JSON)，stream 标志不参与（流式与否返回同一内容）。
+响应存为 <root>/<键前两位>/<键>.json；写入走临时文件 + os.replace，可多线程并发。
+模式（NEWS_LLM_CACHE）：
+  on       默认；命中直接返回，未命中调用网关后写入
+  replay   只读回放；未命中即报错，不调用网关（迭代下游 enforce_count / md_to_html 时用）
+  refresh  总是调用网关并覆盖写入
+  off      不读不写
+prune() 删除超过 ttl 的条目，再按创建时间淘汰到 max_bytes 以内。
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+MODES = ("on", "replay", "refresh", "off")
+
+
+def request_key(payload):
+    body = {k: v for k, v in payload.items() if k != "stream"}
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, root, mode="on", ttl=48 * 3600, max_bytes=32 * 1024 * 1024):
+        if mode not in MODES:
+            raise SystemExit(f"ERROR: NEWS_LLM_CACHE 取值须为 {'/'.join(MODES)}，当前为 {mode!r}")
+        self.root = root
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key):
+        """返回缓存的响应 dict；未命中 / 过期 / 模式不读时返回 None。"""
+        if self.mode not in ("on", "replay"):
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.mode == "on" and time.time() - entry.get("created", 0) > self.ttl:
+            return None
+        return entry.get("response")
+
+    def put(self, key, response):
+        if self.mode not in ("on", "refresh"):
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "response": response}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def prune(self):
+        """按 ttl 与总大小淘汰，返回删除的条目数。"""
+        if self.mode not in ("on", "refresh") or not os.path.isdir(self.root):
+            return 0
+        with self._lock:
+            entries = []
+            for sub in os.listdir(self.root):
+                d = os.path.join(self.root, sub)
+                if not os.path.isdir(d):
+                    continue
+                for name in os.listdir(d):
+                    if name.endswith(".json"):
+                        p = os.path.join(d, name)
+                        st = os.stat(p)
+                        entries.append((st.st_mtime, st.st_size, p))
+            entries.sort(reverse=True)
+            now = time.time()
+            total, removed = 0, 0
+            for mtime, size, p in entries:
+                if now - mtime <= self.ttl and total + size <= self.max_bytes:
+                    total += size
+                    continue
+                try:
+                    os.remove(p)
+                    removed += 1
+                except OSError:
+                    pass
+            return removed
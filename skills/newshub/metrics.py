@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标：各阶段计时 + 计数（请求 / 字节 / 条目 / token），写成 JSON，可选 Prometheus textfile
+
+  m = Metrics()                                     每次运行一份（generate.py 放在本次运行的 Config.metrics 上）
+  with m.timer("feed", source=host): ...            累计该 (阶段, 来源) 的次数、总耗时、最长单次耗时
+  m.add("feed", source=host, items=3)               累加任意计数字段
+  m.info["model"] = MODEL                           记录标量信息
+同一阶段下不同 source 分别统计（如每个 feed host、每个搜索源），阶段汇总为各 source 之和。
+多线程安全；模块里没有全局实例，同一进程里并发的多次运行各记各的。profile(mode, path) 可选开启 cProfile（写 .prof）或 tracemalloc（峰值与前 15 处分配写入 info）。
+"""
+
+import os
+import json
+import time
+import threading
+import contextlib
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._stages = {}  # stage -> {source: {count, seconds, max_seconds, 计数...}}
+            self.info = {}
+            self.started = time.time()
+            self._t0 = time.perf_counter()
+
+    def _slot(self, stage, source):
+        return self._stages.setdefault(stage, {}).setdefault(
+            source, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+
+    @contextlib.contextmanager
+    def timer(self, stage, source=""):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            with self._lock:
+                s = self._slot(stage, source)
+                s["count"] += 1
+                s["seconds"] += dt
+                s["max_seconds"] = max(s["max_seconds"], dt)
+
+    def add(self, stage, source="", **counters):
+        with self._lock:
+            s = self._slot(stage, source)
+            for k, v in counters.items():
+                s[k] = s.get(k, 0) + v
+
+    def snapshot(self):
+        with self._lock:
+            stages = {}
+            for stage, sources in self._stages.items():
+                total = {}
+                for s in sources.values():
+                    for k, v in s.items():
+                        total[k] = max(total.get(k, 0), v) if k == "max_seconds" else total.get(k, 0) + v
+                entry = {k: round(v, 4) if isinstance(v, float) else v for k, v in total.items()}
+                named = {src: {k: round(v, 4) if isinstance(v, float) else v for k, v in s.items()}
+                         for src, s in sorted(sources.items()) if src}
+                if named:
+                    entry["sources"] = named
+                stages[stage] = entry
+            return {
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+                "wall_seconds": round(time.perf_counter() - self._t0, 3),
+                "info": dict(self.info),
+                "stages": stages,
+            }
+
+    def write_json(self, path):
+        _atomic_write(path, json.dumps(self.snapshot(), ensure_ascii=False, indent=2) + "\n")
+
+    def write_prometheus(self, path, prefix="newshub"):
+        """node_exporter textfile collector 格式：每个 (阶段, 来源, 字段) 一条样本。"""
+        snap = self.snapshot()
+        series = {}
+        for stage, entry in snap["stages"].items():
+            rows = entry.get("sources") or {"": entry}
+            for src, s in rows.items():
+                labels = f'stage="{_esc(stage)}"' + (f',source="{_esc(src)}"' if src else "")
+                for k, v in s.items():
+                    if k == "sources" or not isinstance(v, (int, float)):
+                        continue
+                    name = f"{prefix}_stage_{'calls' if k == 'count' else k}"
+                    if k != "max_seconds":
+                        name += "_total"
+                    series.setdefault(name, []).append(f"{name}{{{labels}}} {v}")
+        lines = [f"# TYPE {prefix}_wall_seconds gauge", f"{prefix}_wall_seconds {snap['wall_seconds']}"]
+        for name in sorted(series):
+            lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            lines.extend(series[name])
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+
+def _esc(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _atomic_write(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+@contextlib.contextmanager
+def profile(mode, path, metrics=None):
+    """mode: "cprofile" 写 <path>.prof；"tracemalloc" 把峰值与分配最多的 15 处写入 metrics.info；其他值不做事。"""
+    if mode == "cprofile":
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(path + ".prof")
+            print(f"cProfile 结果已写入 {path}.prof（python -m pstats 查看）")
+    elif mode == "tracemalloc":
+        import tracemalloc
+        tracemalloc.start(10)
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:15]
+            tracemalloc.stop()
+            if metrics is not None:
+                metrics.info["tracemalloc_peak_kb"] = peak // 1024
+                metrics.info["tracemalloc_top"] = [
+                    {"where": f"{st.traceback[0].filename}:{st.traceback[0].lineno}",
+                     "kb": st.size // 1024, "blocks": st.count} for st in top]
+    else:
+        yield
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜索源对冲并发（hedged fan-out）+ 单 query 截止时间 + 搜索源健康统计
+
+搜索源按优先级分层，如 [[tavily], [gnews, hn], [ddg]]；同层结果合并。
+  - 第一层立即发出；每隔 hedge_delay 秒若还没拿到可用结果，就再发下一层
+    （上一层已失败则立即发下一层，不等延迟）
+  - 任一层全部返回且结果非空即采用（按层优先级检查），不再等待其余层
+  - 调用方可再给一个剩余预算（运行截止时间），截止时间取两者较小者
+  - 到 deadline 仍无完整结果时，取已返回的部分结果；尚未开始的请求取消，
+    已在途的请求因超时取自剩余时间，最迟在 deadline 附近结束
+  - 每个源记录调用次数 / 成功次数 / 平均耗时；连续失败 max_failures 次
+    或返回 None（未配置，如无 TAVILY_API_KEY）后，本次运行内不再调用
+  - close() 之后不再发请求：新的 search() 直接返回 []，关闭时仍在等待的 search() 不再发下一层，
+    返回已到的部分结果（抓取阶段截止后放弃的检索可能在关闭之后才醒来）
+每次调用同时记入 metrics（本次运行的 Metrics）的 search 阶段（按源分列耗时与条数）。
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from metrics import Metrics
+
+
+class ProviderStats:
+    def __init__(self):
+        self.calls = 0
+        self.ok = 0
+        self.consecutive_failures = 0
+        self.latency = 0.0
+        self.unavailable = False
+
+    def summary(self):
+        if self.unavailable:
+            return "未启用"
+        avg = self.latency / self.calls if self.calls else 0.0
+        return f"成功 {self.ok}/{self.calls}，平均 {avg:.1f}s"
+
+
+class FanOut:
+    def __init__(self, tiers, deadline=20.0, hedge_delay=3.0, max_failures=3, workers=8, metrics=None):
+        self.tiers = tiers
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+        self.max_failures = max_failures
+        self.workers = workers
+        self.stats = {name: ProviderStats() for tier in tiers for name, _ in tier}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._closed = False
+
+    def _executor(self):
+        """共享线程池；close() 之后为 None。"""
+        with self._lock:
+            if self._closed:
+                return None
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="provider")
+            return self._pool
+
+    def _usable(self, name):
+        st = self.stats[name]
+        return not st.unavailable and st.consecutive_failures < self.max_failures
+
+    def _call(self, name, fn, query, timeout):
+        t0 = time.monotonic()
+        try:
+            with self.metrics.timer("search", source=name):
+                res = fn(query, timeout=timeout)
+        except Exception as e:
+            print(f"provider {name} error: {e}")
+            res = []
+        self.metrics.add("search", source=name, items=len(res or []), empty=int(not res))
+        with self._lock:
+            st = self.stats[name]
+            st.calls += 1
+            st.latency += time.monotonic() - t0
+            if res is None:
+                st.unavailable = True
+            elif res:
+                st.ok += 1
+                st.consecutive_failures = 0
+            else:
+                st.consecutive_failures += 1
+        return res or []
+
+    def search(self, query, budget=None):
+        """按层对冲发出检索，返回第一份可用结果（截止时返回已到的部分结果）。
+
+        budget 为调用方剩余的时间（秒），截止时间取 deadline 与它的较小者；不足 1 秒时不发请求。
+        """
+        start = time.monotonic()
+        if budget is not None and budget < 1:
+            return []
+        end = start + (self.deadline if budget is None else min(self.deadline, budget))
+        tiers = [[(n, f) for n, f in tier if self._usable(n)] for tier in self.tiers]
+        tiers = [t for t in tiers if t]
+        pool = self._executor()
+        if pool is None:
+            return []
+        launched = []  # [[future, ...] per tier]
+        next_idx, next_at = 0, start
+        while True:
+            now = time.monotonic()
+            if next_idx < len(tiers) and now >= next_at:
+                timeout = max(1.0, end - now)
+                try:
+                    launched.append([pool.submit(self._call, n, f, query, timeout)
+                                     for n, f in tiers[next_idx]])
+                except RuntimeError:  # 等待期间被 close()：不再发请求，取已到的结果
+                    break
+                next_idx += 1
+                next_at = now + self.hedge_delay
+            failed = 0
+            for futs in launched:
+                if all(f.done() for f in futs):
+                    res = self._results(futs)
+                    if res:
+                        self._cancel(launched)
+                        return res
+                    failed += 1
+            if failed == len(launched):
+                if next_idx >= len(tiers):
+                    return []
+                next_at = now  # 已发出的层都失败了：立即发下一层
+                continue
+            if now >= end:
+                break
+            pending = [f for futs in launched for f in futs if not f.done()]
+            wake = min(next_at, end) if next_idx < len(tiers) else end
+            wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+        self._cancel(launched)
+        return [it for futs in launched for it in self._results(f for f in futs if f.done())]
+
+    @staticmethod
+    def _results(futs):
+        # 被取消的（close() 时还在排队）没有结果；_call 自己吞掉异常，其余 result() 不会抛
+        return [it for f in futs if not f.cancelled() for it in f.result()]
+
+    @staticmethod
+    def _cancel(launched):
+        for futs in launched:
+            for f in futs:
+                f.cancel()
+
+    def report(self):
+        return {name: st.summary() for name, st in self.stats.items()}
+
+    def close(self):
+        """关闭线程池（不等在途请求，它们的超时取自剩余时间，会自行结束）；一次运行结束时调用。
+        之后的 search() 不再发请求。"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._closed = True
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
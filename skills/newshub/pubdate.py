@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+素材发布时间归一化 + 时间窗过滤（仅标准库）
+
+各来源的 published 原样是字符串：RSS pubDate 为 RFC 822（"Tue, 09 Sep 2026 08:00:00 GMT"、"+0800"、"EST"），
+Atom / HN created_at 为 ISO 8601（"2026-09-09T08:00:00Z"、带毫秒或 "+08:00"），
+Tavily published_date 两种都有，DDG 为空。timestamp() 对两种常见写法走快速路径（ISO 交给 C 实现的
+fromisoformat，RFC 822 按空白切分直接取字段），不匹配时再退回 email.utils 与「2026年9月9日」「2026/09/09」
+之类的写法；结果按原字符串缓存（同一批素材里重复的时间串很多）。
+没有时区的按 UTC，只有日期的按当天 00:00 UTC；时区缩写 CST 按中国标准时间（+08:00）。
+快速路径只认 _ZONES 里的时区缩写（含 JST / CEST / IST 等常见的），不认识的不再按 UTC 猜，交给 email.utils 处理。
+
+normalize(items)   就地把 published 改写为 ISO 8601 UTC（"2026-09-09T08:00:00Z"，解析失败为 ""），
+                   并记 published_ts（Unix 秒，无日期为 None），后续排序、过滤与提示词都用它
+within(items, ...) 按发布时间取时间窗内的素材；无日期素材按 undated 策略："keep" 保留（默认）、"drop" 剔除
+"""
+
+import re
+import time
+import datetime
+from functools import lru_cache
+from email.utils import parsedate_to_datetime
+
+UTC = datetime.timezone.utc
+_MONTHS = {m: i for i, m in enumerate(
+    ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+# CST 按中国标准时间（+8）：带 CST 的多是国内来源，美国中部时间的来源写 CDT 或数字偏移
+_ZONES = {"gmt": 0, "ut": 0, "utc": 0, "z": 0, "est": -5, "edt": -4, "cst": 8, "cdt": -5,
+          "mst": -7, "mdt": -6, "pst": -8, "pdt": -7, "bst": 1, "cet": 1, "cest": 2, "eet": 2, "eest": 3,
+          "ist": 5.5, "sgt": 8, "hkt": 8, "jst": 9, "kst": 9, "aest": 10, "aedt": 11}
+_CST = re.compile(r"\s+cst$", re.I)
+_LOOSE = re.compile(r"(\d{4})\s*[年/.]\s*(\d{1,2})\s*[月/.]\s*(\d{1,2})")
+
+
+def _rfc822(text):
+    """"[Tue, ]09 Sep 2026 08:00[:00] [+0800|GMT|EST]" 的快速路径；不是这种写法返回 None。"""
+    parts = text.split()
+    if parts and parts[0].endswith(","):
+        parts = parts[1:]
+    if len(parts) < 4 or len(parts) > 5:
+        return None
+    day, mon, year, hms = parts[:4]
+    month = _MONTHS.get(mon[:3].lower())
+    hms = hms.split(":")
+    if month is None or len(hms) not in (2, 3):
+        return None
+    tz = parts[4] if len(parts) == 5 else ""
+    if tz[:1] in ("+", "-") and len(tz) == 5:
+        offset = (int(tz[1:3]) * 3600 + int(tz[3:]) * 60) * (-1 if tz[0] == "-" else 1)
+    elif tz.lower() in _ZONES or not tz:
+        offset = _ZONES.get(tz.lower(), 0) * 3600
+    else:
+        return None  # 不认识的时区缩写
+    dt = datetime.datetime(int(year), month, int(day), int(hms[0]), int(hms[1]),
+                           int(hms[2]) if len(hms) == 3 else 0, tzinfo=UTC)
+    return dt.timestamp() - offset
+
+
+def _slow(text):
+    try:
+        dt = parsedate_to_datetime(_CST.sub(" +0800", text))  # email.utils 把 CST 当作 -0600
+    except (TypeError, ValueError, IndexError):
+        try:
+            dt = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            m = _LOOSE.search(text)
+            if not m:
+                return None
+            try:
+                dt = datetime.datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+            except ValueError:
+                return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return dt.timestamp()
+
+
+@lru_cache(maxsize=8192)
+def timestamp(text):
+    """发布时间字符串 -> Unix 秒；无法识别返回 None。"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        if text[:4].isdigit() and text[4:5] == "-":
+            try:
+                dt = datetime.datetime.fromisoformat(text)  # C 实现；3.11 起也认 "Z"
+            except ValueError:
+                return _slow(text)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=UTC)
+            return dt.timestamp()
+        ts = _rfc822(text)
+        return ts if ts is not None else _slow(text)
+    except (ValueError, OverflowError):  # 日期越界（2 月 30 日之类）或数字字段不合法
+        return _slow(text)
+
+
+def parse(text):
+    """发布时间字符串 -> UTC datetime；无法识别返回 None。"""
+    ts = timestamp(text)
+    return None if ts is None else datetime.datetime.fromtimestamp(ts, UTC)
+
+
+def normalize(items):
+    """就地归一化 published / published_ts，返回无日期的条数。"""
+    undated = 0
+    for it in items:
+        if "published_ts" in it:
+            undated += it["published_ts"] is None
+            continue
+        ts = timestamp(it.get("published") or "")
+        if ts is None:
+            it["published"], it["published_ts"] = "", None
+            undated += 1
+        else:
+            it["published"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+            it["published_ts"] = ts
+    return undated
+
+
+def within(items, hours, now, undated="keep"):
+    """发布时间在 now 之前 hours 小时内的素材（晚于 now 的按刚发布算）。
+
+    返回 (保留的素材, 超窗剔除数, 无日期数)；items 需已 normalize()。
+    """
+    since = now - hours * 3600
+    kept, stale, missing = [], 0, 0
+    for it in items:
+        ts = it.get("published_ts")
+        if ts is None:
+            missing += 1
+            if undated == "drop":
+                continue
+        elif ts < since:
+            stale += 1
+            continue
+        kept.append(it)
+    return kept, stale, missing
@@ -6,36 +6,98 @@
 读取当前目录下最新的 AI资讯24小时_*.md，转 HTML 正文并作为附件，经 163 SMTP(SSL) 发送。
 所有敏感信息经环境变量注入，不硬编码。
 
+群发：收件人 = NEWS_SMTP_TO（逗号分隔）+ NEWS_SMTP_LIST 名单文件（每行一个地址，# 开头为注释），去重后
+  - MIME 正文与附件只构建、序列化一次，所有收件人共用同一份字节
+  - 每封信带最多 NEWS_SMTP_BATCH 个收件人（一次 SMTP 事务多个 RCPT TO，信头 To 不暴露名单）
+  - NEWS_SMTP_CONNECTIONS 条已登录连接并行发送，每条连接发满 NEWS_SMTP_PER_CONN 封后重连
+  - 全局限速 NEWS_SMTP_RATE 封/分钟；单封失败重连后重试 2 次
+  - 进度记在 <NEWS_CACHE_DIR>/email/<日报名>.<内容摘要>.json：部分失败后重新运行只补发未送达的地址，
+    全部送达后删除进度文件；被服务器永久拒收的地址记入进度，不再重试
+    （进度里有订阅者地址，缓存目录默认在用户目录下，不在会发布到 gh-pages 的本目录里）
+  - 设置 NEWS_STATE 时，本地没有进度目录则先从状态快照的 email 段恢复（CI 每次都是新机器），
+    之后由 state.py save 连同其他缓存一起写回快照
+
 环境变量：
-  NEWS_SMTP_USER   发件人，默认 newshub01@163.com
-  NEWS_SMTP_TO     收件人，默认 newshub01@163.com
-  NEWS_SMTP_AUTH   163 授权码（必填，由调用方注入 Secrets）
+  NEWS_SMTP_USER         发件人，默认 newshub01@163.com
+  NEWS_SMTP_TO           收件人（可逗号分隔多个），默认 newshub01@163.com
+  NEWS_SMTP_AUTH         163 授权码（必填，由调用方注入 Secrets）
+  NEWS_SMTP_LIST         订阅者名单文件（可选）
+  NEWS_SMTP_BATCH        每封信的收件人数，默认 50
+  NEWS_SMTP_CONNECTIONS  并行连接数，默认 2
+  NEWS_SMTP_PER_CONN     每条连接最多发几封后重连，默认 20
+  NEWS_SMTP_RATE         每分钟最多发几封，默认 30（0 不限）
+  NEWS_CACHE_DIR         缓存根目录（与 generate.py 共用），默认 ~/.cache/newshub
+  NEWS_STATE             状态快照路径（与 generate.py 共用，见 state.py），可选
 可选参数：
-  python push_email.py [指定md路径]
+  python push_email.py [指定md路径]   只接受 .md（HTML 页面不能当 Markdown 发送）；不带参数取最新一期
+
+作为库使用（导入本模块不读授权码；设置全在 MailConfig 里）：
+  failed = push_email.send_report(report, ["a@example.com"], push_email.MailConfig(auth=...))
 """
 
 import os
 import re
 import sys
 import ssl
+import json
+import time
+import queue
+import hashlib
 import smtplib
-import base64
-import datetime
+import threading
 import email.utils
+import email.policy
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 from pathlib import Path
 
+from report import Report, parse, render_html
+import state
+
 SMTP_HOST = "smtp.163.com"
 SMTP_PORT = 465
-SENDER = os.environ.get("NEWS_SMTP_USER") or "newshub01@163.com"
-RECIPIENT = os.environ.get("NEWS_SMTP_TO") or "newshub01@163.com"
-AUTH = os.environ.get("NEWS_SMTP_AUTH")
+DEFAULT_ADDR = "newshub01@163.com"
+RETRIES = 2
+
+
+class MailConfig:
+    """发信设置：send_report() 只读这里，不读环境变量。
 
-if not AUTH:
-    raise SystemExit("ERROR: 环境变量 NEWS_SMTP_AUTH 未设置（163 邮箱授权码）")
+    progress_dir 为 None 时不记断点续发进度（只在本次调用内去重）；state_path 为状态快照，
+    progress_dir 本地不存在时先从快照的 email 段恢复。
+    MailConfig.from_env() 按环境变量构建，与命令行行为一致。
+    """
+
+    def __init__(self, auth, sender=DEFAULT_ADDR, host=SMTP_HOST, port=SMTP_PORT, batch_size=50,
+                 connections=2, per_connection=20, rate_per_min=30.0, progress_dir=None, state_path=None):
+        self.auth = auth
+        self.sender = sender
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.connections = connections
+        self.per_connection = per_connection
+        self.rate_per_min = rate_per_min
+        self.progress_dir = Path(progress_dir) if progress_dir else None
+        self.state_path = state_path
+
+    @classmethod
+    def from_env(cls, **overrides):
+        env = os.environ
+        kw = {
+            "auth": env.get("NEWS_SMTP_AUTH"),
+            "sender": env.get("NEWS_SMTP_USER") or DEFAULT_ADDR,
+            "batch_size": int(env.get("NEWS_SMTP_BATCH") or 50),
+            "connections": int(env.get("NEWS_SMTP_CONNECTIONS") or 2),
+            "per_connection": int(env.get("NEWS_SMTP_PER_CONN") or 20),
+            "rate_per_min": float(env.get("NEWS_SMTP_RATE") or 30),
+            "progress_dir": Path(env.get("NEWS_CACHE_DIR") or Path.home() / ".cache" / "newshub") / "email",
+            "state_path": env.get("NEWS_STATE") or None,
+        }
+        kw.update(overrides)
+        return cls(**kw)
 
 
 def find_latest_md():
@@ -47,82 +109,232 @@ def find_latest_md():
 
 
 def md_to_html(md):
-    out, in_list = [], False
-
-    def inline(t):
-        t = re.sub(r"\[(.*?)\]\((.*?)\)", r'<a href="\2" target="_blank">\1</a>', t)
-        t = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", t)
-        return t
-
-    for line in md.split("\n"):
-        s = line.strip()
-        if s.startswith("### "):
-            if in_list:
-                out.append("</ul>"); in_list = False
-            out.append(f"<h3>{inline(s[4:])}</h3>")
-        elif s.startswith("## "):
-            if in_list:
-                out.append("</ul>"); in_list = False
-            out.append(f"<h2>{inline(s[3:])}</h2>")
-        elif s.startswith("# "):
-            if in_list:
-                out.append("</ul>"); in_list = False
-            out.append(f"<h1>{inline(s[2:])}</h1>")
-        elif s.startswith("- "):
-            if not in_list:
-                out.append("<ul>"); in_list = True
-            out.append(f"<li>{inline(s[2:])}</li>")
-        elif s == "":
-            if in_list:
-                out.append("</ul>"); in_list = False
-            out.append("<br>")
-        else:
-            if in_list:
-                out.append("</ul>"); in_list = False
-            out.append(f"<p>{inline(s)}</p>")
-    if in_list:
-        out.append("</ul>")
-    body = "\n".join(out)
-    today = datetime.date.today().strftime("%Y年%-m月%-d日") if hasattr(datetime.date.today(), "strftime") else ""
-    return f"""<!doctype html>
-<html lang="zh-CN"><head><meta charset="utf-8">
-<meta name="viewport" content="width=device-width,initial-scale=1">
-<style>
-body{{font-family:-apple-system,'Microsoft YaHei',sans-serif;max-width:860px;margin:0 auto;padding:24px;line-height:1.7;color:#1f2328}}
-h1{{font-size:26px;border-bottom:3px solid #2d6cdf;padding-bottom:8px}}
-h2{{font-size:21px;margin-top:28px;color:#2d6cdf}}
-h3{{font-size:17px;margin-top:18px}}
-ul{{background:#f7f9fc;border-left:4px solid #2d6cdf;padding:10px 22px}}
-a{{color:#2d6cdf}}
-</style></head><body>{body}</body></html>"""
+    return render_html(parse(md), style="email")
 
 
-def main():
-    path = Path(sys.argv[1]) if len(sys.argv) > 1 else find_latest_md()
-    md = path.read_text(encoding="utf-8")
-    html_body = md_to_html(md)
-    title = path.stem
+def load_recipients(to=None, list_path=None):
+    """to（逗号分隔，默认 NEWS_SMTP_TO）+ 名单文件（默认 NEWS_SMTP_LIST），规范化为小写并按首次出现的顺序去重。"""
+    to = to or os.environ.get("NEWS_SMTP_TO") or DEFAULT_ADDR
+    list_path = list_path or os.environ.get("NEWS_SMTP_LIST")
+    raw = re.split(r"[,;\s]+", to) if isinstance(to, str) else list(to)
+    if list_path:
+        for line in Path(list_path).read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if line:
+                raw.append(line)
+    seen, out = set(), []
+    for addr in raw:
+        addr = email.utils.parseaddr(addr)[1].strip().lower()
+        if "@" in addr and addr not in seen:
+            seen.add(addr)
+            out.append(addr)
+    if not out:
+        raise SystemExit("ERROR: 没有有效的收件人地址")
+    return out
 
+
+def build_message(name, subject, md, html_body, to, sender):
+    """构建共用的 MIME 信件并序列化一次，返回 bytes（CRLF 换行，smtplib 不会替 bytes 转换）；
+    Markdown 原文作为附件 <name>.md。"""
     msg = MIMEMultipart("alternative")
-    msg["Subject"] = f"AI 资讯 24 小时 | {title.replace('AI资讯24小时_', '').replace('_', ' ')}"
-    msg["From"] = SENDER
-    msg["To"] = RECIPIENT
+    msg["Subject"] = subject
+    msg["From"] = sender
+    msg["To"] = to
     msg["Date"] = email.utils.formatdate(localtime=True)
+    msg["Message-ID"] = email.utils.make_msgid(domain=sender.rsplit("@", 1)[-1])
     msg.attach(MIMEText(md, "plain", "utf-8"))
     msg.attach(MIMEText(html_body, "html", "utf-8"))
 
-    with open(path, "rb") as f:
-        part = MIMEBase("application", "octet-stream")
-        part.set_payload(f.read())
+    part = MIMEBase("application", "octet-stream")
+    part.set_payload(md.encode("utf-8"))
     encoders.encode_base64(part)
-    part.add_header("Content-Disposition", 'attachment', filename=path.name)
+    part.add_header("Content-Disposition", 'attachment', filename=f"{name}.md")
     msg.attach(part)
+    return msg.as_bytes(policy=email.policy.compat32.clone(linesep="\r\n"))
+
+
+class Progress:
+    """断点续发：已送达 / 被拒收的地址，每封信发完即落盘（临时文件 + os.replace）；path 为 None 时只记在内存。"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (AttributeError, OSError, ValueError):
+            data = {}
+        self.delivered = set(data.get("delivered") or [])
+        self.refused = dict(data.get("refused") or {})
+
+    def done(self, addr):
+        return addr in self.delivered or addr in self.refused
+
+    def record(self, delivered, refused):
+        with self._lock:
+            self.delivered.update(delivered)
+            self.refused.update(refused)
+            if self.path is None:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"delivered": sorted(self.delivered), "refused": self.refused},
+                                      ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except (AttributeError, OSError):
+            pass
+
+
+class RateLimiter:
+    """全局限速：相邻两封之间至少间隔 60 / per_min 秒（多线程共享）。"""
 
-    ctx = ssl.create_default_context()
-    with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=ctx) as s:
-        s.login(SENDER, AUTH)
-        s.sendmail(SENDER, [RECIPIENT], msg.as_string())
-    print(f"OK: 已推送 {path.name} 至 {RECIPIENT}")
+    def __init__(self, per_min):
+        self.interval = 60.0 / per_min if per_min > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        time.sleep(max(0.0, at - now))
+
+
+def _connect(cfg):
+    s = smtplib.SMTP_SSL(cfg.host, cfg.port, context=ssl.create_default_context(), timeout=60)
+    s.login(cfg.sender, cfg.auth)
+    return s
+
+
+def _close(conn):
+    if conn is None:
+        return
+    try:
+        conn.quit()
+    except (smtplib.SMTPException, OSError):
+        conn.close()
+
+
+def _sender(cfg, batches, raw, progress, limiter, failed):
+    """单条连接的发送循环：从队列取批次，发满 cfg.per_connection 封后重连。"""
+    conn, sent = None, 0
+    while True:
+        try:
+            batch = batches.get_nowait()
+        except queue.Empty:
+            break
+        for attempt in range(RETRIES + 1):
+            try:
+                if conn is None or sent >= cfg.per_connection:
+                    _close(conn)
+                    conn, sent = _connect(cfg), 0
+                limiter.wait()
+                refused = conn.sendmail(cfg.sender, batch, raw)
+                sent += 1
+                progress.record([a for a in batch if a not in refused],
+                                {a: str(v) for a, v in refused.items()})
+                break
+            except smtplib.SMTPRecipientsRefused as e:
+                sent += 1
+                progress.record([], {a: str(v) for a, v in e.recipients.items()})
+                break
+            except smtplib.SMTPAuthenticationError as e:
+                print(f"ERROR: SMTP 登录失败：{e}")
+                failed.extend(batch)
+                _close(conn)
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"发送失败（第 {attempt + 1} 次，{len(batch)} 个地址）：{e}")
+                _close(conn)
+                conn = None
+                if attempt < RETRIES:
+                    time.sleep(2 ** attempt)
+        else:
+            failed.extend(batch)
+    _close(conn)
+
+
+def send_bulk(raw, recipients, progress, cfg):
+    """按批次经 cfg.connections 条连接并行发送；返回 (信件封数, 未送达的地址列表)。"""
+    batches = queue.Queue()
+    for i in range(0, len(recipients), cfg.batch_size):
+        batches.put(recipients[i:i + cfg.batch_size])
+    n_batches = batches.qsize()
+    limiter = RateLimiter(cfg.rate_per_min)
+    failed = []
+    workers = [threading.Thread(target=_sender, args=(cfg, batches, raw, progress, limiter, failed))
+               for _ in range(max(1, min(cfg.connections, n_batches)))]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    while not batches.empty():  # 连接全部登录失败时剩下的批次
+        failed.extend(batches.get_nowait())
+    return n_batches, failed
+
+
+def send_report(report, recipients, config=None, name=None):
+    """把日报（Report 或 Markdown 文本）发给 recipients，返回未送达的地址列表（被服务器拒收的不计入）。
+
+    name 为附件名（不含 .md），默认由一级标题生成，如「AI资讯24小时_2026年8月13日」。
+    config 默认 MailConfig.from_env()。全部送达后删除进度文件；有未送达时保留，下次只补发这些地址。
+    """
+    cfg = config or MailConfig.from_env()
+    if not cfg.auth:
+        raise SystemExit("ERROR: 未配置 SMTP 授权码（NEWS_SMTP_AUTH）")
+    rep = report if isinstance(report, Report) else parse(report)
+    md = report.to_markdown() if isinstance(report, Report) else report
+    title = rep.title or "AI 资讯 24 小时"
+    name = name or title.replace(" ", "").replace("|", "_")
+    html_body = render_html(rep, style="email")
+
+    recipients = list(dict.fromkeys(a.strip().lower() for a in recipients if a and "@" in a))
+    digest = hashlib.sha1(md.encode("utf-8")).hexdigest()[:12]
+    if cfg.progress_dir and cfg.state_path and state.restore(cfg.state_path, "email", str(cfg.progress_dir)):
+        print(f"状态快照：恢复 email -> {cfg.progress_dir}")
+    progress = Progress(cfg.progress_dir / f"{name}.{digest}.json" if cfg.progress_dir else None)
+    pending = [a for a in recipients if not progress.done(a)]
+    if not pending:
+        print(f"OK: {name} 已全部推送过（进度 {progress.path}）")
+        progress.clear()
+        return []
+    if len(pending) < len(recipients):
+        print(f"断点续发：跳过已处理的 {len(recipients) - len(pending)} 个地址")
+
+    # 单个收件人照常显示在 To；群发时不在信头暴露名单
+    raw = build_message(name, title, md, html_body,
+                        recipients[0] if len(recipients) == 1 else "undisclosed-recipients:;",
+                        cfg.sender)
+    t0 = time.time()
+    n_batches, failed = send_bulk(raw, pending, progress, cfg)
+    refused = [a for a in pending if a in progress.refused]
+    print(f"推送 {name}：{len(pending) - len(failed) - len(refused)}/{len(pending)} 个地址送达，"
+          f"{n_batches} 封，{time.time() - t0:.1f}s")
+    if refused:
+        print(f"被拒收 {len(refused)} 个：{', '.join(refused[:10])}")
+    if not failed:
+        progress.clear()
+    return failed
+
+
+def main():
+    cfg = MailConfig.from_env()
+    if not cfg.auth:
+        raise SystemExit("ERROR: 环境变量 NEWS_SMTP_AUTH 未设置（163 邮箱授权码）")
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else find_latest_md()
+    if path.suffix.lower() != ".md":
+        raise SystemExit(f"ERROR: {path} 不是 Markdown 日报；请传 AI资讯24小时_*.md 或不带参数（取最新一期）")
+    recipients = load_recipients()
+    failed = send_report(path.read_text(encoding="utf-8"), recipients, cfg)
+    if failed:
+        raise SystemExit(f"ERROR: {len(failed)} 个地址未送达，重新运行将只补发这些地址（进度目录 {cfg.progress_dir}）")
+    print(f"OK: 已推送 {path.name} 至 {len(recipients)} 个地址")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+候选素材排序 + 按 token 预算打包（替代 all_res[:100] 的先到先得截断）
+
+打分  score = W_REL · 相关度 + W_REC · 新鲜度
+  相关度  候选池内 TF-IDF 稀疏向量与三个分区（技术/应用/行业）关键词向量的最大余弦；
+          装了 numpy 时整池一次算完：词项-文档计数为 COO 数组（np.unique 计 tf、bincount 计 df 与范数），
+          与分区权重矩阵按列 bincount 求点积，无逐条、逐词的 Python 循环（切词除外）；
+          否则退回逐条的 dict 实现，两者结果一致（浮点误差内）。基准：bench/relevance.py
+  新鲜度  按发布时间半衰期衰减（默认 24 小时减半，half_life 可调），无日期记 0.5；
+          优先用 pubdate.normalize() 记下的 published_ts，没有时现场解析
+  多样性  选取时同一 host 每多选一条，有效分数乘 DIVERSITY（按 host 分队列 + 堆，O(n log H)）
+打包  按排序依次纳入，摘要按"水位"分配剩余预算：短摘要用不完的额度留给长摘要；
+      若人均摘要额度低于 min_summary，则减少条数（二分查找最大可行条数）。
+token 估算：装了 tiktoken 用 cl100k_base，否则按中文 1 字 ≈ 1 token、其余 4 字符 ≈ 1 token。
+"""
+
+import re
+import math
+import heapq
+import datetime
+from collections import Counter
+from urllib.parse import urlsplit
+
+from dedup import tokens
+import pubdate
+
+try:
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENC = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+W_REL = 0.6
+W_REC = 0.4
+HALF_LIFE_HOURS = 24
+DIVERSITY = 0.7
+ITEM_OVERHEAD = 20  # "[i] 标题：/链接：/发布：/摘要：" 等固定字样与发布时间
+
+SECTIONS = {
+    "AI 技术": "模型 大模型 参数 训练 推理 架构 算法 论文 开源 权重 基准 评测 多模态 "
+              "model training inference architecture paper arxiv open source weights benchmark "
+              "reasoning multimodal transformer llm research",
+    "AI 应用": "应用 产品 上线 用户 功能 智能体 助手 编程 办公 搜索 医疗 教育 机器人 "
+              "app product launch feature agent assistant copilot coding users search "
+              "healthcare education robot tool",
+    "AI 行业动态": "融资 收购 投资 估值 营收 财报 监管 政策 合作 芯片 算力 数据中心 上市 "
+                "funding acquisition investment valuation revenue earnings regulation policy "
+                "partnership chip gpu datacenter ipo market",
+}
+
+_CJK = re.compile(r"[㐀-䶿一-鿿　-〿＀-￯]")
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    if _ENC is not None:
+        return len(_ENC.encode(text))
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def clip_tokens(text, limit):
+    """截断到约 limit 个 token。"""
+    if limit <= 0:
+        return ""
+    if _ENC is not None:
+        ids = _ENC.encode(text)
+        return text if len(ids) <= limit else _ENC.decode(ids[:limit])
+    cost = 0.0
+    for i, ch in enumerate(text):
+        cost += 1.0 if _CJK.match(ch) else 0.25
+        if cost > limit:
+            return text[:i]
+    return text
+
+
+def _age_hours(it, now):
+    ts = it.get("published_ts")
+    if ts is None:
+        if "published_ts" in it:
+            return None
+        ts = pubdate.timestamp(it.get("published") or "")
+        if ts is None:
+            return None
+    return max(0.0, (now.timestamp() - ts) / 3600)
+
+
+def _tfidf(docs):
+    """docs: [[token, ...], ...] -> ([{token: weight}], idf)；向量已 L2 归一化。"""
+    df = Counter()
+    for d in docs:
+        df.update(set(d))
+    n = len(docs) or 1
+    idf = {t: math.log((n + 1) / (c + 1)) + 1 for t, c in df.items()}
+    vecs = []
+    for d in docs:
+        tf = Counter(d)
+        v = {t: c * idf[t] for t, c in tf.items()}
+        norm = math.sqrt(sum(w * w for w in v.values())) or 1.0
+        vecs.append({t: w / norm for t, w in v.items()})
+    return vecs, idf
+
+
+def _profiles(idf):
+    """各分区关键词的 L2 归一化权重 [{token: weight}, ...]；idf(token) 给出权重（候选池里没有的词为 1.0）。"""
+    profiles = []
+    for text in SECTIONS.values():
+        p = {t: idf(t) for t in set(tokens(text))}
+        norm = math.sqrt(sum(w * w for w in p.values())) or 1.0
+        profiles.append({t: w / norm for t, w in p.items()})
+    return profiles
+
+
+def _relevance_py(docs):
+    vecs, idf = _tfidf(docs)
+    profiles = _profiles(lambda t: idf.get(t, 1.0))
+    return [[sum(w * p[t] for t, w in v.items() if t in p) for p in profiles] for v in vecs]
+
+
+def _relevance_np(docs):
+    n = len(docs)
+    vocab = {}
+    ids = np.fromiter((vocab.setdefault(t, len(vocab)) for d in docs for t in d), dtype=np.int64)
+    doc = np.repeat(np.arange(n, dtype=np.int64), np.fromiter(map(len, docs), dtype=np.int64, count=n))
+    size = max(len(vocab), 1)
+    pairs, tf = np.unique(doc * size + ids, return_counts=True)  # 每个 (文档, 词) 一项
+    d, t = np.divmod(pairs, size)
+    idf = np.log((max(n, 1) + 1) / (np.bincount(t, minlength=size) + 1)) + 1
+    w = tf * idf[t]
+    norm = np.sqrt(np.bincount(d, weights=w * w, minlength=n))
+    norm[norm == 0] = 1.0
+    profiles = np.zeros((size, len(SECTIONS)))
+    for j, p in enumerate(_profiles(lambda tok: idf[vocab[tok]] if tok in vocab else 1.0)):
+        for tok, pw in p.items():
+            if tok in vocab:
+                profiles[vocab[tok], j] = pw
+    sims = np.stack([np.bincount(d, weights=w * profiles[t, j], minlength=n) for j in range(len(SECTIONS))], axis=1)
+    return (sims / norm[:, None]).tolist()
+
+
+def relevance(items):
+    """每条素材与 SECTIONS 各分区关键词向量的余弦：[[技术, 应用, 行业], ...]。"""
+    docs = [tokens(f"{it.get('title', '')} {it.get('content', '')}") for it in items]
+    if not docs:
+        return []
+    return _relevance_np(docs) if np is not None else _relevance_py(docs)
+
+
+def score(items, now=None, half_life=HALF_LIFE_HOURS, rels=None):
+    """返回与 items 等长的分数列表；rels 为已算好的 relevance(items)。"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    out = []
+    for it, sims in zip(items, rels or relevance(items)):
+        rel = max(sims)
+        age = _age_hours(it, now)
+        rec = 0.5 if age is None else 0.5 ** (age / half_life)
+        out.append(W_REL * rel + W_REC * rec)
+    return out
+
+
+def rank(items, now=None, half_life=HALF_LIFE_HOURS):
+    """按分数排序，同 host 逐条降权；返回重排后的 items（原对象）。
+
+    每个 host 一条按分数降序的队列，堆里只放各队首，出堆后推入该 host 的下一条，O(n log H)。
+    """
+    scores = score(items, now, half_life)
+    queues = {}
+    for i, it in enumerate(items):
+        queues.setdefault(urlsplit(it.get("url") or "").netloc.lower(), []).append(i)
+    for q in queues.values():
+        q.sort(key=lambda i: (-scores[i], i))
+    heap = [(-scores[q[0]], q[0], host, 0) for host, q in queues.items()]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        _, i, host, k = heapq.heappop(heap)
+        order.append(i)
+        q = queues[host]
+        if k + 1 < len(q):
+            j = q[k + 1]
+            heapq.heappush(heap, (-scores[j] * DIVERSITY ** (k + 1), j, host, k + 1))
+    return [items[i] for i in order]
+
+
+def _water_level(costs, budget):
+    """水位分配：返回每条摘要的 token 上限；全部放得下时返回最大摘要长度。"""
+    remaining = budget
+    ordered = sorted(costs)
+    for k, c in enumerate(ordered):
+        share = remaining / (len(ordered) - k)
+        if c > share:
+            return share
+        remaining -= c
+    return ordered[-1] if ordered else 0
+
+
+def pack(items, budget, min_summary=40, max_items=None, now=None, half_life=HALF_LIFE_HOURS):
+    """排序后在 budget（token）内尽量多地纳入素材，必要时按水位截短摘要。
+
+    返回 (纳入的素材副本列表, 统计)。
+    """
+    ranked = rank(items, now, half_life)
+    if max_items:
+        ranked = ranked[:max_items]
+    base = [ITEM_OVERHEAD + estimate_tokens(it.get("title", "")) + estimate_tokens(it.get("url", ""))
+            + sum(estimate_tokens(u) + 1 for u in (it.get("alternates") or [])[:3])
+            for it in ranked]
+    summ = [estimate_tokens(it.get("content", "")) for it in ranked]
+
+    def fits(n):
+        rest = budget - sum(base[:n])
+        if rest < 0:
+            return None
+        level = _water_level(summ[:n], rest)
+        return level if level >= min(min_summary, max(summ[:n], default=0)) else None
+
+    lo, hi = 0, len(ranked)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if fits(mid) is not None:
+            lo = mid
+        else:
+            hi = mid - 1
+    n = lo
+    level = int(fits(n) or 0)
+    out, used, trimmed = [], 0, 0
+    for it, b, c in zip(ranked[:n], base, summ):
+        it = dict(it)
+        if c > level:
+            it["content"] = clip_tokens(it.get("content", ""), level)
+            trimmed += 1
+            c = estimate_tokens(it["content"])
+        out.append(it)
+        used += b + c
+    stats = {"candidates": len(items), "packed": n, "trimmed": trimmed,
+             "tokens": used, "budget": budget}
+    return out, stats
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日报 Markdown 的单次解析结果（Report → Section → Item）与共用渲染
+
+  parse(md)              一次扫描得到报告对象：前言行、分区、条目（标题/来源/日期/链接/正文行）
+  Report.trim(target)    按分区比例配额裁剪到 target 条（原 enforce_count 的规则）
+  Report.to_markdown()   连续重编号后输出 Markdown
+  Report.entries()       [(标题, 原文链接)]，供跨日去重
+  validate(report, ...)  检查条数、分区、正文字数与原文链接，返回缺陷列表，供 generate.py 逐条修补
+  render_html(report)    页面（index.html）与邮件正文共用同一套渲染，只换样式；文本一律 HTML 转义
+"""
+
+import re
+import html
+
+_H1 = re.compile(r"^#\s+(.*)$")
+_H2 = re.compile(r"^##\s+(.*)$")
+_H3 = re.compile(r"^###\s*(?:\d+\s*[.、．]\s*)?(.*)$")
+_LINK = re.compile(r"\[(.*?)\]\((.*?)\)")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_URL = re.compile(r"https?://[^\s)\]]+")
+_DATE = re.compile(r"\d{4}-\d{1,2}-\d{1,2}|近日")
+_SCHEME = re.compile(r"[a-z][a-z0-9+.\-]*:", re.I)
+_CTRL = re.compile(r"[\x00-\x20]")  # 浏览器解析链接前会去掉这些字符，"java\tscript:" 同样是脚本链接
+
+
+class Item:
+    __slots__ = ("title", "source", "date", "url", "lines")
+
+    def __init__(self, title, lines=None):
+        self.title = title
+        self.source = ""
+        self.date = ""
+        self.url = ""
+        self.lines = lines if lines is not None else []  # 标题行之后的原始行（含来源引用块）
+
+    def _meta(self, quote):
+        parts = [p.strip() for p in re.split(r"\s+[·•|]\s+", quote)]
+        if parts:
+            self.source = re.sub(r"^来源[:：]\s*", "", parts[0])
+        for p in parts[1:]:
+            if _DATE.fullmatch(p):
+                self.date = p
+                break
+        m = _LINK.search(quote)
+        if m:
+            self.url = m.group(2).strip()
+        else:
+            m = _URL.search(quote)
+            self.url = m.group(0) if m else ""
+
+    @property
+    def quote(self):
+        return next((l.strip() for l in self.lines if l.strip().startswith(">")), "")
+
+    def set_link(self, url):
+        """在来源行末尾补上 [原文](url)；没有来源行时新增一行。"""
+        self.url = url
+        for i, line in enumerate(self.lines):
+            if line.strip().startswith(">"):
+                self.lines[i] = f"{line.rstrip()} · [原文]({url})"
+                return
+        self.lines.insert(0, f"> [原文]({url})")
+
+    @property
+    def body(self):
+        """正文（去掉引用块与空行）。"""
+        return "\n".join(l.strip() for l in self.lines
+                         if l.strip() and not l.strip().startswith(">"))
+
+
+class Section:
+    __slots__ = ("header", "intro", "items")
+
+    def __init__(self, header):
+        self.header = header
+        self.intro = []  # 二级标题与第一条之间的行
+        self.items = []
+
+
+class Report:
+    __slots__ = ("preamble", "sections")
+
+    def __init__(self, preamble=None, sections=None):
+        self.preamble = preamble if preamble is not None else []
+        self.sections = sections if sections is not None else []
+
+    @property
+    def title(self):
+        for line in self.preamble:
+            m = _H1.match(line.strip())
+            if m:
+                return m.group(1).strip()
+        return ""
+
+    def items(self):
+        return [it for sec in self.sections for it in sec.items]
+
+    def count(self):
+        return sum(len(sec.items) for sec in self.sections)
+
+    def entries(self):
+        return [(it.title.replace("**", "").strip(), it.url) for it in self.items()]
+
+    def trim(self, target):
+        """确定性裁剪到 target 条：跨分区按比例配额（每个非空分区至少 1 条）。"""
+        total = self.count()
+        if total <= target:
+            return self
+        counts = [len(sec.items) for sec in self.sections]
+        quotas = [max(1, round(target * c / total)) if c else 0 for c in counts]
+        diff = target - sum(quotas)
+        k = len(quotas) - 1
+        while diff != 0 and k >= 0:
+            if diff > 0 and quotas[k] < counts[k]:
+                quotas[k] += 1
+                diff -= 1
+            elif diff < 0 and quotas[k] > 1:
+                quotas[k] -= 1
+                diff += 1
+            k -= 1
+        for sec, q in zip(self.sections, quotas):
+            del sec.items[q:]
+        self.sections = [sec for sec in self.sections if sec.items]
+        return self
+
+    def to_markdown(self):
+        out = list(self.preamble)
+        num = 0
+        for sec in self.sections:
+            if sec.header:
+                out.append(f"## {sec.header}")
+            out.extend(sec.intro)
+            for it in sec.items:
+                num += 1
+                out.append(f"### {num}. {it.title}")
+                out.extend(it.lines)
+        return "\n".join(out)
+
+
+def parse(md):
+    """一次扫描解析日报。二级标题之前的行全部归入前言；条目之外的行挂在分区 intro 上。"""
+    report = Report()
+    sec = item = None
+    for line in md.split("\n"):
+        s = line.strip()
+        if s.startswith("### "):
+            if sec is None:
+                sec = Section("")
+                report.sections.append(sec)
+            item = Item(_H3.match(s).group(1).strip())
+            sec.items.append(item)
+        elif s.startswith("## "):
+            sec = Section(_H2.match(s).group(1).strip())
+            report.sections.append(sec)
+            item = None
+        elif item is not None:
+            item.lines.append(line)
+            if s.startswith(">") and not item.url:
+                item._meta(s.lstrip("> ").strip())
+        elif sec is not None:
+            sec.intro.append(line)
+        else:
+            report.preamble.append(line)
+    return report
+
+
+_COUNT_LINE = re.compile(r"今日\s*\d+\s*条")
+
+
+def set_count_line(report):
+    """把前言里「今日 N 条」改成实际条数（修补、裁剪之后调用）。"""
+    report.preamble = [_COUNT_LINE.sub(f"今日 {report.count()} 条", line) for line in report.preamble]
+
+
+def body_chars(item):
+    """正文字数：不计空白与引用块。"""
+    return sum(1 for ch in item.body if not ch.isspace())
+
+
+def validate(report, target, sections, min_body=200):
+    """逐项检查日报，返回缺陷列表（空表示合格）：
+
+      ("count", n)       比 target 少 n 条
+      ("section", key)   sections（[(分区名, 二级标题), ...]）里的分区没有条目
+      ("link", item)     条目没有 http(s) 原文链接
+      ("short", item)    正文不足 min_body 字
+    """
+    defects = []
+    present = {key for key, _ in sections
+               for sec in report.sections if sec.items and key.split()[-1] in sec.header}
+    defects += [("section", key) for key, _ in sections if key not in present]
+    for it in report.items():
+        if not it.url.startswith(("http://", "https://")):
+            defects.append(("link", it))
+        elif body_chars(it) < min_body:
+            defects.append(("short", it))
+    if report.count() < target:
+        defects.insert(0, ("count", target - report.count()))
+    return defects
+
+
+def _link(m):
+    # 只放行 http(s) 与相对链接；javascript: / data: 等其他协议（模型输出里可能出现）只留链接文字
+    text, href = m.group(1), m.group(2)
+    scheme = _SCHEME.match(_CTRL.sub("", href))
+    if scheme and scheme.group(0).lower() not in ("http:", "https:"):
+        return text
+    return f'<a href="{href}" target="_blank">{text}</a>'
+
+
+def _inline(t):
+    t = html.escape(t, quote=True)
+    t = _LINK.sub(_link, t)
+    return _BOLD.sub(r"<strong>\1</strong>", t)
+
+
+def _render_lines(lines, out):
+    in_list = False
+    for line in lines:
+        s = line.strip()
+        if s.startswith("- "):
+            if not in_list:
+                out.append("<ul>")
+                in_list = True
+            out.append(f"<li>{_inline(s[2:])}</li>")
+            continue
+        if in_list:
+            out.append("</ul>")
+            in_list = False
+        if not s:
+            continue  # 紧凑：空行不额外加 <br>
+        m = _H1.match(s)
+        if m:
+            out.append(f"<h1>{_inline(m.group(1))}</h1>")
+        elif s.startswith(">"):
+            out.append(f"<blockquote>{_inline(s.lstrip('> ').strip())}</blockquote>")
+        else:
+            out.append(f"<p>{_inline(s)}</p>")
+    if in_list:
+        out.append("</ul>")
+
+
+PAGE_CSS = """body{font-family:-apple-system,'Microsoft YaHei',sans-serif;max-width:820px;margin:0 auto;padding:16px;line-height:1.6;color:#1f2328;font-size:15px}
+h1{font-size:23px;margin:0 0 10px;border-bottom:3px solid #2d6cdf;padding-bottom:6px}
+h2{font-size:18px;margin:20px 0 4px;color:#2d6cdf}
+h3{font-size:15.5px;margin:14px 0 2px;line-height:1.35}
+blockquote{margin:2px 0 6px;padding:4px 10px;background:#f4f7fb;border-left:3px solid #9db8e8;color:#5a6472;font-size:13px}
+p{margin:4px 0 10px}
+a{color:#2d6cdf;text-decoration:none}
+ul{background:#f7f9fc;border-left:4px solid #2d6cdf;padding:8px 18px;margin:6px 0}
+li{margin:3px 0}
+.archive{margin-top:24px;border-top:1px solid #e1e6ef;padding-top:8px;font-size:13px}"""
+
+EMAIL_CSS = """body{font-family:-apple-system,'Microsoft YaHei',sans-serif;max-width:860px;margin:0 auto;padding:24px;line-height:1.7;color:#1f2328}
+h1{font-size:26px;border-bottom:3px solid #2d6cdf;padding-bottom:8px}
+h2{font-size:21px;margin-top:28px;color:#2d6cdf}
+h3{font-size:17px;margin-top:18px}
+blockquote{margin:4px 0 8px;padding:4px 10px;background:#f4f7fb;border-left:3px solid #9db8e8;color:#5a6472;font-size:13px}
+ul{background:#f7f9fc;border-left:4px solid #2d6cdf;padding:10px 22px}
+a{color:#2d6cdf}"""
+
+
+def render_html(report, date_str="", style="page", title="AI 资讯 24 小时"):
+    """渲染完整 HTML 文档；style="page" 用于 index.html（页尾链接到 archive/ 往期归档），"email" 用于邮件正文。"""
+    out = []
+    _render_lines(report.preamble, out)
+    num = 0
+    for sec in report.sections:
+        if sec.header:
+            out.append(f"<h2>{_inline(sec.header)}</h2>")
+        _render_lines(sec.intro, out)
+        for it in sec.items:
+            num += 1
+            out.append(f"<h3>{num}. {_inline(it.title)}</h3>")
+            _render_lines(it.lines, out)
+    if style == "page":
+        out.append('<p class="archive"><a href="archive/">往期归档与搜索 →</a></p>')
+    body = "\n".join(out)
+    css = EMAIL_CSS if style == "email" else PAGE_CSS
+    title = f"<title>{html.escape(title)} | {html.escape(date_str)}</title>\n" if date_str else ""
+    return f"""<!doctype html>
+<html lang="zh-CN"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+{title}<style>
+{css}
+</style></head><body>{body}</body></html>"""
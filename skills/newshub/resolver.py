@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+聚合 / 短链 → 原始报道链接的持久映射（SQLite，仅标准库）
+
+Google News 检索结果是 news.google.com 跳转链接，部分 feed 走 feedburner / 短链服务，
+同一篇报道因此以不同链接出现，按链接去重（gather、已发布索引）会漏掉。
+REDIRECT_HOSTS 上的链接由 generate.resolve_links() 并发跟随跳转（先 HEAD，不行再 GET，
+GET 落到 HTML 页时取 <link rel=canonical> 或 meta refresh），结果去掉跟踪参数后记在这里
+（无状态配置时不记，解析结果同样去掉跟踪参数）：
+
+urls  src 原链接（主键）、dst 去掉跟踪参数的原始链接（解析失败为 ""）、resolved 解析时间
+      成功的映射 max_age 内有效，失败的 fail_ttl 后再试；每个链接只解析一次，之后各次运行直接查表。
+其余链接不联网，只由 seen_store.canonical_url() 去跟踪参数。HN 的 item?id= 讨论页本身就是原始链接，不解析。
+多线程共用一个连接（写入加锁）；多进程靠 SQLite 自身的锁（WAL）。
+"""
+
+import re
+import html
+import time
+import sqlite3
+import threading
+from urllib.parse import urljoin, urlsplit
+
+from seen_store import strip_tracking
+
+REDIRECT_HOSTS = {"news.google.com", "feedproxy.google.com", "feeds.feedburner.com", "t.co", "bit.ly",
+                  "ow.ly", "buff.ly", "dlvr.it", "lnkd.in", "tinyurl.com", "trib.al", "rss.app"}
+_LINK_TAG = re.compile(rb"<link\b[^>]*>", re.I)
+_META_TAG = re.compile(rb"<meta\b[^>]*>", re.I)
+_ATTR = re.compile(rb"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+_REFRESH_URL = re.compile(r"url\s*=\s*['\"]?([^'\"]+)", re.I)
+
+
+def needs_resolution(url):
+    """链接是否落在聚合 / 短链服务上。"""
+    host = urlsplit(url or "").netloc.lower()
+    return (host[4:] if host.startswith("www.") else host) in REDIRECT_HOSTS
+
+
+def _attrs(tag):
+    return {m.group(1).decode("ascii", "replace").lower(): (m.group(2) or m.group(3) or m.group(4) or b"").decode("utf-8", "replace")
+            for m in _ATTR.finditer(tag)}
+
+
+def find_canonical(body, base):
+    """从 HTML 开头找 <link rel=canonical> 或 <meta http-equiv=refresh> 指向的链接（相对 base 解析），没有返回 ""。"""
+    for tag in _LINK_TAG.findall(body):
+        a = _attrs(tag)
+        if "canonical" in a.get("rel", "").lower().split() and a.get("href"):
+            return urljoin(base, html.unescape(a["href"]).strip())
+    for tag in _META_TAG.findall(body):
+        a = _attrs(tag)
+        if a.get("http-equiv", "").lower() == "refresh":
+            m = _REFRESH_URL.search(html.unescape(a.get("content", "")))
+            if m:
+                return urljoin(base, m.group(1).strip())
+    return ""
+
+
+class UrlMap:
+    def __init__(self, path, max_age=30 * 86400, fail_ttl=86400):
+        self.path = path
+        self.max_age = max_age
+        self.fail_ttl = fail_ttl
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS urls ("
+                        "src TEXT PRIMARY KEY, dst TEXT NOT NULL, resolved REAL NOT NULL) WITHOUT ROWID")
+
+    def close(self):
+        self.db.close()
+
+    def get_many(self, urls, now=None):
+        """{原链接: 原始链接或 ""}，只含仍有效的记录；不在结果里的需要重新解析。"""
+        now = now or time.time()
+        out = {}
+        with self._lock:
+            for i in range(0, len(urls), 500):
+                chunk = urls[i:i + 500]
+                rows = self.db.execute(f"SELECT src, dst, resolved FROM urls WHERE src IN "
+                                       f"({','.join('?' * len(chunk))})", chunk).fetchall()
+                for src, dst, resolved in rows:
+                    if now - resolved <= (self.max_age if dst else self.fail_ttl):
+                        out[src] = dst
+        return out
+
+    def put_many(self, pairs, now=None):
+        """记下 [(原链接, 解析到的链接或 "")]；解析到的链接先去掉跟踪参数。"""
+        now = now or time.time()
+        rows = [(src, strip_tracking(dst) if dst else "", now) for src, dst in pairs]
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO urls VALUES (?, ?, ?)", rows)
+        return {src: dst for src, dst, _ in rows}
+
+    def prune(self, now=None):
+        """删除过期记录，返回删除行数。"""
+        now = now or time.time()
+        with self._lock, self.db:
+            cur = self.db.execute("DELETE FROM urls WHERE resolved < ? OR (dst = '' AND resolved < ?)",
+                                  (now - self.max_age, now - self.fail_ttl))
+        return cur.rowcount
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行截止时间 + 按历史表现排定来源抓取顺序（仅标准库）
+
+原先没有整体时间预算：最坏情况下 gather() 要等 24 个 feed 各 25 秒、8 个检索各走完三层搜索源，
+之后 call_llm() 还有自己的 300 秒超时，网络差的日子交付会远远晚于定时。现在：
+
+Deadline       一次运行（或其中一个阶段）的截止时间；timeout(默认值) 把单个请求的超时截到剩余时间以内，
+               sub(秒) 得到不晚于自身的子截止时间（如抓取阶段的截止）
+SourceStats    每个来源（"feed:<链接>" / "search:<检索词>"，与 ingest.py 的来源名一致）跨运行的表现（SQLite）：
+  sources      耗时、条数、成功率的指数滑动平均（EWMA_ALPHA）、运行次数、最近更新时间
+  history      每个来源每天一行（保留 HISTORY_DAYS 天）：抓取次数、成功次数、总耗时、字节、解析出的条数、
+               通过去重的条数（kept）、进入最终日报的条数（used，按日报链接对回来源）、最近一次的状态
+               （ok / empty / http <状态码> / error:<异常名>）；到截止时间仍未返回（late）的不算一次抓取，不记入 history
+summarize(rows, today)  按 history 汇总：每次抓取平均的耗时 / 字节 / 条数 / kept / used，最近一次状态，
+               以及从最近一天往前连续「抓了但零条」的天数（streak）
+source_state(s, today)  连续零条 BACKOFF_AFTER 天起退避（间隔 2、4 天再抓），QUARANTINE_AFTER 天起隔离
+               （每 PROBE_DAYS 天试抓一次，抓到条目即恢复）；返回 (状态, 今天是否该抓)
+max_items(s, base)   平均每次有条目进入日报的高产 feed 放宽每次解析的条数（翻倍，至多 MAX_ITEMS_CAP）
+order(names, stats)  抓取顺序：期望价值 / 期望耗时从高到低。有 history 时价值 = kept + USED_WEIGHT × used
+               （解析出的条目总被别处抢先收录、从未进入日报的来源就此降级），否则为条数 × 成功率；
+               没有历史的来源排在最前（先探明它的表现），同分保持原顺序
+抓取阶段按这个顺序提交到线程池，到截止时间仍未完成的来源放弃（未开始的取消，在途的超时本就取自剩余时间），
+已到的素材照常进入生成；放弃的来源在 sources 里按失败计（下次排得更靠后），但不算「抓了但零条」，
+慢的一天不会把正常来源推进退避 / 隔离。
+
+用法：python schedule.py [天数]   打印来源健康报告（默认最近 HISTORY_DAYS 天）
+"""
+
+import os
+import sys
+import math
+import time
+import sqlite3
+import datetime
+import threading
+
+EWMA_ALPHA = 0.3
+MIN_LATENCY = 0.5  # 秒；防止极快的来源把优先级拉到无穷大
+HISTORY_DAYS = 30
+USED_WEIGHT = 3
+BACKOFF_AFTER = 2
+QUARANTINE_AFTER = 4
+PROBE_DAYS = 7
+MAX_ITEMS_CAP = 10
+
+
+class Deadline:
+    def __init__(self, budget=None, start=None):
+        """budget 为秒数，None 或 0 表示不限时。"""
+        self.start = time.monotonic() if start is None else start
+        self.end = self.start + budget if budget else math.inf
+
+    def remaining(self):
+        return self.end - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def wait_timeout(self):
+        """给 concurrent.futures.wait() 的超时参数：不限时为 None。"""
+        return None if self.end == math.inf else max(0.0, self.remaining())
+
+    def timeout(self, default, floor=1.0):
+        """单个请求的超时：不超过 default，也不超过剩余时间，但至少 floor 秒。"""
+        return max(floor, min(default, self.remaining()))
+
+    def sub(self, seconds):
+        """从本截止时间的起点算 seconds 秒、且不晚于本截止时间的子截止时间；seconds 为 0 表示同本身。"""
+        d = Deadline(start=self.start)
+        d.end = min(self.end, self.start + seconds) if seconds else self.end
+        return d
+
+
+class SourceStats:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sources ("
+                        "name TEXT PRIMARY KEY, latency REAL NOT NULL, items REAL NOT NULL, "
+                        "ok REAL NOT NULL, runs INTEGER NOT NULL, updated REAL NOT NULL) WITHOUT ROWID")
+        self.db.execute("CREATE TABLE IF NOT EXISTS history ("
+                        "name TEXT NOT NULL, day TEXT NOT NULL, runs INTEGER NOT NULL DEFAULT 0, "
+                        "ok INTEGER NOT NULL DEFAULT 0, seconds REAL NOT NULL DEFAULT 0, "
+                        "bytes INTEGER NOT NULL DEFAULT 0, items INTEGER NOT NULL DEFAULT 0, "
+                        "kept INTEGER NOT NULL DEFAULT 0, used INTEGER NOT NULL DEFAULT 0, "
+                        "status TEXT NOT NULL DEFAULT '', PRIMARY KEY (name, day)) WITHOUT ROWID")
+
+    def close(self):
+        self.db.close()
+
+    def _select(self, sql, names, extra=()):
+        out = []
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            out += self.db.execute(sql.replace("?*", ",".join("?" * len(chunk))), list(chunk) + list(extra)).fetchall()
+        return out
+
+    def get_many(self, names, today=None, days=HISTORY_DAYS):
+        """{来源名: {"latency", "items", "ok", "runs"} + summarize() 的字段}，只含有历史的来源。"""
+        today = today or datetime.date.today()
+        out = {}
+        with self._lock:
+            rows = self._select("SELECT name, latency, items, ok, runs FROM sources WHERE name IN (?*)", names)
+            hist = self._history(names, today, days)
+        for name, latency, items, ok, runs in rows:
+            out[name] = {"latency": latency, "items": items, "ok": ok, "runs": runs}
+        for name, day_rows in hist.items():
+            out.setdefault(name, {}).update(summarize(day_rows, today))
+        return out
+
+    def _history(self, names, today, days):
+        since = (today - datetime.timedelta(days=days)).isoformat()
+        rows = self._select("SELECT name, day, runs, ok, seconds, bytes, items, kept, used, status FROM history "
+                            "WHERE name IN (?*) AND day >= ? ORDER BY day DESC", names, (since,))
+        hist = {}
+        for name, *rest in rows:
+            hist.setdefault(name, []).append(rest)
+        return hist
+
+    def record(self, results, day=None, now=None):
+        """results: [(来源名, 耗时秒, 条数, 是否成功, 状态, 字节, kept)]，EWMA 并入 sources，累加到 history 当天一行。
+
+        状态为 late（到截止时间仍未返回）的只并入 sources：不知道这次能抓到几条，不算 history 里的一次抓取。
+        """
+        now = now or time.time()
+        day = (day or datetime.date.today()).isoformat()
+        with self._lock:
+            old = {r[0]: r[1:] for r in self._select(
+                "SELECT name, latency, items, ok, runs FROM sources WHERE name IN (?*)", [r[0] for r in results])}
+        rows, hist = [], []
+        for name, seconds, items, ok, status, nbytes, kept in results:
+            o = old.get(name)
+            if o is None:
+                rows.append((name, seconds, float(items), float(ok), 1, now))
+            else:
+                a = EWMA_ALPHA
+                rows.append((name, o[0] + a * (seconds - o[0]), o[1] + a * (items - o[1]),
+                             o[2] + a * (float(ok) - o[2]), o[3] + 1, now))
+            if status != "late":
+                hist.append((name, day, int(ok), seconds, nbytes, items, kept, status))
+        with self._lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self.db.executemany(
+                "INSERT INTO history (name, day, runs, ok, seconds, bytes, items, kept, status) "
+                "VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?) ON CONFLICT (name, day) DO UPDATE SET "
+                "runs = runs + 1, ok = ok + excluded.ok, seconds = seconds + excluded.seconds, "
+                "bytes = bytes + excluded.bytes, items = items + excluded.items, kept = kept + excluded.kept, "
+                "status = excluded.status", hist)
+
+    def credit(self, used, day=None):
+        """used: {来源名: 进入日报的条数}，累加到 history 当天一行（素材来自候选库、当天没抓过时新建一行）。"""
+        day = (day or datetime.date.today()).isoformat()
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT INTO history (name, day, used) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, day) DO UPDATE SET used = used + excluded.used",
+                [(name, day, n) for name, n in used.items() if n])
+
+    def prune(self, today=None, days=HISTORY_DAYS):
+        """删除 days 天以前的 history，返回删除行数。"""
+        since = ((today or datetime.date.today()) - datetime.timedelta(days=days)).isoformat()
+        with self._lock, self.db:
+            return self.db.execute("DELETE FROM history WHERE day < ?", (since,)).rowcount
+
+    def report(self, today=None, days=HISTORY_DAYS):
+        """[(来源名, summarize() 结果, 状态, 今天是否该抓)]，按状态、价值排序。"""
+        today = today or datetime.date.today()
+        with self._lock:
+            names = [r[0] for r in self.db.execute("SELECT DISTINCT name FROM history")]
+            hist = self._history(names, today, days)
+        out = []
+        for name, day_rows in hist.items():
+            s = summarize(day_rows, today)
+            if s["fetches"]:
+                out.append((name, s) + source_state(s, today))
+        rank = {"quarantine": 0, "backoff": 1, "ok": 2}
+        out.sort(key=lambda r: (rank[r[2]], r[1]["kept"] + USED_WEIGHT * r[1]["used"], r[0]))
+        return out
+
+
+def summarize(rows, today):
+    """history 行（[day, runs, ok, seconds, bytes, items, kept, used, status]，按日期倒序）的汇总。"""
+    runs = sum(r[1] for r in rows)
+    n = max(runs, 1)
+    streak = 0
+    for r in rows:
+        if not r[1]:
+            continue  # 只有 used、当天没抓过
+        if r[5]:
+            break
+        streak += 1
+    attempted = [r for r in rows if r[1]]
+    last = datetime.date.fromisoformat(attempted[0][0]) if attempted else None
+    return {"fetches": runs, "days": len(attempted), "ok_rate": sum(r[2] for r in rows) / n,
+            "seconds": sum(r[3] for r in rows) / n, "bytes": sum(r[4] for r in rows) / n,
+            "per_run": sum(r[5] for r in rows) / n, "kept": sum(r[6] for r in rows) / n,
+            "used": sum(r[7] for r in rows) / n, "status": attempted[0][8] if attempted else "",
+            "streak": streak, "idle_days": (today - last).days if last else None}
+
+
+def source_state(s, today=None):
+    """(ok / backoff / quarantine, 今天是否该抓)；s 为 summarize() 的结果。"""
+    streak, idle = s.get("streak", 0), s.get("idle_days")
+    if idle is None:
+        return "ok", True
+    if streak >= QUARANTINE_AFTER:
+        return "quarantine", idle >= PROBE_DAYS
+    if streak >= BACKOFF_AFTER:
+        return "backoff", idle >= 2 ** (streak - BACKOFF_AFTER + 1)
+    return "ok", True
+
+
+def max_items(s, base):
+    """每次解析的条数上限：平均每次至少一条进入日报的来源翻倍（至多 MAX_ITEMS_CAP）。"""
+    if s and s.get("used", 0) >= 1:
+        return max(base, min(MAX_ITEMS_CAP, base * 2))
+    return base
+
+
+def priority(stat):
+    """期望价值 / 期望耗时；没有历史为无穷大。"""
+    if stat is None or "latency" not in stat:
+        return math.inf
+    value = stat["kept"] + USED_WEIGHT * stat["used"] if stat.get("fetches") else stat["items"]
+    return value * stat["ok"] / max(stat["latency"], MIN_LATENCY)
+
+
+def order(names, stats):
+    """names 的下标按优先级从高到低排列。"""
+    return sorted(range(len(names)), key=lambda i: -priority(stats.get(names[i])))
+
+
+def main():
+    import generate as g
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else HISTORY_DAYS
+    cfg = g.Config.from_env()
+    path = cfg.cache_path("sources.sqlite3")
+    g.warm("sources", path, cfg)
+    rows = g.source_stats(cfg).report(days=days) if os.path.exists(path) else []
+    if not rows:
+        raise SystemExit(f"{path} 里还没有来源记录（生成一次日报后再看）")
+    print(f"来源健康报告（最近 {days} 天，每次抓取平均；kept = 通过去重，used = 进入日报）")
+    print(f"{'状态':<10}{'抓取':>5}{'成功率':>7}{'耗时s':>7}{'KB':>7}{'条数':>6}{'kept':>6}{'used':>6}  最近状态    来源")
+    for name, s, state, due in rows:
+        flag = state if due or state == "ok" else f"{state}*"
+        print(f"{flag:<10}{s['fetches']:>5}{s['ok_rate']:>7.0%}{s['seconds']:>7.1f}{s['bytes'] / 1024:>7.0f}"
+              f"{s['per_run']:>6.1f}{s['kept']:>6.1f}{s['used']:>6.1f}  {s['status'][:10]:<10}  {name[:70]}")
+    print("* 今天跳过（退避 / 隔离中，到期后自动试抓）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已发布资讯索引（跨日去重用，SQLite，仅标准库）
+
+每条已发布资讯写两行键：
+  u:<规范化链接>   去掉协议差异 / www / 片段 / 跟踪参数 / 末尾斜杠
+  t:<归一化标题>   NFKC + 小写 + 去标点空白（中英文通用）
+候选素材在拼提示词前先本地查表过滤，查询走主键索引，耗时与历史日报数量无关；
+写入时顺带删掉窗口外的旧行，库体积只随窗口长度而非历史长度增长。
+"""
+
+import re
+import sqlite3
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+_TRACKING = re.compile(r"^(utm_\w+|fbclid|gclid|dclid|msclkid|yclid|igshid|mc_cid|mc_eid|_hsenc|_hsmktg|"
+                       r"mkt_tok|ref|ref_src|ref_url|spm|from|scm|share_source|share_medium|cmpid|ocid|"
+                       r"guccounter|guce_referrer\w*|smid|sr_share|at_\w+)$", re.I)
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def strip_tracking(url):
+    """去掉片段与跟踪参数，其余原样保留（仍是可点击的原链接）。"""
+    parts = urlsplit((url or "").strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _TRACKING.match(k)]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def canonical_url(url):
+    """链接规范化：统一大小写与 www、去片段与跟踪参数、查询参数排序、去末尾斜杠。"""
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not _TRACKING.match(k))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme,
+                       host, path, urlencode(query), ""))
+
+
+def normalize_title(title):
+    """标题归一化：全半角统一、小写、去掉标点与空白。"""
+    t = unicodedata.normalize("NFKC", title or "").lower()
+    return _NON_WORD.sub("", t)
+
+
+class SeenStore:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS seen ("
+                        "key TEXT PRIMARY KEY, day TEXT NOT NULL, title TEXT) WITHOUT ROWID")
+        self.db.execute("CREATE INDEX IF NOT EXISTS seen_day ON seen(day)")
+
+    def close(self):
+        self.db.close()
+
+    def empty(self):
+        return self.db.execute("SELECT 1 FROM seen LIMIT 1").fetchone() is None
+
+    @staticmethod
+    def _keys(title, url):
+        keys = []
+        u = canonical_url(url)
+        if u:
+            keys.append("u:" + u)
+        t = normalize_title(title)
+        if t:
+            keys.append("t:" + t)
+        return keys
+
+    def _has(self, key, since, until):
+        return self.db.execute("SELECT 1 FROM seen WHERE key = ? AND day >= ? AND day < ?",
+                               (key, since.isoformat(), until.isoformat())).fetchone() is not None
+
+    def is_seen(self, item, since, until):
+        """item 的链接或标题在 [since, until) 内已发布过即视为重复。
+
+        until 一般取当天：同一天重跑时不会把本期自己的条目当成往期。
+        """
+        keys = self._keys(item.get("title"), item.get("url"))
+        return any(self._has(k, since, until) for k in keys)
+
+    def titles(self, since, until, limit=200):
+        """[since, until) 内已发布标题（新→旧），给大模型做语义层面的同事件去重参考。"""
+        rows = self.db.execute("SELECT title FROM seen WHERE key LIKE 't:%' AND day >= ? AND day < ? "
+                               "ORDER BY day DESC LIMIT ?", (since.isoformat(), until.isoformat(), limit))
+        return [r[0] for r in rows if r[0]]
+
+    def add(self, day, entries):
+        """登记一批已发布条目 [(title, url), ...]，同键保留最近日期。"""
+        rows = []
+        for title, url in entries:
+            for k in self._keys(title, url):
+                rows.append((k, day.isoformat(), title if k.startswith("t:") else None))
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO seen (key, day, title) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET day = max(day, excluded.day), "
+                "title = coalesce(excluded.title, title)", rows)
+        return len(rows)
+
+    def prune(self, before):
+        """删除 before 之前的行，返回删除行数。"""
+        with self.db:
+            cur = self.db.execute("DELETE FROM seen WHERE day < ?", (before.isoformat(),))
+        return cur.rowcount
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线状态快照：各缓存与索引打进一个带版本的压缩文件，CI 上恢复这一个文件即可热启动（仅标准库）
+
+GitHub Actions 每次运行都是新机器：HTTP 条件 GET 缓存、LLM 缓存、原文正文缓存、链接映射、
+候选素材库、已发布索引与邮件续发进度全部从零开始。快照把它们按「段」存进一个 zip：
+
+  STATE.json            格式名、版本、创建时间，各段的类型（dir / sqlite）、文件数、原始字节数与 sha256
+  <段名>/<相对路径>      dir 段：缓存目录里的文件，保留修改时间（LLM / HTTP 缓存按它判断过期）
+  <段名>/db.sqlite3     sqlite 段：用 SQLite 在线备份得到的一致副本（WAL 中未合并的写入也在内）
+
+zip 的中央目录可以随机访问，restore() 只解压用到的那一段：generate.py 在某个缓存第一次被用到、
+而本地还没有时才从快照恢复它，用不到的段（如未开原文正文时的 fulltext）不读不解压。
+完整性：每个文件有 zip 自带的 CRC32，每段另记 sha256（按写入顺序的「路径 + 内容」）；
+校验不过的段丢弃、当作冷启动，不影响其他段。恢复先解到临时位置再改名，保存先写临时文件再替换，
+中途失败都不会留下半截的缓存或快照。
+大小上限：sqlite 段先写；dir 段的文件按「同目录同前缀」成组（如 HTTP 缓存的 .json 与 .body），
+跨段按修改时间从新到旧写入，压缩后累计超过 max_bytes 就不再写（上限为近似值，可能多出一组）。
+
+用法（路径默认取 NEWS_STATE）：
+  python state.py save [快照路径]   先补齐本地没有的段，再按各缓存自身的规则清理后写快照
+  python state.py info [快照路径]   列出快照里的各段
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import sqlite3
+import zipfile
+import datetime
+import zlib
+
+FORMAT = "newshub-state"
+VERSION = 1
+MANIFEST = "STATE.json"
+DB_MEMBER = "db.sqlite3"
+
+
+def _group(rel):
+    """同目录、同文件名前缀（第一个点之前）的文件为一组，裁剪时整组取舍。"""
+    head, name = os.path.split(rel)
+    return os.path.join(head, name.split(".", 1)[0])
+
+
+def _dir_files(root):
+    """[(相对路径, 绝对路径, 修改时间)]，跳过写到一半的 .tmp 文件。"""
+    out = []
+    for d, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            p = os.path.join(d, name)
+            try:
+                mtime = os.stat(p).st_mtime
+            except OSError:
+                continue
+            out.append((os.path.relpath(p, root).replace(os.sep, "/"), p, mtime))
+    return out
+
+
+def _backup(src, dst):
+    """SQLite 在线备份：写入中的库（WAL）也能得到一致副本。"""
+    a, b = sqlite3.connect(src, timeout=30), sqlite3.connect(dst)
+    try:
+        a.backup(b)
+    finally:
+        b.close()
+        a.close()
+
+
+def read_manifest(path):
+    """快照的 STATE.json；文件不存在、损坏或格式版本不符时返回 None。"""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            manifest = json.loads(zf.read(MANIFEST))
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+        return None
+    return manifest
+
+
+def save(path, sections, max_bytes=64 * 1024 * 1024):
+    """把 sections {段名: (类型, 本地路径)} 写成快照，返回 manifest；本地不存在的段跳过。
+
+    类型为 "dir"（缓存目录）或 "sqlite"（数据库文件）。先写 path.tmp，完成后原子替换。
+    """
+    tmp = path + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    meta, digests = {}, {}
+    skipped = 0
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+        def put(name, arcname, src, mtime):
+            info = zipfile.ZipInfo(f"{name}/{arcname}", time.localtime(max(mtime, 315532800))[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(src, "rb") as f:
+                data = f.read()
+            zf.writestr(info, data)
+            digests[name].update(arcname.encode("utf-8") + b"\0" + data)
+            meta[name]["files"] += 1
+            meta[name]["bytes"] += len(data)
+
+        groups = {}
+        for name, (kind, src) in sections.items():
+            if not src or not os.path.exists(src):
+                continue
+            meta[name] = {"kind": kind, "files": 0, "bytes": 0}
+            digests[name] = hashlib.sha256()
+            if kind == "sqlite":
+                copy = f"{tmp}.{name}.db"
+                try:
+                    _backup(src, copy)
+                    put(name, DB_MEMBER, copy, os.stat(src).st_mtime)
+                finally:
+                    if os.path.exists(copy):
+                        os.remove(copy)
+            else:
+                for rel, p, mtime in _dir_files(src):
+                    g = groups.setdefault((name, _group(rel)), [0, []])
+                    g[0] = max(g[0], mtime)
+                    g[1].append((rel, p, mtime))
+        for (name, _), (_, files) in sorted(groups.items(), key=lambda kv: -kv[1][0]):
+            if zf.fp.tell() >= max_bytes:
+                skipped += 1
+                continue
+            for rel, p, mtime in sorted(files):
+                try:
+                    put(name, rel, p, mtime)
+                except OSError:  # 写快照期间被缓存自身的 prune 删掉
+                    pass
+        for name, h in digests.items():
+            meta[name]["sha256"] = h.hexdigest()
+        manifest = {"format": FORMAT, "version": VERSION, "created": time.time(), "sections": meta,
+                    "dropped_groups": skipped}
+        zf.writestr(MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=1))
+    os.replace(tmp, path)
+    manifest["size"] = os.path.getsize(path)
+    return manifest
+
+
+def restore(path, name, dest):
+    """把快照里的 name 段恢复到 dest（dest 已存在时不动），返回是否恢复。
+
+    只读中央目录与这一段的文件；CRC 或 sha256 不符时丢弃该段并返回 False。
+    """
+    if os.path.exists(dest) or not os.path.exists(path):
+        return False
+    manifest = read_manifest(path)
+    sec = (manifest or {}).get("sections", {}).get(name)
+    if sec is None:
+        return False
+    prefix = name + "/"
+    tmp = f"{dest}.restore.tmp"
+    h = hashlib.sha256()
+    try:
+        with zipfile.ZipFile(path) as zf:
+            members = [i for i in zf.infolist() if i.filename.startswith(prefix)]
+            if sec["kind"] == "sqlite":
+                if len(members) != 1:
+                    raise ValueError("sqlite 段应只有一个文件")
+                data = zf.read(members[0])
+                h.update(DB_MEMBER.encode("utf-8") + b"\0" + data)
+                os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+                with open(tmp, "wb") as f:
+                    f.write(data)
+            else:
+                shutil.rmtree(tmp, ignore_errors=True)
+                for info in members:
+                    rel = info.filename[len(prefix):]
+                    if rel.startswith("/") or ".." in rel.split("/"):
+                        raise ValueError(f"非法路径 {info.filename}")
+                    data = zf.read(info)
+                    h.update(rel.encode("utf-8") + b"\0" + data)
+                    out = os.path.join(tmp, *rel.split("/"))
+                    os.makedirs(os.path.dirname(out), exist_ok=True)
+                    with open(out, "wb") as f:
+                        f.write(data)
+                    mtime = time.mktime(info.date_time + (0, 0, -1))
+                    os.utime(out, (mtime, mtime))
+                os.makedirs(tmp, exist_ok=True)
+        if h.hexdigest() != sec.get("sha256"):
+            raise ValueError("sha256 不符")
+    except (OSError, ValueError, zipfile.BadZipFile, zlib.error) as e:
+        print(f"状态快照：{name} 段损坏，按冷启动处理（{e}）")
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp, ignore_errors=True)
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+        return False
+    os.replace(tmp, dest)
+    return True
+
+
+def main():
+    import generate as g
+    args = sys.argv[1:]
+    cmd = args[0] if args else ""
+    cfg = g.Config.from_env()
+    path = args[1] if len(args) > 1 else cfg.state_path
+    if cmd not in ("save", "info") or not path:
+        raise SystemExit("用法：python state.py save|info [快照路径]（默认取 NEWS_STATE）")
+    if cmd == "save":
+        manifest = g.save_state(path, cfg)
+    else:
+        manifest = read_manifest(path)
+        if manifest is None:
+            raise SystemExit(f"ERROR: {path} 不存在或不是 v{VERSION} 状态快照")
+        manifest["size"] = os.path.getsize(path)
+    created = datetime.datetime.fromtimestamp(manifest["created"]).isoformat(timespec="seconds")
+    dropped = manifest.get("dropped_groups")
+    print(f"{path}：{manifest['size'] / 1024:.0f} KB，创建于 {created}"
+          + (f"，超出大小上限未写入 {dropped} 组缓存文件" if dropped else ""))
+    for name, sec in manifest["sections"].items():
+        print(f"  {name:<24} {sec['kind']:<6} {sec['files']:>6} 个文件 {sec['bytes'] / 1024:>9.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""测试直接导入 skills/newshub 下的平铺模块（与 python generate.py 的运行方式一致）。"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
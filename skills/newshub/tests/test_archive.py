@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import archive
+from archive import _decode, _encode, shard_of, tokens
+from editions import Edition
+
+MD = """# AI 资讯 24 小时 | {label}
+## 一、AI 技术
+### 1. OpenAI 发布 GPT-5 模型
+> 来源：OpenAI · {date} · [原文](https://openai.com/{n})
+
+推理能力大幅提升。
+
+### 2. 英伟达芯片出货
+> 来源：NVIDIA Blog · 近日 · https://blogs.nvidia.com/{n}
+
+数据中心需求旺盛。
+"""
+EDITIONS = [Edition("daily", out_md="AI资讯24小时_{date}.md")]
+
+
+def write_report(src, day, n=0, extra=""):
+    y, m, d = map(int, day.split("-"))
+    path = os.path.join(src, f"AI资讯24小时_{y}年{m}月{d}日.md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(MD.format(label=f"{y}年{m}月{d}日", date=day, n=n) + extra)
+    return path
+
+
+def lookup(root, term):
+    """按 shard_of 找到 term 所在分片，解码出 {条目号: 权重}。"""
+    with open(os.path.join(root, "index", f"{shard_of(term):02x}.json"), encoding="utf-8") as f:
+        return _decode(json.load(f).get(term, []))
+
+
+def test_tokens():
+    assert tokens("OpenAI 发布ＧＰＴ-5，a 大模型") == ["openai", "发布", "gpt", "5", "大模", "模型"]
+    assert tokens("芯") == ["芯"]
+
+
+def test_encode_round_trip():
+    post = {5003: 1, 2: 3, 1000: 4}
+    assert _encode(post) == [2, 3, 998, 4, 4003, 1]
+    assert _decode(_encode(post)) == post
+
+
+def test_build_and_incremental_update(tmp_path):
+    src, root = str(tmp_path / "src"), str(tmp_path / "archive")
+    os.makedirs(src)
+    write_report(src, "2026-09-01", 1)
+    write_report(src, "2026-09-02", 2)
+    assert archive.build(src, root, EDITIONS) == 2
+    with open(os.path.join(root, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert [d[0] for d in manifest["docs"]] == ["2026-09-01-daily", "2026-09-02-daily"]
+    assert manifest["items"] == 4 and manifest["shards"] == archive.SHARDS
+    # 标题里的词计 TITLE_WEIGHT，正文计 1；条目号 = 日报编号 × 1000 + 序号
+    assert lookup(root, "openai") == {0: archive.TITLE_WEIGHT + 1, 1000: archive.TITLE_WEIGHT + 1}
+    assert lookup(root, "推理") == {0: 1, 1000: 1}
+    assert os.path.exists(os.path.join(root, "search.js"))
+
+    assert archive.build(src, root, EDITIONS) == 0  # 内容未变，跳过
+    write_report(src, "2026-09-02", 2, extra="\n### 3. 谷歌量子计算\n> 来源：Google · 近日\n\n新进展。\n")
+    assert archive.build(src, root, EDITIONS) == 1
+    assert lookup(root, "量子") == {1002: archive.TITLE_WEIGHT}
+    assert lookup(root, "openai") == {0: 4, 1000: 4}  # 改动的日报沿用原编号，不重复计
+
+    shutil.rmtree(src)  # 源 Markdown 不在了也能按 days/*.json 重建
+    os.makedirs(src)
+    assert archive.build(src, root, EDITIONS, rebuild=True) == 0
+    assert lookup(root, "量子") == {1002: archive.TITLE_WEIGHT}
+    assert lookup(root, "openai") == {0: 4, 1000: 4}
+
+
+NODE_DRIVER = r"""
+const fs = require("fs"), vm = require("vm");
+const el = {addEventListener() {}, value: "", textContent: "", innerHTML: ""};
+const ctx = vm.createContext({
+  document: {getElementById: () => el}, window: {addEventListener() {}}, location: {hash: ""},
+  fetch: () => Promise.resolve({ok: false}), TextEncoder, URLSearchParams, console,
+});
+vm.runInContext(fs.readFileSync(process.argv[1], "utf8"), ctx);
+const input = JSON.parse(fs.readFileSync(0, "utf8"));
+vm.runInContext(`manifest = {shards: ${input.shards}}`, ctx);
+ctx.input = input;
+process.stdout.write(vm.runInContext(
+  "JSON.stringify({tokens: input.texts.map(tokens), shards: input.terms.map(shardOf)})", ctx));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="需要 node")
+def test_search_js_matches_python():
+    texts = ["OpenAI 发布ＧＰＴ-5，a 大模型", "Ⅻ 号 x 9 ９ abc123 ＡＢＣ", "李飞飞 World Labs 融资", "", "émoji 🤖 测试"]
+    terms = sorted({t for text in texts for t in tokens(text)} | {"a", "zz", "中"})
+    js = os.path.join(archive.WEB_DIR, "search.js")
+    out = subprocess.run(["node", "-e", NODE_DRIVER, js], capture_output=True, text=True, check=True, timeout=30,
+                         input=json.dumps({"texts": texts, "terms": terms, "shards": archive.SHARDS}))
+    got = json.loads(out.stdout)
+    assert got["tokens"] == [tokens(t) for t in texts]
+    assert got["shards"] == [f"{shard_of(t):02x}" for t in terms]
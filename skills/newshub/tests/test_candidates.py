@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import generate as g
+import ingest
+from candidates import CandidateStore
+from editions import Edition
+
+NOW = 1_790_000_000.0
+
+
+def item(n, title=None):
+    return {"title": title or f"新闻 {n}", "url": f"https://example.com/{n}", "content": "", "published": ""}
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = CandidateStore(str(tmp_path / "candidates.sqlite3"))
+    yield s
+    s.close()
+
+
+def test_upsert_dedups_by_link_and_title(store):
+    assert store.add([item(1), item(2)], "feed", "https://feed.example/rss", now=NOW) == 2
+    dup_link = {**item(1), "url": "http://www.example.com/1/?utm_source=x", "title": "改写的标题"}
+    dup_title = {**item(3), "title": "新闻　1！"}
+    assert store.add([item(1), dup_link, dup_title, {"title": "", "url": "x"}], "search", "q", now=NOW + 1) == 0
+    assert store.add([item(4)], "search", "q", now=NOW + 2) == 1
+    rows = store.window(NOW)
+    assert [r["title"] for r in rows] == ["新闻 1", "新闻 2", "新闻 4"]  # feed 在前，检索在后
+    assert rows[0]["origin"] == ["https://feed.example/rss"] and rows[0]["first_seen"] == NOW
+
+
+def test_age_based_expiry(store):
+    store.add([item(1)], "feed", "f", now=NOW - 50 * 3600)
+    store.add([item(2)], "feed", "f", now=NOW - 3600)
+    assert [r["title"] for r in store.window(NOW - 24 * 3600)] == ["新闻 2"]
+    assert store.prune(NOW - 48 * 3600) == 1
+    assert len(store.window(0)) == 1
+    assert store.add([item(1)], "feed", "f", now=NOW) == 1  # 过期删除后可重新入库
+
+
+def test_schedule_intervals(store):
+    base, lo, hi = 1800, 600, 3 * 3600
+    assert store.due(["a", "b"], now=NOW) == ["a", "b"]  # 从未轮询过
+    assert store.schedule("a", True, 3, base, lo, hi, now=NOW) == 900  # 有新条目：减半
+    assert store.schedule("a", True, 3, base, lo, hi, now=NOW) == 600  # 不低于 lo
+    assert store.schedule("a", True, 0, base, lo, hi, now=NOW) == 900  # 无新条目：×1.5
+    assert store.due(["a", "b"], now=NOW + 899) == ["b"]
+    assert store.due(["a", "b"], now=NOW + 900) == ["a", "b"]
+    waits = [store.schedule("b", False, 0, base, lo, hi, now=NOW) for _ in range(5)]
+    assert waits == [1800, 3600, 7200, hi, hi]  # 失败指数退避，不超过 hi
+    assert store.schedule("b", True, 1, base, lo, hi, now=NOW) == 900  # 恢复后从原间隔继续
+    assert store.next_wakeup(["a", "b"]) == NOW + 900
+    assert store.last_poll() == NOW
+
+
+def test_build_sources():
+    eds = [Edition("a", feeds=["https://f1"], queries=["q1"]), Edition("b", feeds=["https://f1", "https://f2"])]
+    sources = ingest.build_sources(eds, feed_minutes=15, query_minutes=60)
+    assert list(sources) == ["feed:https://f1", "feed:https://f2", "search:q1"]
+    assert sources["feed:https://f1"][0] == "feed" and sources["feed:https://f1"][2:] == (900, 600, 3 * 3600)
+    assert sources["search:q1"][0] == "search" and sources["search:q1"][2:] == (3600, 3600, 6 * 3600)
+
+
+def test_poll_once_gates_by_interval(store):
+    calls = []
+
+    def source(items, exc=None):
+        def fetch(cfg, search):
+            calls.append(items)
+            if exc:
+                raise exc
+            return items
+        return fetch
+
+    sources = {
+        "feed:https://f": ("feed", source([item(1), item(2)]), 1800, 600, 3 * 3600),
+        "search:q": ("search", source([item(3)]), 3600, 3600, 6 * 3600),
+        "search:broken": ("search", source([], RuntimeError("boom")), 3600, 3600, 6 * 3600),
+    }
+    store.add([item(9)], "feed", "https://f", now=time.time() - 49 * 3600)
+    with ThreadPoolExecutor(2) as pool:
+        assert ingest.poll_once(store, pool, g.Config(), sources) == (3, 3)
+        assert len(calls) == 3
+        assert ingest.poll_once(store, pool, g.Config(), sources) == (0, 0)  # 都没到期
+        assert len(calls) == 3
+    assert store.next_wakeup(["feed:https://f"]) == pytest.approx(time.time() + 900, abs=5)
+    assert store.next_wakeup(["search:broken"]) == pytest.approx(time.time() + 3600, abs=5)
+    assert {r["origin"][0] for r in store.window(0)} == {"https://f", "q"}
+    assert "新闻 9" not in [r["title"] for r in store.window(0)]  # 超过 keep_hours 的随轮询删除
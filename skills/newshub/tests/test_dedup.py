@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from dedup import cluster, features, tokens
+
+
+def test_tokens_words_and_cjk_bigrams():
+    assert tokens("OpenAI 发布 GPT-4.5 模型") == ["openai", "发布", "gpt-4.5", "模型"]
+    assert tokens("人工智能") == ["人工", "工智", "智能"]
+    assert tokens("中 a") == ["中", "a"]
+
+
+def test_features_strip_source_suffix_and_reuse_title():
+    a = features({"title": "OpenAI releases new reasoning model - The Verge", "content": "x"})
+    b = features({"title": "OpenAI releases new reasoning model", "content": "x"})
+    assert a[0] == b[0]
+    title_only = features({"title": "同一标题", "content": "同一标题"})
+    assert title_only[0] is title_only[1]
+    with_lead = features({"title": "同一标题", "content": "同一标题，另有正文"})
+    assert with_lead[0] < with_lead[1]
+
+
+def test_cluster_merges_rewrites_and_prefers_original_link():
+    items = [
+        {"title": "英伟达发布新一代数据中心芯片 Rubin - 新浪科技", "url": "https://news.google.com/rss/articles/1",
+         "content": "英伟达发布新一代数据中心芯片 Rubin - 新浪科技"},
+        {"title": "英伟达发布新一代数据中心芯片 Rubin", "url": "https://www.ithome.com/0/1.htm",
+         "content": "英伟达今日在发布会上公布了新一代数据中心芯片 Rubin 的规格"},
+        {"title": "Anthropic opens Tokyo office", "url": "https://techcrunch.com/tokyo", "content": "Tokyo office"},
+    ]
+    reps, stats = cluster(items)
+    assert stats["input"] == 3 and stats["clusters"] == 2 and stats["merged"] == 1 and stats["largest"] == 2
+    first = reps[0]
+    assert first["url"] == "https://www.ithome.com/0/1.htm"  # 非聚合链接优先
+    assert first["alternates"] == ["https://news.google.com/rss/articles/1"]
+    assert reps[1]["url"] == "https://techcrunch.com/tokyo" and "alternates" not in reps[1]
+    assert "alternates" not in items[1]  # 代表是副本，不改原条目
+
+
+def test_cluster_keeps_distinct_stories_in_order():
+    titles = ["OpenAI ships a new reasoning model", "苹果发布 Vision Pro 二代",
+              "Google DeepMind wins protein folding award", "微软收购一家游戏工作室", "Meta opens Llama weights"]
+    items = [{"title": t, "url": f"https://example.com/{i}", "content": t} for i, t in enumerate(titles)]
+    reps, stats = cluster(items)
+    assert [r["url"] for r in reps] == [it["url"] for it in items]
+    assert stats["merged"] == 0
+
+
+def test_cluster_empty():
+    reps, stats = cluster([])
+    assert reps == [] and stats["clusters"] == 0 and stats["largest"] == 0
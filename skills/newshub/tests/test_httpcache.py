@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import http.server
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import generate as g
+from httpcache import HttpCache
+
+FEED = (b'<?xml version="1.0"?><rss><channel>'
+        b'<item><title>A</title><link>https://example.com/a</link></item></channel></rss>')
+
+
+@pytest.fixture
+def server():
+    """本地 RSS 源：带 ETag，请求带对得上的 If-None-Match 时回 304。"""
+    hits = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(FEED)))
+            self.end_headers()
+            self.wfile.write(FEED)
+
+        def log_message(self, *args):
+            pass
+
+    srv = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/feed.xml", hits
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_not_modified_reuses_cached_body(server, tmp_path):
+    url, hits = server
+    cfg = g.Config(http_cache_dir=str(tmp_path / "http"))
+    first, info = g.fetch_feed(url, cfg=cfg), {}
+    second = g.fetch_feed(url, info=info, cfg=cfg)
+    assert first == second and first[0]["url"] == "https://example.com/a"
+    assert hits == [None, '"v1"']
+    assert info == {"status": "ok", "bytes": 0}  # 304：正文读自缓存，不从网络下载
+    assert cfg.metrics.snapshot()["stages"]["http"]["not_modified"] == 1
+
+
+def test_validators_and_load(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    url = "https://example.com/feed"
+    assert cache.validators(url) == {} and cache.load(url) is None
+    cache.store(url, {}, b"no validators")  # 无验证器的响应不缓存
+    assert cache.validators(url) == {}
+    cache.store(url, {"ETag": '"e"', "Last-Modified": "Wed, 09 Sep 2026 08:00:00 GMT"}, b"body")
+    assert cache.validators(url) == {"If-None-Match": '"e"', "If-Modified-Since": "Wed, 09 Sep 2026 08:00:00 GMT"}
+    assert cache.load(url) == b"body"
+
+
+def test_prune_expiry_and_size(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=6, max_age=3600)
+    for name, size in (("old", 4), ("a", 4), ("b", 4)):
+        cache.store(f"https://example.com/{name}", {"ETag": "x"}, b"x" * size)
+    meta_path = cache._path("https://example.com/old", "json")
+    meta = json.load(open(meta_path))
+    meta["used"] = time.time() - 7200
+    open(meta_path, "w").write(json.dumps(meta))
+    time.sleep(0.01)
+    cache.load("https://example.com/b")  # 刷新 b 的最近使用时间，a 最久未用
+    assert cache.prune() == 2  # old 过期；a 超出 6 字节上限
+    assert cache.load("https://example.com/b") == b"xxxx"
+    assert cache.load("https://example.com/a") is None and cache.load("https://example.com/old") is None
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    url = "https://example.com/feed"
+    cache.store(url, {"ETag": '"e"'}, b"body")
+    with open(cache._path(url, "json"), "w") as f:
+        f.write('{"url": "https://exa')  # 写到一半
+    assert cache.validators(url) == {} and cache.load(url) is None
+    cache.store(url, {"ETag": '"e"'}, b"body")
+    os.remove(cache._path(url, "body"))  # 元数据在、正文丢了：不能发条件请求
+    assert cache.validators(url) == {} and cache.load(url) is None
+    with open(cache._path("https://example.com/other", "json"), "w") as f:
+        f.write("not json")
+    assert cache.prune() == 1  # 损坏的元数据按最久未用淘汰
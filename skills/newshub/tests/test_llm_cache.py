@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+import generate as g
+from llm_cache import LLMCache, request_key
+
+PAYLOAD = {"model": "m", "max_tokens": 100, "temperature": 0.3,
+           "messages": [{"role": "user", "content": "今天的 AI 新闻"}]}
+RESPONSE = {"choices": [{"message": {"content": "日报"}}], "usage": {"prompt_tokens": 3}}
+
+
+def test_key_stability():
+    key = request_key(PAYLOAD)
+    assert request_key(dict(reversed(list(PAYLOAD.items())))) == key  # 字段顺序无关
+    assert request_key({**PAYLOAD, "stream": True}) == key  # 流式与否返回同一内容
+    assert request_key({**PAYLOAD, "max_tokens": 200}) != key
+    assert request_key({**PAYLOAD, "messages": [{"role": "user", "content": "昨天的"}]}) != key
+
+
+def test_hit_miss_and_modes(tmp_path):
+    root = str(tmp_path)
+    key = request_key(PAYLOAD)
+    cache = LLMCache(root)
+    assert cache.get(key) is None
+    cache.put(key, RESPONSE)
+    assert cache.get(key) == RESPONSE
+    assert LLMCache(root, mode="replay").get(key) == RESPONSE
+    assert LLMCache(root, mode="refresh").get(key) is None  # refresh 不读
+    LLMCache(root, mode="replay").put(key, {"other": 1})  # replay 不写
+    assert cache.get(key) == RESPONSE
+    assert LLMCache(root, ttl=-1).get(key) is None  # 过期
+    assert LLMCache(root, mode="replay", ttl=-1).get(key) == RESPONSE  # 回放不看有效期
+    with pytest.raises(SystemExit):
+        LLMCache(root, mode="bogus")
+
+
+def test_corrupt_or_partial_entry_is_a_miss(tmp_path):
+    cache = LLMCache(str(tmp_path))
+    key = request_key(PAYLOAD)
+    cache.put(key, RESPONSE)
+    with open(cache._path(key), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"created": 0, "response": RESPONSE})[:25])
+    assert cache.get(key) is None
+    cache.put(key, RESPONSE)  # 重新写入后恢复
+    assert cache.get(key) == RESPONSE
+    assert not [n for n in os.listdir(os.path.dirname(cache._path(key))) if n.endswith(".tmp")]
+
+
+def test_prune(tmp_path):
+    cache = LLMCache(str(tmp_path), max_bytes=1)
+    cache.put(request_key(PAYLOAD), RESPONSE)
+    assert LLMCache(str(tmp_path), mode="replay").prune() == 0  # 只读模式不删
+    assert cache.prune() == 1
+
+
+class FakeSession:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, json=None, **kwargs):
+        self.posts.append(json)
+
+        class R:
+            status_code = 200
+
+            @staticmethod
+            def json():
+                return RESPONSE
+        return R
+
+
+def test_call_llm_reuses_response(tmp_path, monkeypatch):
+    session = FakeSession()
+    monkeypatch.setattr(g, "_llm_session", lambda: session)
+    cfg = g.Config(cache_dir=str(tmp_path), model="m", llm_stream=False)
+    msgs = PAYLOAD["messages"]
+    assert g.call_llm(msgs, max_tokens=100, cfg=cfg) == RESPONSE
+    # label / timeout / stream 不影响键
+    assert g.call_llm(msgs, max_tokens=100, cfg=cfg, label="map", timeout=5, stream=True) == RESPONSE
+    assert len(session.posts) == 1
+    assert cfg.metrics.snapshot()["stages"]["llm"]["sources"]["map"]["cache_hits"] == 1
+    g.call_llm(msgs, max_tokens=200, cfg=cfg)
+    assert len(session.posts) == 2
+    replay = g.Config(cache_dir=str(tmp_path), model="m", llm_cache="replay")
+    with pytest.raises(SystemExit):
+        g.call_llm(msgs, max_tokens=300, cfg=replay)
+    assert len(session.posts) == 2
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+
+from providers import FanOut
+
+
+class Source:
+    """假检索源：延迟 delay 秒后返回 result，记录调用。"""
+
+    def __init__(self, result, delay=0.0):
+        self.result, self.delay, self.calls = result, delay, []
+
+    def __call__(self, query, timeout):
+        self.calls.append((query, timeout))
+        time.sleep(self.delay)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@pytest.fixture
+def fan():
+    made = []
+
+    def make(tiers, **kw):
+        kw.setdefault("hedge_delay", 0.2)
+        f = FanOut([[(n, s) for n, s in tier] for tier in tiers], **kw)
+        made.append(f)
+        return f
+    yield make
+    for f in made:
+        f.close()
+
+
+def test_first_tier_wins_without_hedging(fan):
+    a, b = Source(["a1"]), Source(["b1"])
+    f = fan([[("a", a)], [("b", b)]])
+    assert f.search("q") == ["a1"]
+    assert not b.calls
+
+
+def test_same_tier_results_merge(fan):
+    f = fan([[("a", Source(["a1"])), ("b", Source(["b1", "b2"], delay=0.05))]])
+    assert sorted(f.search("q")) == ["a1", "b1", "b2"]
+
+
+def test_hedge_after_delay(fan):
+    slow, fast = Source(["slow"], delay=1.0), Source(["fast"])
+    f = fan([[("slow", slow)], [("fast", fast)]], hedge_delay=0.1)
+    t0 = time.monotonic()
+    assert f.search("q") == ["fast"]
+    assert 0.1 <= time.monotonic() - t0 < 0.8
+
+
+def test_failed_tier_escalates_immediately(fan):
+    f = fan([[("a", Source([]))], [("b", Source(RuntimeError("boom")))], [("c", Source(["c1"]))]],
+            hedge_delay=5.0)
+    t0 = time.monotonic()
+    assert f.search("q") == ["c1"]
+    assert time.monotonic() - t0 < 1.0  # 不等 hedge_delay
+
+
+def test_all_fail_returns_empty(fan):
+    f = fan([[("a", Source([]))], [("b", Source(RuntimeError("boom")))]])
+    assert f.search("q") == []
+    assert f.report() == {"a": "成功 0/1，平均 0.0s", "b": "成功 0/1，平均 0.0s"}
+
+
+def test_deadline_returns_partial(fan):
+    a, b = Source(["a1"], delay=0.05), Source(["b1"], delay=2.0)
+    f = fan([[("a", a), ("b", b)]], deadline=0.3)
+    t0 = time.monotonic()
+    assert f.search("q") == ["a1"]  # b 未返回，取已到的部分
+    assert time.monotonic() - t0 < 1.0
+    assert f.search("q", budget=0.9) == []  # 剩余预算不足 1 秒，不发请求
+    assert a.calls[0][1] >= 1.0  # 传给源的超时至少 1 秒
+
+
+def test_unavailable_and_failing_sources_are_skipped(fan):
+    off, flaky, ok = Source(None), Source([]), Source(["ok"])
+    f = fan([[("off", off), ("flaky", flaky)], [("ok", ok)]], max_failures=2)
+    for _ in range(3):
+        assert f.search("q") == ["ok"]
+    assert len(off.calls) == 1 and len(flaky.calls) == 2
+    assert f.report()["off"] == "未启用"
+
+
+def test_search_after_close(fan):
+    a = Source(["a1"])
+    f = fan([[("a", a)]])
+    f.close()
+    assert f.search("q") == []
+    assert not a.calls
+
+
+def test_close_while_waiting(fan):
+    slow, later = Source(["slow"], delay=0.5), Source(["later"])
+    f = fan([[("slow", slow)], [("later", later)]], hedge_delay=0.2)
+    threading.Timer(0.05, f.close).start()
+    assert f.search("q") == []  # 关闭后不再发下一层，也不抛 RuntimeError
+    assert not later.calls
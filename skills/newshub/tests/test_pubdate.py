@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+
+from pubdate import normalize, parse, timestamp, within
+
+UTC = datetime.timezone.utc
+T0 = datetime.datetime(2026, 9, 9, 8, 0, tzinfo=UTC).timestamp()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Wed, 09 Sep 2026 08:00:00 GMT", T0),
+    ("09 Sep 2026 08:00 GMT", T0),
+    ("Wed, 09 Sep 2026 16:00:00 +0800", T0),
+    ("Wed, 09 Sep 2026 16:00:00 CST", T0),  # 中国标准时间
+    ("Wed, 09 Sep 2026 03:00:00 EST", T0),
+    ("Wed, 09 Sep 2026 01:00:00 PDT", T0),
+    ("Wed, 09 Sep 2026 17:00:00 JST", T0),
+    ("Wed, 09 Sep 2026 10:00:00 CEST", T0),
+    ("Wed, 09 Sep 2026 13:30:00 IST", T0),
+    ("2026-09-09T08:00:00Z", T0),
+    ("2026-09-09T08:00:00.123Z", T0 + 0.123),
+    ("2026-09-09T16:00:00+08:00", T0),
+    ("2026-09-09T08:00:00", T0),  # 无时区按 UTC
+    ("2026年9月9日", T0 - 8 * 3600),  # 只有日期按当天 00:00 UTC
+    ("发布于 2026/09/09", T0 - 8 * 3600),
+])
+def test_timestamp_formats(text, expected):
+    assert timestamp(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text", ["", None, "yesterday", "Wed, 31 Feb 2026 08:00:00 GMT x", "2026年13月40日"])
+def test_timestamp_invalid(text):
+    assert timestamp(text) is None
+
+
+def test_parse_returns_utc_datetime():
+    assert parse("Wed, 09 Sep 2026 16:00:00 CST") == datetime.datetime(2026, 9, 9, 8, 0, tzinfo=UTC)
+    assert parse("") is None
+
+
+def test_normalize_rewrites_in_place():
+    items = [{"published": "Wed, 09 Sep 2026 16:00:00 +0800"}, {"published": "n/a"}, {}]
+    assert normalize(items) == 2
+    assert items[0] == {"published": "2026-09-09T08:00:00Z", "published_ts": T0}
+    assert items[1] == {"published": "", "published_ts": None}
+    assert normalize(items) == 2  # 已归一化的不再解析
+
+
+def test_within_window_and_undated():
+    now = T0
+    items = [{"published_ts": now - 3600}, {"published_ts": now - 30 * 3600},
+             {"published_ts": None}, {"published_ts": now + 600}]
+    kept, stale, missing = within(items, 24, now)
+    assert kept == [items[0], items[2], items[3]] and (stale, missing) == (1, 1)
+    kept, stale, missing = within(items, 24, now, undated="drop")
+    assert kept == [items[0], items[3]] and (stale, missing) == (1, 1)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import smtplib
+import threading
+
+import pytest
+
+import push_email
+import state
+from push_email import MailConfig, Progress, send_report
+
+MD = """# AI 资讯 24 小时 | 2026年9月10日
+## 一、AI 技术
+### 1. 新模型发布
+> 来源：OpenAI · 2026-09-10 · https://openai.com/a
+
+正文。
+"""
+
+
+class FakeServer:
+    """假 SMTP：记录每封信；refuse 里的地址被拒收，flaky 里的地址所在批次发送时断线。"""
+
+    def __init__(self, refuse=(), flaky=()):
+        self.refuse, self.flaky = set(refuse), set(flaky)
+        self.sent, self.logins = [], 0
+        self.lock = threading.Lock()
+
+    def connect(self, cfg):
+        with self.lock:
+            self.logins += 1
+        return FakeConn(self)
+
+
+class FakeConn:
+    def __init__(self, server):
+        self.server = server
+
+    def sendmail(self, sender, to, raw):
+        if self.server.flaky.intersection(to):
+            raise smtplib.SMTPServerDisconnected("connection lost")
+        refused = {a: (550, b"no such user") for a in to if a in self.server.refuse}
+        if len(refused) == len(to):
+            raise smtplib.SMTPRecipientsRefused(refused)
+        with self.server.lock:
+            self.server.sent.append((list(to), raw))
+        return refused
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    srv = FakeServer()
+    monkeypatch.setattr(push_email, "_connect", srv.connect)
+    monkeypatch.setattr(push_email.time, "sleep", lambda s: None)  # 重试退避不真等
+    return srv
+
+
+def config(tmp_path, **kw):
+    kw = {"auth": "x", "batch_size": 3, "connections": 2, "per_connection": 1, "rate_per_min": 0,
+          "progress_dir": tmp_path / "email", **kw}
+    return MailConfig(**kw)
+
+
+def addrs(n):
+    return [f"u{i}@example.com" for i in range(n)]
+
+
+def test_batches_share_one_message(server, tmp_path):
+    assert send_report(MD, addrs(7) + ["U0@Example.com"], config(tmp_path)) == []
+    assert sorted(len(to) for to, _ in server.sent) == [1, 3, 3]
+    assert sorted(a for to, _ in server.sent for a in to) == sorted(addrs(7))  # 大小写规范化后去重
+    assert len({raw for _, raw in server.sent}) == 1
+    raw = server.sent[0][1]
+    assert b"To: undisclosed-recipients:;" in raw and b"u0@example.com" not in raw
+    assert server.logins == 3  # 每条连接发满 per_connection 封后重连
+    assert not list((tmp_path / "email").glob("*.json"))  # 全部送达后删除进度
+
+
+def test_single_recipient_in_to_header(server, tmp_path):
+    send_report(MD, ["a@example.com"], config(tmp_path))
+    assert b"To: a@example.com" in server.sent[0][1]
+
+
+def test_refused_recorded_and_resume_skips_sent(server, tmp_path):
+    server.refuse = {"u1@example.com", "u3@example.com", "u4@example.com", "u5@example.com"}
+    server.flaky = {"u6@example.com"}
+    cfg = config(tmp_path)
+    assert send_report(MD, addrs(7), cfg) == ["u6@example.com"]
+    [path] = (tmp_path / "email").glob("*.json")
+    progress = Progress(path)
+    assert progress.delivered == {"u0@example.com", "u2@example.com"}
+    assert set(progress.refused) == server.refuse  # 部分拒收与整批拒收都记下，不再重试
+
+    server.flaky, server.sent = set(), []
+    assert send_report(MD, addrs(7), cfg) == []
+    assert [to for to, _ in server.sent] == [["u6@example.com"]]  # 只补发未送达的
+    assert not path.exists()
+    assert send_report(MD, addrs(7), cfg) == [] and len(server.sent) == 3  # 进度已删，新一轮全发
+
+
+def test_progress_restored_from_state_snapshot(server, tmp_path):
+    """CI 每次是新机器：进度目录从状态快照的 email 段恢复。"""
+    cfg = config(tmp_path / "run1", batch_size=1, state_path=str(tmp_path / "state.zip"))
+    server.flaky = {"u2@example.com"}
+    assert send_report(MD, addrs(3), cfg) == ["u2@example.com"]
+    state.save(cfg.state_path, {"email": ("dir", str(cfg.progress_dir))})
+
+    server.flaky, server.sent = set(), []
+    fresh = config(tmp_path / "run2", batch_size=1, state_path=cfg.state_path)
+    assert send_report(MD, addrs(3), fresh) == []
+    assert [to for to, _ in server.sent] == [["u2@example.com"]]
+
+
+def test_auth_failure_returns_all(monkeypatch, tmp_path):
+    def deny(cfg):
+        raise smtplib.SMTPAuthenticationError(535, b"auth failed")
+    monkeypatch.setattr(push_email, "_connect", deny)
+    assert sorted(send_report(MD, addrs(5), config(tmp_path))) == addrs(5)
+    with pytest.raises(SystemExit):
+        send_report(MD, addrs(1), config(tmp_path, auth=None))
+
+
+def test_load_recipients(tmp_path):
+    lst = tmp_path / "list.txt"
+    lst.write_text("# 订阅者\nB@example.com\n\nc@example.com  # 备注\nnot-an-address\n", encoding="utf-8")
+    assert push_email.load_recipients("a@example.com, b@example.com;", str(lst)) == [
+        "a@example.com", "b@example.com", "c@example.com"]
+
+
+def test_rate_limiter_spacing(monkeypatch):
+    waits = []
+    monkeypatch.setattr(push_email.time, "sleep", waits.append)
+    limiter = push_email.RateLimiter(60)
+    for _ in range(3):
+        limiter.wait()
+    assert waits[0] == 0 and waits[1] == pytest.approx(1.0, abs=0.05) and waits[2] == pytest.approx(2.0, abs=0.05)
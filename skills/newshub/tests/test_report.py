@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from report import parse, render_html, validate
+
+MD = """# AI 资讯 24 小时 | 2026年8月13日
+今日 3 条
+
+## 一、AI 技术
+### 1. 新模型 <发布>
+> 来源：OpenAI · 2026-08-12 · [原文](https://openai.com/a?x=1&y=2)
+
+正文第一段。
+
+### 2. **芯片** 进展
+> 来源：NVIDIA Blog · 近日 · https://blogs.nvidia.com/b
+
+正文。
+## 二、AI 应用
+### 7. 没有来源行的条目
+只有正文。
+"""
+
+
+def test_parse_structure():
+    rep = parse(MD)
+    assert rep.title == "AI 资讯 24 小时 | 2026年8月13日"
+    assert [s.header for s in rep.sections] == ["一、AI 技术", "二、AI 应用"]
+    assert rep.count() == 3
+    first, second, third = rep.items()
+    assert (first.title, first.source, first.date, first.url) == (
+        "新模型 <发布>", "OpenAI", "2026-08-12", "https://openai.com/a?x=1&y=2")
+    assert (second.source, second.date, second.url) == ("NVIDIA Blog", "近日", "https://blogs.nvidia.com/b")
+    assert third.url == "" and third.body == "只有正文。"
+    assert rep.entries()[1] == ("芯片 进展", "https://blogs.nvidia.com/b")
+
+
+def test_to_markdown_renumbers_and_round_trips():
+    md = parse(MD).to_markdown()
+    assert "### 3. 没有来源行的条目" in md
+    again = parse(md)
+    assert again.entries() == parse(MD).entries()
+
+
+def test_trim_keeps_every_section():
+    rep = parse(MD).trim(2)
+    assert rep.count() == 2
+    assert [len(s.items) for s in rep.sections] == [1, 1]
+
+
+def test_validate_reports_defects():
+    rep = parse(MD)
+    _, second, third = rep.items()
+    defects = validate(rep, 5, [("AI 技术", "一、AI 技术"), ("AI 行业动态", "三、AI 行业动态")], min_body=5)
+    assert defects[0] == ("count", 2)
+    assert ("section", "AI 行业动态") in defects
+    assert ("link", third) in defects
+    assert ("short", second) in defects and len(defects) == 4  # 「正文第一段。」够 5 字，「正文。」不够
+
+
+def test_render_html_escapes_text():
+    rep = parse(MD.replace("正文第一段。", '<script>alert("x")</script> & 更多'))
+    page = render_html(rep, "2026年8月13日", title="AI <资讯>")
+    assert "<script>" not in page
+    assert "&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; 更多" in page
+    assert "<h3>1. 新模型 &lt;发布&gt;</h3>" in page
+    assert "<title>AI &lt;资讯&gt; | 2026年8月13日</title>" in page
+    assert '<a href="https://openai.com/a?x=1&amp;y=2" target="_blank">原文</a>' in page
+    assert "<strong>芯片</strong>" in page
+
+
+def test_render_html_drops_script_links():
+    md = MD.replace("正文第一段。", "[点我](javascript:alert(1)) [二](JaVa\tScript:x) [三](data:text/html,x) [四](/archive/)")
+    page = render_html(parse(md))
+    assert "javascript" not in page.lower().replace("\t", "") and "data:" not in page
+    assert "点我" in page and "二" in page
+    assert '<a href="/archive/" target="_blank">四</a>' in page
+
+
+def test_render_html_styles():
+    rep = parse(MD)
+    assert 'href="archive/"' in render_html(rep, style="page")
+    assert 'href="archive/"' not in render_html(rep, style="email")
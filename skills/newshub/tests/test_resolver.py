@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import pytest
+import requests
+
+import generate as g
+from resolver import UrlMap, find_canonical, needs_resolution
+from seen_store import strip_tracking
+
+GNEWS = "https://news.google.com/rss/articles/abc"
+ARTICLE = "https://www.example.com/story?id=7&utm_source=gnews"
+
+
+@pytest.mark.parametrize("url, expected", [
+    (GNEWS, True),
+    ("https://www.bit.ly/x", True),
+    ("https://t.co/abc", True),
+    ("https://news.ycombinator.com/item?id=1", False),
+    ("https://example.com/a", False),
+    ("", False),
+])
+def test_needs_resolution(url, expected):
+    assert needs_resolution(url) is expected
+
+
+def test_strip_tracking():
+    assert strip_tracking(ARTICLE) == "https://www.example.com/story?id=7"
+    assert strip_tracking("https://example.com/a#frag") == "https://example.com/a"
+
+
+def test_find_canonical():
+    page = b'<html><head><link rel="stylesheet" href="/s.css"><link href="/a/1?x=1&amp;y=2" rel="Canonical">'
+    assert find_canonical(page, "https://pub.example/p") == "https://pub.example/a/1?x=1&y=2"
+    refresh = b"<meta http-equiv='refresh' content='0;URL=\"https://pub.example/b\"'>"
+    assert find_canonical(refresh, GNEWS) == "https://pub.example/b"
+    assert find_canonical(b"<html></html>", GNEWS) == ""
+
+
+def test_url_map_ttl_and_prune(tmp_path):
+    m = UrlMap(str(tmp_path / "urlmap.sqlite3"), max_age=100, fail_ttl=10)
+    try:
+        assert m.put_many([(GNEWS, ARTICLE), ("https://t.co/x", "")], now=1000) == {
+            GNEWS: "https://www.example.com/story?id=7", "https://t.co/x": ""}
+        assert m.get_many([GNEWS, "https://t.co/x", "https://bit.ly/y"], now=1005) == {
+            GNEWS: "https://www.example.com/story?id=7", "https://t.co/x": ""}
+        assert m.get_many([GNEWS, "https://t.co/x"], now=1050) == {GNEWS: "https://www.example.com/story?id=7"}
+        assert m.prune(now=1050) == 1  # 失败记录过了 fail_ttl
+        assert m.prune(now=1200) == 1
+    finally:
+        m.close()
+
+
+class R:
+    def __init__(self, url, status_code=200, content=b"", content_type="text/html"):
+        self.url, self.status_code, self.content = url, status_code, content
+        self.headers = {"Content-Type": content_type}
+
+
+def stub_http(monkeypatch, routes):
+    """routes: {(方法, 链接): R 或异常}；记录每次请求。"""
+    calls = []
+
+    def fake(method, url, cfg=None, **kw):
+        calls.append((method, url))
+        r = routes[(method, url)]
+        if isinstance(r, Exception):
+            raise r
+        return r
+    monkeypatch.setattr(g, "_http", fake)
+    return calls
+
+
+def test_head_redirect_out_of_aggregator(monkeypatch):
+    calls = stub_http(monkeypatch, {("HEAD", GNEWS): R(ARTICLE)})
+    assert g.resolve_link(GNEWS) == "https://www.example.com/story?id=7"
+    assert calls == [("HEAD", GNEWS)]  # 跳出聚合页后不再 GET 读 canonical
+
+
+def test_get_canonical_when_head_stays_on_aggregator(monkeypatch):
+    page = b'<link rel="canonical" href="https://pub.example/a?utm_medium=x">'
+    calls = stub_http(monkeypatch, {("HEAD", GNEWS): R(GNEWS, 405), ("GET", GNEWS): R(GNEWS, content=page)})
+    assert g.resolve_link(GNEWS) == "https://pub.example/a"
+    assert calls == [("HEAD", GNEWS), ("GET", GNEWS)]
+
+
+@pytest.mark.parametrize("routes", [
+    {("HEAD", GNEWS): R(GNEWS), ("GET", GNEWS): R(GNEWS, content=b"<html>no link</html>")},
+    {("HEAD", GNEWS): R(GNEWS, 404), ("GET", GNEWS): R(GNEWS, 404)},
+    {("HEAD", GNEWS): requests.ConnectionError("down")},
+])
+def test_unresolvable(monkeypatch, routes):
+    stub_http(monkeypatch, routes)
+    assert g.resolve_link(GNEWS) == ""
+
+
+def test_resolve_urls_uses_map(monkeypatch, tmp_path):
+    calls = stub_http(monkeypatch, {("HEAD", GNEWS): R(ARTICLE), ("HEAD", "https://t.co/x"): R("https://t.co/x", 500),
+                                    ("GET", "https://t.co/x"): R("https://t.co/x", 500)})
+    cfg = g.Config(cache_dir=str(tmp_path))
+    urls = [GNEWS, "https://t.co/x", "https://example.com/a?utm_source=x", GNEWS]
+    assert g.resolve_urls(urls, cfg) == {GNEWS: "https://www.example.com/story?id=7"}
+    n = len(calls)
+    assert g.resolve_urls(urls, cfg) == {GNEWS: "https://www.example.com/story?id=7"}
+    assert len(calls) == n  # 成功与失败都记在映射里，不再联网
+    items = [{"url": GNEWS}, {"url": "https://example.com/a"}]
+    g.resolve_links(items, cfg)
+    assert items == [{"url": "https://www.example.com/story?id=7", "via": GNEWS}, {"url": "https://example.com/a"}]
+
+
+def test_resolve_urls_without_map_strips_tracking(monkeypatch):
+    stub_http(monkeypatch, {("HEAD", GNEWS): R(ARTICLE)})
+    assert g.resolve_urls([GNEWS], g.Config()) == {GNEWS: "https://www.example.com/story?id=7"}
+    assert g.resolve_urls([GNEWS], g.Config(resolve_links=False)) == {}
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import datetime
+import time
+
+import pytest
+
+from schedule import Deadline, SourceStats, max_items, order, source_state, summarize
+
+TODAY = datetime.date(2026, 9, 9)
+
+
+def day(n):
+    return TODAY - datetime.timedelta(days=n)
+
+
+def test_deadline_unbounded():
+    d = Deadline()
+    assert not d.expired() and d.wait_timeout() is None and d.timeout(15) == 15
+
+
+def test_deadline_timeout_and_sub():
+    d = Deadline(10, start=time.monotonic() - 8)
+    assert d.timeout(15) == pytest.approx(2, abs=0.1)
+    assert d.timeout(15, floor=5) == 5
+    assert d.sub(5).expired() and not d.sub(30).expired()
+    assert d.sub(30).end == d.end and d.sub(0).end == d.end
+    assert Deadline(1, start=time.monotonic() - 2).wait_timeout() == 0.0
+
+
+def test_summarize_streak_skips_credit_only_days():
+    # [day, runs, ok, seconds, bytes, items, kept, used, status]，按日期倒序
+    rows = [[day(0).isoformat(), 1, 1, 2.0, 100, 0, 0, 0, "empty"],
+            [day(1).isoformat(), 0, 0, 0.0, 0, 0, 0, 2, ""],  # 只有 used
+            [day(2).isoformat(), 1, 1, 4.0, 300, 0, 0, 0, "empty"],
+            [day(3).isoformat(), 2, 2, 6.0, 600, 6, 3, 1, "ok"]]
+    s = summarize(rows, TODAY)
+    assert s["streak"] == 2 and s["fetches"] == 4 and s["days"] == 3
+    assert s["status"] == "empty" and s["idle_days"] == 0
+    assert s["per_run"] == 1.5 and s["used"] == 0.75 and s["seconds"] == 3.0
+
+
+@pytest.mark.parametrize("streak, idle, expected", [
+    (0, 0, ("ok", True)),
+    (1, 0, ("ok", True)),
+    (2, 1, ("backoff", False)),
+    (2, 2, ("backoff", True)),
+    (3, 3, ("backoff", False)),
+    (3, 4, ("backoff", True)),
+    (4, 6, ("quarantine", False)),
+    (4, 7, ("quarantine", True)),
+])
+def test_source_state(streak, idle, expected):
+    assert source_state({"streak": streak, "idle_days": idle}, TODAY) == expected
+
+
+def test_source_state_without_history():
+    assert source_state({}, TODAY) == ("ok", True)
+
+
+def test_max_items():
+    assert max_items(None, 3) == 3
+    assert max_items({"used": 0.5}, 3) == 3
+    assert max_items({"used": 1}, 3) == 6
+    assert max_items({"used": 2}, 8) == 10
+
+
+def test_record_and_quarantine(tmp_path):
+    stats = SourceStats(str(tmp_path / "sources.sqlite3"))
+    try:
+        for n in range(4, 0, -1):
+            stats.record([("feed:empty", 1.0, 0, False, "empty", 0, 0),
+                          ("feed:slow", 1.0, 0, False, "late", 0, 0),
+                          ("feed:good", 0.5, 5, True, "ok", 1000, 4)], day=day(n))
+        stats.credit({"feed:good": 2}, day=day(1))
+        got = stats.get_many(["feed:empty", "feed:slow", "feed:good", "feed:new"], today=TODAY)
+        assert "feed:new" not in got
+        assert got["feed:slow"]["runs"] == 4 and "streak" not in got["feed:slow"]  # late 不记 history
+        assert source_state(got["feed:slow"], TODAY) == ("ok", True)
+        assert source_state(got["feed:empty"], TODAY) == ("quarantine", False)
+        assert got["feed:good"]["used"] == 0.5 and got["feed:good"]["kept"] == 4
+        names = ["feed:empty", "feed:good", "feed:new"]
+        assert [names[i] for i in order(names, got)] == ["feed:new", "feed:good", "feed:empty"]
+        assert [r[0] for r in stats.report(today=TODAY)] == ["feed:empty", "feed:good"]
+        assert stats.prune(today=TODAY, days=2) == 4
+    finally:
+        stats.close()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+import pytest
+
+from seen_store import SeenStore, canonical_url, normalize_title, strip_tracking
+
+D = datetime.date(2026, 9, 10)
+
+
+def day(n):
+    return D + datetime.timedelta(days=n)
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SeenStore(str(tmp_path / "seen.sqlite3"))
+    yield s
+    s.close()
+
+
+@pytest.mark.parametrize("a, b", [
+    ("http://www.Example.com/a/?utm_source=x&b=2&a=1#top", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/", "https://example.com"),
+])
+def test_canonical_url(a, b):
+    assert canonical_url(a) == canonical_url(b)
+
+
+def test_strip_tracking_keeps_the_rest():
+    assert strip_tracking("https://Example.com/a/?id=3&utm_medium=rss&fbclid=z#c") == "https://Example.com/a/?id=3"
+
+
+def test_normalize_title():
+    assert normalize_title("ＯｐｅｎＡＩ 发布 GPT-5！") == normalize_title("openai发布gpt5")
+
+
+def test_link_or_title_match(store):
+    store.add(day(0), [("OpenAI 发布新模型", "https://example.com/a?utm_source=rss")])
+    since, until = day(-7), day(1)
+    assert store.is_seen({"title": "完全不同的标题", "url": "http://www.example.com/a/"}, since, until)
+    assert store.is_seen({"title": "OpenAI发布新模型！", "url": "https://other.com/b"}, since, until)
+    assert not store.is_seen({"title": "别的新闻", "url": "https://example.com/b"}, since, until)
+    # until 不含当天：同日重跑不把本期条目当成往期
+    assert not store.is_seen({"title": "OpenAI 发布新模型", "url": ""}, since, day(0))
+
+
+def test_window_and_prune(store):
+    store.add(day(-10), [("旧闻", "https://example.com/old")])
+    store.add(day(-1), [("昨天", "https://example.com/y")])
+    since, until = day(-7), day(0)
+    assert not store.is_seen({"title": "旧闻"}, since, until)
+    assert store.titles(since, until) == ["昨天"]
+    assert store.prune(since) == 2  # 旧闻的链接与标题两行
+    assert store.titles(day(-30), until) == ["昨天"]
+
+
+def test_readd_keeps_latest_day(store):
+    store.add(day(-1), [("同一条", "https://example.com/x")])
+    store.add(day(-5), [("同一条", "https://example.com/x")])  # 补登更早的日期不回退
+    store.prune(day(-2))
+    assert store.is_seen({"title": "同一条"}, day(-2), day(0))
+
+
+def test_reopen_existing_db(tmp_path):
+    path = str(tmp_path / "seen.sqlite3")
+    s = SeenStore(path)
+    assert s.empty()
+    s.add(day(0), [("持久化", "https://example.com/p")])
+    s.close()
+    s = SeenStore(path)
+    try:
+        assert not s.empty()
+        assert s.is_seen({"url": "https://example.com/p"}, day(0), day(1))
+    finally:
+        s.close()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import zipfile
+
+import state
+
+
+def make_sections(tmp_path):
+    cache = tmp_path / "http"
+    (cache / "ab").mkdir(parents=True)
+    (cache / "ab" / "abc.json").write_text('{"etag": "x"}')
+    (cache / "ab" / "abc.body").write_bytes(b"\x00body" * 100)
+    (cache / "partial.tmp").write_text("half")
+    db = tmp_path / "seen.sqlite3"
+    conn = sqlite3.connect(db)
+    with conn:
+        conn.execute("CREATE TABLE seen (url TEXT PRIMARY KEY)")
+        conn.executemany("INSERT INTO seen VALUES (?)", [(f"https://example.com/{i}",) for i in range(50)])
+    conn.close()
+    return {"http": ("dir", str(cache)), "seen": ("sqlite", str(db)), "llm": ("dir", str(tmp_path / "missing"))}
+
+
+def test_save_and_restore_round_trip(tmp_path):
+    snap = str(tmp_path / "out" / "state.zip")
+    manifest = state.save(snap, make_sections(tmp_path))
+    assert set(manifest["sections"]) == {"http", "seen"}  # 本地不存在的段跳过
+    assert manifest["sections"]["http"]["files"] == 2  # .tmp 不打包
+    assert manifest["size"] == os.path.getsize(snap) and not os.path.exists(snap + ".tmp")
+    assert state.read_manifest(snap)["sections"] == manifest["sections"]
+
+    dest = tmp_path / "restored"
+    assert state.restore(snap, "http", str(dest / "http"))
+    assert (dest / "http" / "ab" / "abc.body").read_bytes() == b"\x00body" * 100
+    assert abs(os.path.getmtime(dest / "http" / "ab" / "abc.json")
+               - os.path.getmtime(tmp_path / "http" / "ab" / "abc.json")) <= 2  # zip 时间精度为 2 秒
+    assert state.restore(snap, "seen", str(dest / "seen.sqlite3"))
+    conn = sqlite3.connect(dest / "seen.sqlite3")
+    assert conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0] == 50
+    conn.close()
+    assert not state.restore(snap, "llm", str(dest / "llm"))
+    assert not os.path.exists(dest / "llm")
+
+
+def test_restore_keeps_existing_dest(tmp_path):
+    snap = str(tmp_path / "state.zip")
+    state.save(snap, make_sections(tmp_path))
+    dest = tmp_path / "seen-existing.sqlite3"
+    dest.write_bytes(b"local")
+    assert not state.restore(snap, "seen", str(dest))
+    assert dest.read_bytes() == b"local"
+
+
+def test_corrupted_section_is_dropped(tmp_path):
+    snap = str(tmp_path / "state.zip")
+    state.save(snap, make_sections(tmp_path))
+    bad = str(tmp_path / "bad.zip")
+    with zipfile.ZipFile(snap) as src, zipfile.ZipFile(bad, "w") as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename == "http/ab/abc.json":
+                data = b'{"etag": "y"}'
+            dst.writestr(info, data)
+    dest = tmp_path / "restored-http"
+    assert not state.restore(bad, "http", str(dest))
+    assert not os.path.exists(dest) and not os.path.exists(str(dest) + ".restore.tmp")
+    assert state.restore(bad, "seen", str(tmp_path / "restored.sqlite3"))  # 其他段不受影响
+
+
+def test_missing_or_foreign_snapshot(tmp_path):
+    assert state.read_manifest(str(tmp_path / "none.zip")) is None
+    assert not state.restore(str(tmp_path / "none.zip"), "http", str(tmp_path / "http"))
+    junk = tmp_path / "junk.zip"
+    junk.write_bytes(b"not a zip")
+    assert state.read_manifest(str(junk)) is None
+    other = str(tmp_path / "other.zip")
+    with zipfile.ZipFile(other, "w") as zf:
+        zf.writestr(state.MANIFEST, '{"format": "something-else", "version": 1}')
+    assert state.read_manifest(other) is None
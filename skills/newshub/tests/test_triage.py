@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import generate as g
+import triage
+from editions import Edition
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("[[1, 8, 0], [2, 3.5, 1], [3, 5]]", {1: (8.0, 0), 2: (3.5, 1), 3: (5.0, None)}),
+    ("好的，结果如下：\n```json\n[[2, 7, 2]]\n```", {2: (7.0, 2)}),
+    ("[[1, 15, 0], [2, -3, 1]]", {1: (9.0, 0), 2: (0.0, 1)}),  # 分数截到 0–9
+    ("[[0, 5, 0], [4, 5, 0], [1, 6, 3], [2, \"8\", 0], [\"3\", 8, 0], [3], 7]", {1: (6.0, None)}),
+])
+def test_parse(text, expected):
+    assert triage.parse(text, 3, 3) == expected
+
+
+@pytest.mark.parametrize("text", ["", "无法评分", "[[1, 8, 0], [2,", None])
+def test_parse_malformed(text):
+    with pytest.raises(ValueError):
+        triage.parse(text, 3, 3)
+
+
+def test_listing():
+    batch = [{"title": "新模型", "url": "https://www.example.com/a", "content": "  一段\n摘要 "}]
+    assert triage.listing(batch) == "1 | 新模型 | example.com | 一段 摘要"
+
+
+def test_shortlist_keep_and_section_floor():
+    items = list("abcdefgh")
+    scores = [(9, 0), (8, 0), (7, 0), (6, 0), (5, 0), (2, 1), (1, 2), (0, None)]
+    picked = triage.shortlist(items, scores, keep=6, k=3)  # 每个分区保底 6 // 6 = 1 条
+    assert [it for it, _ in picked] == ["a", "b", "c", "d", "f", "g"]
+    assert [it for it, _ in triage.shortlist(items, scores, keep=3, k=3)] == ["a", "b", "c"]  # 保底为 0
+    assert len(triage.shortlist(items, scores, keep=20, k=3)) == len(items)
+
+
+def test_local_scores_and_sections():
+    items = [{"title": "开源大模型发布新权重", "url": "https://a.example/1", "content": "训练 推理 基准 评测"},
+             {"title": "AI 助手上线新功能", "url": "https://b.example/2", "content": "产品 用户 应用 智能体"}]
+    scores = triage.local(items, g.SECTION_HEADERS)
+    assert [sec for _, sec in scores] == [0, 1]
+    assert all(0 <= s <= triage.MAX_SCORE for s, _ in scores)
+    assert [sec for _, sec in triage.local(items, [("其他", "一、其他")])] == [None, None]
+
+
+ED = Edition("t", sections=g.SECTION_HEADERS)
+
+
+def pool(n):
+    return [{"title": f"新闻 {i} 大模型", "url": f"https://example.com/{i}", "content": "模型 发布"}
+            for i in range(n)]
+
+
+def test_triage_falls_back_per_batch(monkeypatch):
+    replies = iter(['[[1, 9, 1], [2, 1, 0], [3, 1, 0], [4, 1, 0]]', "抱歉，我无法完成"])
+    monkeypatch.setattr(g, "call_llm", lambda *a, **kw: {"choices": [{"message": {"content": next(replies)}}]})
+    cfg = g.Config(triage="llm", triage_batch=4, triage_keep=3)
+    monkeypatch.setattr(g, "TRIAGE_WORKERS", 1)  # 两批按顺序取回复
+    out = g.triage(pool(8), ED, cfg)
+    assert len(out) == 3
+    assert out[0]["triage_section"] == "AI 应用"  # 模型给第 1 条 9 分、分区 1
+    stats = cfg.metrics.snapshot()["stages"]["triage"]
+    assert (stats["batches"], stats["failed_batches"], stats["output"]) == (2, 1, 3)
+
+
+def test_triage_skips_small_pools(monkeypatch):
+    monkeypatch.setattr(g, "call_llm", lambda *a, **kw: pytest.fail("不应调用模型"))
+    items = pool(3)
+    assert g.triage(items, ED, g.Config(triage="llm", triage_keep=3)) is items
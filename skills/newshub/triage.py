@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+素材初筛（两级模型的第一级，仅标准库）：给候选素材打分、标分区，只把入围的一小批交给主模型成稿
+
+主模型原先要读完装箱后的全部素材（约 100 条）再挑 20 条，大半 token 花在最终被舍弃的素材上。
+初筛把候选切成小批，由便宜 / 快速的模型（或本地启发式）各批并行打分，返回紧凑 JSON；
+入围的约 30 条再按更宽的摘要预算（可叠加原文正文）交给主模型。调用与并发在 generate.triage()。
+
+listing(batch)          一批素材的紧凑清单：「编号 | 标题 | 来源站点 | 摘要（截到 SUMMARY_TOKENS）」
+parse(text, n, k)       解析模型输出 [[编号, 分数, 分区号], ...]，返回 {编号: (分数, 分区号或 None)}
+local(items, sections)  本地启发式：分数 = ranking.score（相关度 + 新鲜度，换算到 0–9），分区取关键词余弦最大的一个
+                        （分区名不在 ranking.SECTIONS 里的版本不标分区）
+shortlist(...)          按分数取 keep 条，每个分区先保底 keep // (2 × 分区数) 条，避免入围素材偏向单一分区
+"""
+
+import re
+import json
+from urllib.parse import urlsplit
+
+import ranking
+
+SUMMARY_TOKENS = 60
+MAX_SCORE = 9
+
+_ARRAY = re.compile(r"\[.*\]", re.S)
+
+
+def listing(batch):
+    lines = []
+    for i, it in enumerate(batch, 1):
+        host = urlsplit(it.get("url") or "").netloc.lower().removeprefix("www.")
+        summary = ranking.clip_tokens(" ".join((it.get("content") or "").split()), SUMMARY_TOKENS)
+        lines.append(f"{i} | {it.get('title', '')} | {host} | {summary}")
+    return "\n".join(lines)
+
+
+def parse(text, n, k):
+    """模型输出 -> {编号: (分数, 分区号或 None)}；编号 1..n、分区号 0..k-1 之外的行忽略，缺的编号由调用方兜底。"""
+    m = _ARRAY.search(text or "")
+    if not m:
+        raise ValueError("初筛输出里没有 JSON 数组")
+    out = {}
+    for row in json.loads(m.group(0)):
+        if not isinstance(row, list) or len(row) < 2:
+            continue
+        i, s = row[0], row[1]
+        sec = row[2] if len(row) > 2 else None
+        if not isinstance(i, int) or not 1 <= i <= n or not isinstance(s, (int, float)):
+            continue
+        out[i] = (max(0.0, min(float(s), MAX_SCORE)), sec if isinstance(sec, int) and 0 <= sec < k else None)
+    return out
+
+
+def local(items, sections, now=None, half_life=ranking.HALF_LIFE_HOURS):
+    """本地打分：[(分数, 分区号或 None)]，与 items 等长。"""
+    keys = list(ranking.SECTIONS)
+    index = [keys.index(key) if key in keys else None for key, _ in sections]
+    relevance = ranking.relevance(items)
+    out = []
+    for s, rels in zip(ranking.score(items, now, half_life, relevance), relevance):
+        best = None
+        if None not in index:
+            best = max(range(len(sections)), key=lambda j: rels[index[j]])
+        out.append((s * MAX_SCORE, best))
+    return out
+
+
+def shortlist(items, scores, keep, k):
+    """按分数取至多 keep 条（同分按原顺序），返回 [(素材, 分区号或 None)]；scores 与 items 等长。"""
+    order = sorted(range(len(items)), key=lambda i: -scores[i][0])
+    floor = keep // (2 * k) if k else 0
+    picked, per = [], {}
+    for i in order:
+        sec = scores[i][1]
+        if sec is not None and per.get(sec, 0) < floor:
+            per[sec] = per.get(sec, 0) + 1
+            picked.append(i)
+    chosen = set(picked)
+    for i in order:
+        if len(picked) >= keep:
+            break
+        if i not in chosen:
+            picked.append(i)
+    picked = sorted(picked[:keep], key=lambda i: -scores[i][0])
+    return [(items[i], scores[i][1]) for i in picked]